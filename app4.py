@@ -4,9 +4,8 @@ import pytesseract
 import requests
 import json
 import time
-from PyPDF2 import PdfReader
-import io
 import re
+from pdf_pipeline import extract_pages, pages_to_text
 
 # 페이지 설정
 st.set_page_config(
@@ -323,13 +322,9 @@ def extract_business_card_info(image):
 
 # PDF 읽기 함수
 def read_pdf(pdf_file):
-    """PDF 파일 읽기"""
+    """PDF 파일 읽기 (텍스트가 없는 스캔 페이지는 OCR)"""
     try:
-        pdf_reader = PdfReader(io.BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return pages_to_text(extract_pages(pdf_file, ocr=True)["pages"])
     except Exception as e:
         st.error(f"PDF 읽기 오류: {str(e)}")
         return ""
@@ -1,11 +1,13 @@
+import os
 import streamlit as st
 from PIL import Image
 import pytesseract
-import json
 import time
-from PyPDF2 import PdfReader
-import io
 import re
+from pdf_pipeline import build_pdf_document, page_of_offset, pages_in_range, page_slice
+from page_store import PageStore
+from index_tokenizer import index_terms
+from substring_index import SubstringIndex
 
 # 페이지 설정
 st.set_page_config(
@@ -20,10 +22,17 @@ if "business_cards" not in st.session_state:
 if "conversation_history" not in st.session_state:
     st.session_state.conversation_history = []
 if "pdf_documents" not in st.session_state:
-    st.session_state.pdf_documents = []  # 여러 PDF 저장
+    st.session_state.pdf_documents = []  # 여러 PDF 저장 (본문은 PageStore 디스크 저장소에)
 if "pdf_content" not in st.session_state:
     st.session_state.pdf_content = ""
 
+# 전체 PDF 검색에서 정확히 일치하지 않을 때 필요한 검색어 토큰 비율
+FUZZY_MATCH_RATIO = 0.6
+
+# 전체 PDF 검색 결과 앞뒤로 보여줄 글자 수와 PDF당 보여줄 최대 등장 수
+SEARCH_CONTEXT_CHARS = 100
+MAX_SEARCH_OCCURRENCES = 20
+
 # 로컬 AI 응답 함수 (API 키 없이 작동)
 def call_ai_api(question: str) -> str:
     """로컬 AI 응답 - API 키 없이 작동"""
@@ -227,29 +236,34 @@ def extract_business_card_info(image):
 
 # PDF 읽기 함수
 def read_pdf(pdf_file):
-    """PDF 파일 읽기"""
+    """PDF 파일 읽기 - 한 번의 추출로 문서 레코드(텍스트, 페이지 오프셋 표, 메타데이터) 반환 (스캔 페이지는 OCR)"""
     try:
-        pdf_reader = PdfReader(io.BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return build_pdf_document(pdf_file, ocr=True)
     except Exception as e:
         st.error(f"PDF 읽기 오류: {str(e)}")
-        return ""
+        return None
 
 # PDF 문서 정보 생성 함수
-def create_pdf_document(pdf_file, pdf_text):
-    """PDF 문서 정보 생성"""
+def create_pdf_document(pdf_file, pdf_record):
+    """PDF 문서 정보 생성 (본문과 부분 문자열 인덱스는 디스크로 옮기고 페이지 수는 오프셋 표에서 가져옴)"""
+    store = PageStore.from_text(pdf_record["text"])
     return {
         "id": f"pdf_{int(time.time())}_{len(st.session_state.pdf_documents)}",
         "name": pdf_file.name,
-        "content": pdf_text,
+        "store": store,
+        "search_index": SubstringIndex.on_disk(pdf_record["text"], os.path.splitext(store.path)[0]),
+        "page_offsets": pdf_record["page_offsets"],
+        "metadata": pdf_record["metadata"],
         "upload_time": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "size": len(pdf_text),
-        "pages": len(PdfReader(io.BytesIO(pdf_file.read())).pages)
+        "size": len(pdf_record["text"]),
+        "pages": pdf_record["page_count"]
     }
 
+def release_pdf_document(pdf_doc):
+    """PDF 문서의 디스크 파일(본문 저장소, 부분 문자열 인덱스) 삭제"""
+    pdf_doc["store"].delete()
+    pdf_doc["search_index"].delete()
+
 # 메인 UI
 st.title("💼 명함 & AI 도우미")
 st.markdown("**명함 OCR, PDF RAG, AI 채팅 (API 키 없이 완전 작동)**")
@@ -355,12 +369,11 @@ with tab3:
                 with st.spinner("PDF를 읽고 있습니다..."):
                     # 파일 포인터를 처음으로 되돌리기
                     uploaded_pdf.seek(0)
-                    pdf_text = read_pdf(uploaded_pdf)
+                    pdf_record = read_pdf(uploaded_pdf)
                     
-                    if pdf_text:
+                    if pdf_record and pdf_record["text"]:
                         # PDF 문서 정보 생성
-                        uploaded_pdf.seek(0)  # 다시 처음으로
-                        pdf_doc = create_pdf_document(uploaded_pdf, pdf_text)
+                        pdf_doc = create_pdf_document(uploaded_pdf, pdf_record)
                         st.session_state.pdf_documents.append(pdf_doc)
                         st.success(f"✅ PDF '{pdf_doc['name']}' 추가 완료!")
                         st.rerun()
@@ -375,18 +388,25 @@ with tab3:
                 
                 with col1:
                     st.write(f"**크기:** {pdf_doc['size']} 문자, **페이지:** {pdf_doc['pages']}장")
+                    if pdf_doc['metadata'].get('title'):
+                        st.caption(f"제목: {pdf_doc['metadata']['title']}")
                     if st.button(f"🗑️ 삭제", key=f"delete_pdf_{i}"):
-                        st.session_state.pdf_documents.pop(i)
+                        release_pdf_document(st.session_state.pdf_documents.pop(i))
                         st.success("PDF가 삭제되었습니다!")
                         st.rerun()
                 
                 with col2:
-                    if st.button(f"📖 내용 보기", key=f"view_pdf_{i}"):
-                        st.text_area("PDF 내용", pdf_doc['content'][:2000] + "..." if len(pdf_doc['content']) > 2000 else pdf_doc['content'], height=300)
+                    show_content = st.toggle(f"📖 내용 보기", key=f"view_pdf_{i}")
                 
                 with col3:
                     if st.button(f"💬 질문하기", key=f"ask_pdf_{i}"):
                         st.session_state.selected_pdf_index = i
+                
+                if show_content:
+                    # 페이지 오프셋 표로 해당 페이지만 잘라서 미리보기
+                    page_no = st.number_input("페이지", 1, max(pdf_doc['pages'], 1), 1, key=f"view_page_{i}")
+                    page_content = page_slice(pdf_doc['store'], pdf_doc['page_offsets'], page_no)
+                    st.text_area(f"{page_no}페이지 내용", page_content or "(텍스트 없음)", height=300)
         
         # 특정 PDF에 대한 질문
         if hasattr(st.session_state, 'selected_pdf_index') and st.session_state.selected_pdf_index is not None:
@@ -402,10 +422,13 @@ with tab3:
             if st.button("🤖 답변 생성", key=f"pdf_qa_{st.session_state.selected_pdf_index}") and pdf_question:
                 with st.spinner("답변을 생성하고 있습니다..."):
                     # 선택된 PDF 내용을 포함한 질문
-                    context = f"PDF '{selected_pdf['name']}' 내용: {selected_pdf['content'][:500]}..."
+                    context = f"PDF '{selected_pdf['name']}' 내용: {selected_pdf['store'].read(0, 500)}..."
                     full_question = f"다음 내용에 대해 답변해주세요:\n\n{context}\n\n질문: {pdf_question}"
                     
                     answer = call_ai_api(full_question)
+                    cited_pages = pages_in_range(selected_pdf['page_offsets'], 0, min(500, selected_pdf['size']))
+                    if cited_pages:
+                        answer += f"\n\n📑 참고: {', '.join(str(p) for p in cited_pages)}페이지"
                     
                     # 대화 기록 저장
                     conversation_entry = {
@@ -429,31 +452,52 @@ with tab3:
         if st.button("🔍 검색", key="search_all_pdfs") and search_query:
             with st.spinner("모든 PDF에서 검색하고 있습니다..."):
                 search_results = []
+                query_terms = index_terms(search_query)
                 
                 for pdf_doc in st.session_state.pdf_documents:
-                    if search_query.lower() in pdf_doc['content'].lower():
-                        # 검색된 텍스트 주변 컨텍스트 추출
-                        content_lower = pdf_doc['content'].lower()
-                        query_pos = content_lower.find(search_query.lower())
-                        
-                        if query_pos != -1:
-                            start = max(0, query_pos - 100)
-                            end = min(len(pdf_doc['content']), query_pos + len(search_query) + 100)
-                            context = pdf_doc['content'][start:end]
-                            
-                            search_results.append({
-                                "pdf_name": pdf_doc['name'],
-                                "context": context,
-                                "position": query_pos
+                    # 업로드 때 만든 부분 문자열 인덱스로 모든 등장 위치 조회 (본문 전체를 읽지 않음)
+                    search_index = pdf_doc["search_index"]
+                    positions = search_index.find_all(search_query)
+                    match_length = len(search_query)
+                    if not len(positions) and query_terms:
+                        # 정확히 일치하지 않으면 한글 n-gram 토큰 겹침으로 판단 (조사/어미가 달라도 찾음)
+                        matched = {term: search_index.find_all(term) for term in query_terms}
+                        matched = {term: found for term, found in matched.items() if len(found)}
+                        if len(matched) >= FUZZY_MATCH_RATIO * len(query_terms):
+                            term, found = min(matched.items(), key=lambda item: item[1][0])
+                            positions, match_length = found, len(term)
+                    
+                    if len(positions):
+                        occurrences = []
+                        for query_pos in positions[:MAX_SEARCH_OCCURRENCES].tolist():
+                            # 검색된 텍스트 주변 컨텍스트 추출
+                            start = max(0, query_pos - SEARCH_CONTEXT_CHARS)
+                            end = min(pdf_doc['size'], query_pos + match_length + SEARCH_CONTEXT_CHARS)
+                            occurrences.append({
+                                "context": pdf_doc['store'].read(start, end),
+                                "position": query_pos,
+                                "page": page_of_offset(pdf_doc['page_offsets'], query_pos)
                             })
+                        
+                        search_results.append({
+                            "pdf_name": pdf_doc['name'],
+                            "count": len(positions),
+                            "occurrences": occurrences
+                        })
                 
                 if search_results:
                     st.success(f"✅ {len(search_results)}개의 PDF에서 '{search_query}'를 찾았습니다!")
                     
-                    for result in search_results:
-                        with st.expander(f"📄 {result['pdf_name']}에서 발견"):
-                            st.write(f"**위치:** {result['position']}번째 문자")
-                            st.text_area("검색된 내용", result['context'], height=150)
+                    for k, result in enumerate(search_results):
+                        with st.expander(f"📄 {result['pdf_name']}에서 {result['count']}회 발견"):
+                            for j, occurrence in enumerate(result['occurrences']):
+                                st.write(f"**위치:** {occurrence['page']}페이지 ({occurrence['position']}번째 문자)")
+                                st.text_area(
+                                    "검색된 내용", occurrence['context'], height=100,
+                                    key=f"search_hit_{k}_{j}"
+                                )
+                            if result['count'] > len(result['occurrences']):
+                                st.caption(f"… 외 {result['count'] - len(result['occurrences'])}곳")
                 else:
                     st.warning(f"'{search_query}'를 포함한 PDF를 찾을 수 없습니다.")
     else:
@@ -494,6 +538,8 @@ with tab5:
 if st.button("🗑️ 모든 데이터 초기화"):
     st.session_state.business_cards = []
     st.session_state.conversation_history = []
+    for pdf_doc in st.session_state.pdf_documents:
+        release_pdf_document(pdf_doc)
     st.session_state.pdf_documents = []
     st.session_state.pdf_content = ""
     if hasattr(st.session_state, 'selected_pdf_index'):
@@ -1,10 +1,22 @@
 import os
 import streamlit as st
 from openai import OpenAI
-from PyPDF2 import PdfReader
 import numpy as np
 import time
 import re
+from pdf_pipeline import (
+    slowest_pages, new_memory_entry, release_memory_entry, start_background_ingest, is_ingesting,
+    cached_memory_entry, rechunk_memory_async, chunk_key, entry_chunks, chunk_token_counts, pages_in_range,
+    page_of_offset, EXTRACT_MODES
+)
+from pdf_cache import pdf_hash, cache_usage
+from chunking import CHUNK_MODES, DEFAULT_MAX_CHARS
+from pdf_backends import PDF_BACKENDS, DEFAULT_BACKEND
+from retrieval import IVF_NPROBE, describe_hit
+from corpus_index import CorpusIndex
+from topics import build_topic_model_async
+from index_snapshot import load_snapshot, merge_snapshot_async
+from token_budget import count_tokens, truncate_to_tokens, context_token_budget, chunk_token_budget, pack_context
 
 # OpenAI API 키 설정 (맨 위로 이동)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -53,31 +65,41 @@ MODELS = {
         "name": "GPT-3.5 Turbo",
         "description": "빠르고 경제적인 기본 모델",
         "best_for": ["간단한 설명", "정의", "기본 질문"],
-        "color": "model-gpt35"
+        "color": "model-gpt35",
+        "context_window": 16385,
+        "max_output_tokens": 500
     },
     "gpt-4o-mini": {
         "name": "GPT-4o Mini",
         "description": "균형잡힌 성능과 비용",
         "best_for": ["요약", "분석", "중간 복잡도 질문"],
-        "color": "model-gpt4mini"
+        "color": "model-gpt4mini",
+        "context_window": 128000,
+        "max_output_tokens": 500
     },
     "gpt-4o": {
         "name": "GPT-4o",
         "description": "최고 품질의 고급 모델",
         "best_for": ["복잡한 분석", "전략", "창의적 작업"],
-        "color": "model-gpt4o"
+        "color": "model-gpt4o",
+        "context_window": 128000,
+        "max_output_tokens": 500
     },
     "claude-3-5-sonnet": {
         "name": "Claude 3.5 Sonnet",
         "description": "Anthropic의 최신 모델",
         "best_for": ["창의적 글쓰기", "코드 생성", "상세한 분석"],
-        "color": "model-claude"
+        "color": "model-claude",
+        "context_window": 200000,
+        "max_output_tokens": 1000
     },
     "gemini-pro": {
         "name": "Gemini Pro",
         "description": "Google의 고성능 모델",
         "best_for": ["다양한 작업", "멀티모달", "실시간 정보"],
-        "color": "model-gemini"
+        "color": "model-gemini",
+        "context_window": 32760,
+        "max_output_tokens": 2048
     },
     "gpt-oss-20b": {
         "name": "GPT-OSS-20B (로컬)",
@@ -85,7 +107,9 @@ MODELS = {
         "best_for": ["일반 분석", "에지 디바이스", "빠른 반복"],
         "color": "model-gptoss",
         "local": True,
-        "hardware_required": "16GB RAM"
+        "hardware_required": "16GB RAM",
+        "context_window": 131072,
+        "max_output_tokens": 500
     },
     "gpt-oss-120b": {
         "name": "GPT-OSS-120B (로컬)",
@@ -93,10 +117,15 @@ MODELS = {
         "best_for": ["복잡한 추론", "도구 사용", "고품질 분석"],
         "color": "model-gptoss",
         "local": True,
-        "hardware_required": "80GB GPU"
+        "hardware_required": "80GB GPU",
+        "context_window": 131072,
+        "max_output_tokens": 500
     }
 }
 
+# 다중 PDF 질문에 사용하는 모델
+MULTI_PDF_MODEL = "gpt-4o"
+
 # 시각화 라이브러리 (선택적)
 try:
     import plotly.express as px
@@ -129,7 +158,27 @@ if "docs" not in st.session_state:
 
 # 다중 PDF 기억 기능을 위한 세션 상태 추가
 if "multiple_pdfs_memory" not in st.session_state:
-    st.session_state.multiple_pdfs_memory = {}  # {pdf_name: {"text": text, "chunks": chunks, "embeddings": embeddings}}
+    st.session_state.multiple_pdfs_memory = {}  # {pdf_name: {"store": PageStore, "chunk_bounds": 오프셋, "page_offsets": 오프셋}}
+    # 저장된 스냅샷이 있으면 재파싱/재색인 없이 mmap으로 불러옴
+    snapshot = load_snapshot()
+    if snapshot:
+        st.session_state.multiple_pdfs_memory = snapshot["memory"]
+        st.session_state.corpus_index = snapshot["corpus"]
+        st.session_state.snapshot_saved = (id(snapshot["corpus"]), snapshot["corpus"].version)
+        st.toast(
+            f"📦 인덱스 스냅샷 v{snapshot['version']} 불러옴 "
+            f"(PDF {len(snapshot['memory'])}개, {snapshot['elapsed'] * 1000:.0f}ms)"
+        )
+
+# 기억된 PDF 전체 청크의 전역 인덱스
+if "corpus_index" not in st.session_state:
+    st.session_state.corpus_index = CorpusIndex()
+    st.session_state.corpus_index.rebuild(st.session_state.multiple_pdfs_memory)
+
+# 기억된 PDF의 토픽 모델 결과 {"topics", "documents": {pdf_name: 토픽 비중}, "shared", "state"}와 학습 중인 작업
+if "pdf_topics" not in st.session_state:
+    st.session_state.pdf_topics = {}
+    st.session_state.topic_job = None
 
 if "history" not in st.session_state:
     st.session_state.history = []
@@ -154,43 +203,59 @@ if "user_preferences" not in st.session_state:
         }
     }
 
-def read_pdf(file) -> str:
-    """PDF 읽기"""
-    text = ""
-    reader = PdfReader(file)
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-    return text
-
-def chunk_text(text: str, chunk_size: int = 200, overlap: int = 50):
-    """텍스트 청킹"""
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        chunk = " ".join(words[start : start + chunk_size])
-        chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks
-
-def get_context(question: str, docs: list, embs: list) -> str:
-    """컨텍스트 생성"""
-    if not docs or not embs:
-        return ""
-    
-    # 간단한 키워드 매칭
-    question_words = set(question.lower().split())
-    best_chunks = []
-    
-    for i, doc in enumerate(docs[:5]):  # 최대 5개 청크만
-        doc_words = set(doc.lower().split())
-        overlap = len(question_words.intersection(doc_words))
-        if overlap > 0:
-            best_chunks.append(doc)
-    
-    return "\n\n".join(best_chunks[:3]) if best_chunks else docs[0] if docs else ""
+# "어떤 PDF에서 ..." 질문의 틀 (조회어에서 제외)
+WHICH_PDF_RE = re.compile(r"(어떤|어느)\s*PDF\S*", re.IGNORECASE)
+
+def multi_pdf_context(memory: dict, corpus: CorpusIndex, question: str, budget: int, top_k: int,
+                      nprobe: int = IVF_NPROBE) -> tuple:
+    """전역 인덱스에서 모든 PDF를 통틀어 상위 top_k 청크를 토큰 예산만큼 담은 컨텍스트 - (컨텍스트, 담은 검색 결과)
+
+    청크마다 PDF 이름과 페이지를 붙여 출처를 밝히고, 일치하는 청크가 없으면 각 PDF의 앞쪽 청크를 번갈아 담는다.
+    """
+    docs = {entry["doc_id"]: (name, entry) for name, entry in memory.items() if "doc_id" in entry}
+    # 백그라운드 다시 청킹과 겹쳐 청크 경계가 막 바뀐 문서의 이전 번호는 건너뜀
+    hits = [
+        hit for hit in corpus.search(question, top_k, nprobe)
+        if hit["doc_id"] in docs and hit["chunk_id"] < len(docs[hit["doc_id"]][1]["chunk_bounds"])
+    ]
+
+    def ranked():
+        for hit in hits:
+            name, entry = docs[hit["doc_id"]]
+            yield hit, name, entry, hit["chunk_id"]
+
+    def round_robin():
+        entries = [(name, entry, len(entry["chunk_bounds"])) for name, entry in memory.items()]
+        for i in range(max((count for _, _, count in entries), default=0)):
+            for name, entry, count in entries:
+                if i < count:
+                    yield {"chunk_id": i}, name, entry, i
+
+    def pieces(candidates):
+        for hit, name, entry, chunk_id in candidates:
+            chunks = entry_chunks(entry)
+            start, end = chunks.bounds[chunk_id]
+            pages = pages_in_range(entry["page_offsets"], start, end)
+            label = f"=== {name} (p. {', '.join(map(str, pages))}) ===" if pages else f"=== {name} ==="
+            text = f"{label}\n{chunks[chunk_id]}"
+            sources[text] = {**hit, "pdf_name": name, "pages": pages}
+            yield text, int(chunk_token_counts(entry, [chunk_id])[0]) + count_tokens(label)
+
+    sources = {}
+    packed, _ = pack_context(pieces(ranked() if hits else round_robin()), budget)
+    # 예산을 넘어 건너뛴 청크는 출처에서 제외
+    cited = [sources[text] for text in packed]
+    return "\n\n".join(packed), cited
+
+def format_sources(hits: list) -> str:
+    """컨텍스트에 담긴 청크의 출처 한 줄 - PDF별 페이지 모음"""
+    pages_by_pdf = {}
+    for hit in hits:
+        pages_by_pdf.setdefault(hit["pdf_name"], set()).update(hit["pages"])
+    return " · ".join(
+        f"{name} (p. {', '.join(map(str, sorted(pages)))})" if pages else name
+        for name, pages in pages_by_pdf.items()
+    )
 
 def analyze_answer_quality(answer: str, question: str) -> dict:
     """답변 품질 분석"""
@@ -248,8 +313,11 @@ def analyze_answer_quality(answer: str, question: str) -> dict:
     }
 
 def generate_answer(question: str, context: str, model: str) -> str:
-    """답변 생성"""
+    """답변 생성 (컨텍스트는 모델 토큰 예산에 맞게 자름)"""
     try:
+        model_info = MODELS.get(model)
+        if context and model_info:
+            context = truncate_to_tokens(context, context_token_budget(model_info, count_tokens(question)))
         if context:
             prompt = f"""다음 정보를 참고하여 질문에 답변하세요.
 
@@ -269,14 +337,14 @@ def generate_answer(question: str, context: str, model: str) -> str:
             response = client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
+                max_tokens=model_info["max_output_tokens"],
                 temperature=0.7
             )
             return response.choices[0].message.content
         elif model == "claude-3-5-sonnet" and claude_client:
             response = claude_client.messages.create(
                 model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
+                max_tokens=model_info["max_output_tokens"],
                 messages=[{"role": "user", "content": prompt}]
             )
             return response.content[0].text
@@ -473,7 +541,46 @@ with st.sidebar:
     st.markdown("#### 🔧 RAG 설정")
     chunk_size = st.slider("청크 크기", 50, 500, 200, key="chunk_size_slider")
     overlap_size = st.slider("겹침 크기", 0, 100, 50, key="overlap_size_slider")
+    chunk_mode = st.selectbox(
+        "청킹 방식",
+        list(CHUNK_MODES.keys()),
+        format_func=lambda mode: CHUNK_MODES[mode],
+        index=0,
+        key="chunk_mode_selectbox",
+        help="문장 단위는 문장과 페이지를 자르지 않고 최대 문자 수까지 묶습니다 (한국어 종결어미 지원)."
+    )
+    max_chunk_chars = st.slider(
+        "문장 청크 최대 문자 수", 200, 4000, DEFAULT_MAX_CHARS, step=100, key="max_chunk_chars_slider",
+        disabled=chunk_mode != "sentence"
+    )
     top_docs = st.slider("상위 문서 수", 1, 10, 3, key="top_docs_slider")
+    max_chunk_tokens = chunk_token_budget(MODELS[MULTI_PDF_MODEL], top_docs)
+    ann_nprobe = st.slider(
+        "벡터 검색 탐색 리스트 수 (nprobe)", 1, 64, IVF_NPROBE, key="ann_nprobe_slider",
+        help="청크가 많아 근사 검색(IVF)으로 전환된 뒤에 적용됩니다. 클수록 정확하고 느립니다."
+    )
+    if chunk_mode == "tokens":
+        st.caption(f"🔢 청크 최대 {max_chunk_tokens} 토큰 ({MODELS[MULTI_PDF_MODEL]['name']}, 상위 {top_docs}개 기준)")
+    extract_mode = st.selectbox(
+        "PDF 추출 방식",
+        list(EXTRACT_MODES.keys()),
+        format_func=lambda mode: EXTRACT_MODES[mode],
+        index=0,
+        key="extract_mode_selectbox",
+        help="페이지가 많은 PDF는 병렬 추출이 빠릅니다. 작은 PDF는 단일 스레드가 효율적입니다."
+    )
+    pdf_backend = st.selectbox(
+        "PDF 텍스트 엔진",
+        list(PDF_BACKENDS.keys()),
+        format_func=lambda name: PDF_BACKENDS[name].label,
+        index=list(PDF_BACKENDS.keys()).index(DEFAULT_BACKEND),
+        key="pdf_backend_selectbox",
+        help="설치된 엔진만 표시됩니다. 배포 기본값은 PDF_BACKEND 환경 변수로 정합니다."
+    )
+    use_ocr = st.checkbox(
+        "스캔 페이지 OCR", value=True, key="ocr_checkbox",
+        help="텍스트가 없는 페이지만 이미지로 변환해 OCR합니다 (kor+eng)."
+    )
     
     # RAG 기능 토글
     rag_enabled = st.toggle("RAG 기능 활성화", value=True, key="rag_toggle")
@@ -499,8 +606,78 @@ with st.sidebar:
     
     st.markdown("#### ⚡ 성능 설정")
     use_caching = st.checkbox("캐싱 활성화", value=True, key="caching_checkbox")
+    if use_caching:
+        usage = cache_usage()
+        st.caption(f"💾 PDF 캐시: {usage['files']}개, {usage['bytes'] / (1024 * 1024):.1f}MB")
+    retrieval_stats = st.session_state.corpus_index.cache.stats()
+    st.caption(
+        f"🔁 검색 캐시: 적중률 {retrieval_stats['hit_rate']:.0%} "
+        f"({retrieval_stats['hits']}/{retrieval_stats['hits'] + retrieval_stats['misses']}), "
+        f"{retrieval_stats['entries']}개, {retrieval_stats['bytes'] / 1024:.1f}KB"
+    )
+    corpus_stats = st.session_state.corpus_index.stats()
+    st.caption(
+        f"🗂️ 전역 인덱스: PDF {corpus_stats['documents']}개, 청크 {corpus_stats['chunks']}개, "
+        f"문장 {corpus_stats['sentences']}개"
+        f"{', 삭제 표시 ' + str(corpus_stats['tombstones']) + '개' if corpus_stats['tombstones'] else ''}"
+        f"{' (압축 중)' if corpus_stats['compacting'] else ''}"
+    )
     max_search_results = st.slider("최대 검색 결과", 1, 10, 5, key="max_search_slider")
 
+# 청크 설정이 바뀌면 기억된 PDF를 저장된 텍스트로 백그라운드에서 다시 청킹 (이전 설정은 항목에 남아 되돌리면 즉시 적용)
+# 다시 청킹한 PDF는 청크만 전역 인덱스에서 삭제 표시 후 다시 색인하고 (문장/주제어 통계는 그대로),
+# 끝나기 전까지는 이전 청크로 검색한다
+rechunk_job = st.session_state.get("rechunk_job")
+if rechunk_job is not None and rechunk_job.done():
+    st.session_state.rechunk_job = None
+    if rechunk_job.exception() is not None:
+        st.warning(f"⚠️ 다시 청킹 실패: {rechunk_job.exception()}")
+    else:
+        rechunked, rechunk_elapsed = rechunk_job.result()
+        if rechunked:
+            st.toast(f"✂️ {len(rechunked)}개 PDF 다시 청킹 ({rechunk_elapsed * 1000:.0f}ms)")
+    rechunk_job = None
+current_chunk_key = chunk_key(chunk_size, overlap_size, chunk_mode, max_chunk_chars, max_chunk_tokens)
+if rechunk_job is None and any(
+    memory_data.get("status") == "done" and memory_data.get("chunk_key") != current_chunk_key
+    for memory_data in st.session_state.multiple_pdfs_memory.values()
+):
+    st.session_state.rechunk_job = rechunk_job = rechunk_memory_async(
+        st.session_state.multiple_pdfs_memory, chunk_size, overlap_size, chunk_mode, max_chunk_chars,
+        max_chunk_tokens
+    )
+    st.toast("✂️ 청크 설정이 바뀌어 기억된 PDF를 백그라운드에서 다시 청킹합니다")
+
+# 이전 실행에서 시작한 스냅샷 저장이 실패했으면 알림
+snapshot_job = st.session_state.get("snapshot_job")
+if snapshot_job is not None and snapshot_job.done():
+    st.session_state.snapshot_job = None
+    if snapshot_job.exception() is not None:
+        st.warning(f"⚠️ 인덱스 스냅샷 저장 실패: {snapshot_job.exception()}")
+
+# 전역 인덱스가 바뀌었고 수집/다시 청킹 중인 PDF가 없으면 이 세션에서 새로 올린 PDF만 공유 스냅샷에 더함
+# (다음 워커가 바로 불러올 수 있게, 세션의 삭제/초기화는 다른 세션에 영향이 없도록 스냅샷에 반영하지 않음)
+corpus_state = (id(st.session_state.corpus_index), st.session_state.corpus_index.version)
+if corpus_state != st.session_state.get("snapshot_saved") and rechunk_job is None and not any(
+    map(is_ingesting, st.session_state.multiple_pdfs_memory.values())
+):
+    st.session_state.snapshot_job = merge_snapshot_async(st.session_state.multiple_pdfs_memory)
+    st.session_state.snapshot_saved = corpus_state
+
+# 같은 조건에서 토픽 모델도 백그라운드로 다시 학습 (끝난 작업의 결과는 다음 실행에서 가져옴)
+topic_job = st.session_state.topic_job
+if topic_job is not None and topic_job[1].done():
+    st.session_state.topic_job = None
+    if topic_job[1].exception() is None:
+        st.session_state.pdf_topics = {**topic_job[1].result(), "state": topic_job[0]}
+    else:
+        # 학습 중 PDF가 삭제되는 등 실패하면 이전 결과를 두고 다음 변경 때 다시 시도
+        st.session_state.pdf_topics = {**st.session_state.pdf_topics, "state": topic_job[0]}
+if st.session_state.topic_job is None and corpus_state != st.session_state.pdf_topics.get("state") and not any(
+    map(is_ingesting, st.session_state.multiple_pdfs_memory.values())
+):
+    st.session_state.topic_job = (corpus_state, build_topic_model_async(st.session_state.multiple_pdfs_memory))
+
 # 메인 컨테이너 - PDF 업로드와 질문 기능을 우선 배치
 col1, col2 = st.columns([3, 1])
 
@@ -518,17 +695,33 @@ with col1:
                 if uploaded_file is not None:
                     # 중복 체크
                     if uploaded_file.name not in st.session_state.multiple_pdfs_memory:
-                        with st.spinner(f"PDF '{uploaded_file.name}'를 읽고 있습니다..."):
-                            pdf_text = read_pdf(uploaded_file)
-                            if pdf_text:
-                                # 다중 PDF 기억 기능에 저장
-                                st.session_state.multiple_pdfs_memory[uploaded_file.name] = {
-                                    "text": pdf_text,
-                                    "chunks": chunk_text(pdf_text, chunk_size, overlap_size),
-                                    "upload_time": time.strftime("%Y-%m-%d %H:%M:%S"),
-                                    "size": len(pdf_text)
-                                }
-                                st.success(f"✅ {uploaded_file.name} 업로드 완료! (기억됨)")
+                        pdf_bytes = uploaded_file.getvalue()
+                        digest = pdf_hash(pdf_bytes) if use_caching else None
+                        load_start = time.perf_counter()
+                        memory_entry = cached_memory_entry(
+                            digest, chunk_size, overlap_size, use_ocr, pdf_backend, chunk_mode, max_chunk_chars,
+                            max_chunk_tokens
+                        ) if digest else None
+                        if memory_entry:
+                            memory_entry["hash"] = digest
+                            st.session_state.multiple_pdfs_memory[uploaded_file.name] = memory_entry
+                            st.session_state.corpus_index.add_document(uploaded_file.name, memory_entry)
+                            st.success(
+                                f"⚡ {uploaded_file.name} 캐시에서 불러옴! "
+                                f"({(time.perf_counter() - load_start) * 1000:.0f}ms, 기억됨)"
+                            )
+                        else:
+                            # 페이지가 추출되는 대로 청킹하며 백그라운드에서 수집
+                            memory_entry = new_memory_entry()
+                            memory_entry["hash"] = digest
+                            st.session_state.multiple_pdfs_memory[uploaded_file.name] = memory_entry
+                            # 수집 스레드가 청크를 만들 때마다 전역 인덱스에 바로 색인되도록 먼저 등록
+                            st.session_state.corpus_index.add_document(uploaded_file.name, memory_entry)
+                            start_background_ingest(
+                                memory_entry, pdf_bytes, extract_mode, chunk_size, overlap_size, digest, use_ocr,
+                                pdf_backend, chunk_mode, max_chunk_chars, max_chunk_tokens
+                            )
+                            st.info(f"📥 {uploaded_file.name} 수집 시작! 수집된 페이지부터 바로 질문할 수 있습니다.")
                     else:
                         st.warning(f"⚠️ {uploaded_file.name}은 이미 업로드되어 있습니다.")
         
@@ -545,9 +738,43 @@ with col1:
                     st.write(f"📊 {memory_data['size']} 문자")
                 with col4:
                     if st.button(f"삭제", key=f"delete_memory_{pdf_name}"):
+                        # 빈도표에서 뺄 주제어를 저장소에서 다시 세므로 저장소를 닫기 전에 제거
+                        st.session_state.corpus_index.remove_document(memory_data)
+                        release_memory_entry(memory_data)
                         del st.session_state.multiple_pdfs_memory[pdf_name]
                         st.success(f"✅ {pdf_name} 기억에서 삭제됨!")
                         st.rerun()
+                if memory_data.get("status") == "error":
+                    st.error(f"❌ {pdf_name} 읽기 오류: {memory_data.get('error')}")
+                elif memory_data.get("extract_stats"):
+                    stats = memory_data["extract_stats"]
+                    with st.expander(
+                        f"📈 {stats['page_count']}페이지, {stats['elapsed']:.2f}초 "
+                        f"({EXTRACT_MODES[stats['mode']]}, 워커 {stats['workers']}개"
+                        f"{', OCR ' + str(len(stats['ocr_pages'])) + '페이지' if stats.get('ocr_pages') else ''})"
+                    ):
+                        st.bar_chart(stats["timings"])
+                        for page_no, elapsed in slowest_pages(stats):
+                            st.write(f"• {page_no}페이지: {elapsed:.3f}초")
+
+            # 수집 중인 PDF 진행률 (수집이 끝나면 전체 화면 갱신)
+            if any(m.get("status") == "ingesting" for m in st.session_state.multiple_pdfs_memory.values()):
+                @st.fragment(run_every=1)
+                def show_ingest_progress():
+                    ingesting = {
+                        name: m for name, m in st.session_state.multiple_pdfs_memory.items()
+                        if m.get("status") == "ingesting"
+                    }
+                    if not ingesting:
+                        st.rerun()
+                    for name, m in ingesting.items():
+                        total = m["page_count"] or 1
+                        st.progress(
+                            min(m["pages_done"] / total, 1.0),
+                            text=f"📥 {name}: {m['pages_done']}/{m['page_count']} 페이지, 청크 {len(m['chunk_bounds'])}개"
+                        )
+
+                show_ingest_progress()
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -570,6 +797,21 @@ with col2:
             <h2>{total_chars:,}</h2>
         </div>
         """, unsafe_allow_html=True)
+        
+        # 토픽 모델이 찾은 공통 토픽 (LLM 호출 없음)
+        pdf_topics = st.session_state.pdf_topics
+        if pdf_topics.get("shared"):
+            st.markdown("**🧩 공통 토픽**" if pdf_topics.get("distinctive", True) else
+                        "**🧩 공통 토픽** (뚜렷한 토픽이 없어 자주 나오는 단어로 묶음)")
+            for topic_id, doc_count, _ in pdf_topics["shared"][:3]:
+                st.caption(
+                    f"{', '.join(pdf_topics['topics'][topic_id])} "
+                    f"({doc_count}/{len(st.session_state.multiple_pdfs_memory)}개 PDF)"
+                )
+        elif "state" in pdf_topics:
+            st.caption("🧩 뚜렷한 공통 토픽이 없습니다")
+        if st.session_state.topic_job is not None:
+            st.caption("🧩 토픽 분석 중...")
 
 # 다중 PDF 관련 질문 기능
 if st.session_state.multiple_pdfs_memory:
@@ -584,26 +826,27 @@ if st.session_state.multiple_pdfs_memory:
     
     if st.button("🤖 답변 생성", key="multi_pdf_qa") and pdf_question:
         with st.spinner("기억된 PDF들을 분석하고 답변을 생성하고 있습니다..."):
-            # 모든 PDF 내용을 통합
-            all_pdf_content = ""
-            pdf_names = []
-            
-            for pdf_name, memory_data in st.session_state.multiple_pdfs_memory.items():
-                all_pdf_content += f"\n\n=== {pdf_name} ===\n{memory_data['text'][:1000]}..."
-                pdf_names.append(pdf_name)
+            pdf_names = list(st.session_state.multiple_pdfs_memory.keys())
+            context_hits = []
             
             # 질문 분석 및 답변 생성
             if "어떤 PDF" in pdf_question or "어느 PDF" in pdf_question:
                 # 특정 PDF 찾기
                 answer = f"**기억된 PDF 분석 결과:**\n\n"
-                for pdf_name, memory_data in st.session_state.multiple_pdfs_memory.items():
-                    if any(keyword in memory_data['text'].lower() for keyword in pdf_question.lower().split()):
-                        answer += f"📄 **{pdf_name}**: 관련 내용 발견\n"
-                        # 관련 문장 찾기
-                        sentences = memory_data['text'].split('.')
-                        relevant_sentences = [s for s in sentences if any(keyword in s.lower() for keyword in pdf_question.lower().split())]
-                        if relevant_sentences:
-                            answer += f"   - {relevant_sentences[0][:100]}...\n\n"
+                # 질문 틀("어떤 PDF에서")을 빼고 수집 때 만든 문장 인덱스 포스팅으로 조회 (PDF는 최고 문장 점수 순)
+                lookup_query = WHICH_PDF_RE.sub(" ", pdf_question)
+                corpus = st.session_state.corpus_index
+                for doc_id, sentences in corpus.best_sentences_per_document(lookup_query):
+                    doc = corpus.docs.get(doc_id)
+                    if doc is None:
+                        continue
+                    memory_data = doc["entry"]
+                    answer += f"📄 **{doc['name']}**: 관련 내용 발견\n"
+                    for start, end, _ in sentences:
+                        sentence = " ".join(memory_data["store"].read(start, end).split())
+                        page_no = page_of_offset(memory_data["page_offsets"], start)
+                        answer += f"   - ({page_no}페이지) {sentence[:100]}{'...' if len(sentence) > 100 else ''}\n"
+                    answer += "\n"
                 
                 if answer == "**기억된 PDF 분석 결과:**\n\n":
                     answer += "관련 내용을 찾을 수 없습니다."
@@ -615,23 +858,42 @@ if st.session_state.multiple_pdfs_memory:
                 for pdf_name in pdf_names:
                     answer += f"• {pdf_name}\n"
                 
-                # 간단한 키워드 분석
-                common_keywords = ["AI", "인공지능", "기술", "시스템", "데이터", "분석", "개발", "프로그램"]
-                found_keywords = []
-                
-                for keyword in common_keywords:
-                    if any(keyword in memory_data['text'] for memory_data in st.session_state.multiple_pdfs_memory.values()):
-                        found_keywords.append(keyword)
+                # 전역 인덱스의 문서 빈도표에서 여러 PDF에 걸친 주제어를 TF-IDF 순으로 (텍스트를 다시 읽지 않음)
+                common_topics = st.session_state.corpus_index.common_topics()
                 
-                if found_keywords:
-                    answer += f"\n**공통 키워드:** {', '.join(found_keywords)}"
+                if common_topics:
+                    answer += "\n**공통 주제어:**\n"
+                    for term, doc_count, _ in common_topics:
+                        answer += f"• {term} ({doc_count}/{len(pdf_names)}개 PDF)\n"
                 else:
                     answer += "\n공통 주제를 찾기 어렵습니다."
+                
+                # 백그라운드 토픽 모델이 끝났으면 여러 PDF가 함께 다루는 토픽도 표시
+                pdf_topics = st.session_state.pdf_topics
+                shared_topics = [
+                    (topic_id, doc_count) for topic_id, doc_count, _ in pdf_topics.get("shared", [])
+                    if doc_count >= min(2, len(pdf_names))
+                ]
+                if shared_topics:
+                    answer += "\n**공통 토픽 (토픽 모델):**\n"
+                    for topic_id, doc_count in shared_topics[:3]:
+                        answer += f"• {', '.join(pdf_topics['topics'][topic_id])} ({doc_count}/{len(pdf_names)}개 PDF)\n"
+                elif st.session_state.topic_job is not None:
+                    answer += "\n(토픽 모델을 학습하는 중입니다. 잠시 후 다시 질문하면 공통 토픽도 보여 드립니다.)\n"
+                elif "state" in pdf_topics:
+                    answer += "\n(토픽 모델에서 뚜렷한 공통 토픽을 찾지 못했습니다.)\n"
             
             else:
                 # 일반적인 질문
-                context = f"기억된 PDF들:\n{all_pdf_content[:2000]}..."
-                answer = generate_answer(pdf_question, context, "gpt-4o")
+                budget = context_token_budget(MODELS[MULTI_PDF_MODEL], count_tokens(pdf_question))
+                pdf_context, context_hits = multi_pdf_context(
+                    st.session_state.multiple_pdfs_memory, st.session_state.corpus_index, pdf_question, budget,
+                    top_docs, ann_nprobe
+                )
+                context = f"기억된 PDF들:\n{pdf_context}"
+                answer = generate_answer(pdf_question, context, MULTI_PDF_MODEL)
+                if context_hits:
+                    answer += f"\n\n📑 출처: {format_sources(context_hits)}"
             
             # 대화 기록 저장
             history_entry = {
@@ -644,6 +906,17 @@ if st.session_state.multiple_pdfs_memory:
             
             st.subheader("🤖 답변")
             st.write(answer)
+            if context_hits:
+                with st.expander("🔎 검색 근거 (어휘 + 벡터, RRF)"):
+                    for hit in context_hits:
+                        summary = describe_hit(hit) if "score" in hit else f"청크 {hit['chunk_id']}"
+                        pages = f" p. {', '.join(map(str, hit['pages']))}" if hit["pages"] else ""
+                        st.caption(f"📄 {hit['pdf_name']}{pages} · {summary}")
+            ingesting_names = [
+                name for name, m in st.session_state.multiple_pdfs_memory.items() if m.get("status") == "ingesting"
+            ]
+            if ingesting_names:
+                st.caption(f"⏳ 수집 중인 PDF({', '.join(ingesting_names)})는 현재까지 수집된 페이지 기준으로 답변했습니다.")
 else:
     st.info("먼저 PDF 파일들을 업로드해주세요. 업로드된 PDF들은 자동으로 기억됩니다.")
 
@@ -669,7 +942,13 @@ if st.session_state.history:
 
 # 초기화 버튼
 if st.button("🗑️ 모든 데이터 초기화"):
+    for memory_data in st.session_state.multiple_pdfs_memory.values():
+        release_memory_entry(memory_data)
     st.session_state.multiple_pdfs_memory = {}
+    st.session_state.corpus_index = CorpusIndex()
+    st.session_state.rechunk_job = None
+    st.session_state.pdf_topics = {}
+    st.session_state.topic_job = None
     st.session_state.history = []
     st.session_state.docs = None
     st.session_state.embs = None
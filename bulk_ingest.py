@@ -0,0 +1,264 @@
+"""PDF 폴더 일괄 수집 CLI (Streamlit 없이 실행, 중단 후 이어서 수집 가능)
+
+사용법:
+    python bulk_ingest.py <PDF 폴더> [--workers 4] [--chunk-size 200] [--overlap 50] [--chunk-mode sentence] [--ocr]
+
+추출 결과는 앱과 같은 PDF 캐시(app_data/pdf_cache)에 저장되고, 수집이 끝나면 폴더의 PDF를
+전역 인덱스 스냅샷(app_data/index_snapshot)에 더해 저장하므로 app6을 새로 열면 업로드 없이 바로 검색할 수 있다.
+처리가 끝난 파일은 매니페스트(JSON Lines)에 기록되어 다시 실행하면 건너뛴다.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from chunking import CHUNK_MODES, DEFAULT_MAX_CHARS, document_chunk_bounds
+from index_snapshot import SNAPSHOT_DIR, merge_snapshot, snapshot_documents
+from pdf_backends import DEFAULT_BACKEND, PDF_BACKENDS
+from pdf_cache import CACHE_DIR, CACHE_MAX_BYTES, evict_lru, load_cached_pdf, pdf_hash, save_cached_pdf
+from pdf_pipeline import (
+    cache_matches, cached_memory_entry, chunk_key, extract_pages, page_offset_table, pages_to_text,
+    release_memory_entry,
+)
+from token_budget import MAX_CHUNK_TOKENS
+
+MANIFEST_DIR = os.path.join("app_data", "bulk_manifests")
+
+# 진행 상황 출력 간격 (문서 수)
+PROGRESS_EVERY = 50
+
+
+def find_pdfs(folder: str) -> list:
+    """폴더 아래의 PDF 파일 경로 (정렬된 순서)"""
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def default_manifest_path(folder: str) -> str:
+    """폴더별 기본 매니페스트 경로"""
+    folder_id = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(MANIFEST_DIR, f"{folder_id}.jsonl")
+
+
+def _file_signature(path: str) -> tuple:
+    """파일 변경 여부 확인용 (크기, 수정 시각)"""
+    stat = os.stat(path)
+    return stat.st_size, int(stat.st_mtime)
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """매니페스트에서 완료된 파일 목록 읽기 - {경로: 기록} (중단으로 잘린 마지막 줄은 무시)"""
+    done = {}
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "done":
+                done[record["path"]] = record
+    return done
+
+
+def ingest_file(path: str, chunk_size: int, overlap: int, ocr: bool, cache_dir: str,
+                backend: str = DEFAULT_BACKEND, chunk_mode: str = "words", max_chars: int = DEFAULT_MAX_CHARS,
+                max_tokens: int = None) -> dict:
+    """워커 프로세스: PDF 하나를 추출/청킹하여 캐시에 저장"""
+    t0 = time.perf_counter()
+    size, mtime = _file_signature(path)
+    result = {"path": path, "size": size, "mtime": mtime}
+    try:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        digest = pdf_hash(pdf_bytes)
+        record = load_cached_pdf(digest, cache_dir)
+        cached = record is not None and cache_matches(record, ocr, backend)
+        if not cached:
+            # 파일 단위로 병렬 처리하므로 파일 내부는 단일 스레드로 추출
+            extraction = extract_pages(pdf_bytes, "serial", max_workers=1, ocr=ocr, backend=backend)
+            record = {
+                "pages": extraction.pop("pages"),
+                "chunk_bounds": {},
+                "extract_stats": extraction,
+            }
+        key = chunk_key(chunk_size, overlap, chunk_mode, max_chars, max_tokens)
+        if key not in record["chunk_bounds"]:
+            record["chunk_bounds"][key] = document_chunk_bounds(
+                pages_to_text(record["pages"]), page_offset_table(record["pages"]),
+                chunk_mode, chunk_size, overlap, max_chars, max_tokens,
+            ).tolist()
+            # 용량 정리는 수집이 끝난 뒤 한 번만
+            save_cached_pdf(digest, record, cache_dir, max_bytes=None)
+        result.update(
+            status="done",
+            hash=digest,
+            cached=cached,
+            pages=len(record["pages"]),
+            chunks=len(record["chunk_bounds"][key]),
+        )
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    result["elapsed"] = time.perf_counter() - t0
+    return result
+
+
+def write_snapshot(folder: str, manifest_path: str, chunk_size: int, overlap: int, ocr: bool, cache_dir: str,
+                   backend: str = DEFAULT_BACKEND, chunk_mode: str = "words", max_chars: int = DEFAULT_MAX_CHARS,
+                   max_tokens: int = None, snapshot_dir: str = SNAPSHOT_DIR):
+    """수집된 PDF를 최신 스냅샷의 전역 인덱스에 더해 새 스냅샷 저장 - (저장한 버전 이름 또는 None, 추가한 PDF 수)
+
+    이미 스냅샷에 있는 PDF(같은 이름 또는 같은 내용)는 건너뛴다. 이름은 폴더 기준 상대 경로.
+    실행 중인 앱 세션이 같은 스냅샷에 PDF를 더해도 merge_snapshot의 쓰기 잠금으로 서로 잃지 않는다.
+    """
+    known_names, known_hashes = snapshot_documents(snapshot_dir)
+    memory = {}
+    try:
+        for path, record in sorted(load_manifest(manifest_path).items()):
+            name = os.path.relpath(path, folder)
+            if name in known_names or record["hash"] in known_hashes:
+                continue
+            entry = cached_memory_entry(
+                record["hash"], chunk_size, overlap, ocr, backend, chunk_mode, max_chars, max_tokens, cache_dir
+            )
+            if entry is None:
+                continue
+            entry["hash"] = record["hash"]
+            memory[name] = entry
+            known_hashes.add(record["hash"])
+        if not memory:
+            return None, 0
+        version, added = merge_snapshot(memory, snapshot_dir)
+        return version, len(added)
+    finally:
+        # 텍스트는 스냅샷 texts 폴더로 링크되었으므로 임시 저장소는 지움
+        for entry in memory.values():
+            release_memory_entry(entry)
+
+
+def run(folder: str, workers: int, chunk_size: int, overlap: int, ocr: bool,
+        manifest_path: str, cache_dir: str, max_cache_bytes: int, backend: str = DEFAULT_BACKEND,
+        chunk_mode: str = "words", max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = MAX_CHUNK_TOKENS,
+        snapshot_dir: str = SNAPSHOT_DIR) -> dict:
+    """폴더 일괄 수집 후 스냅샷 저장 (snapshot_dir가 None이면 생략) - 요약 통계 반환"""
+    paths = find_pdfs(folder)
+    done = load_manifest(manifest_path)
+    todo = [
+        path for path in paths
+        if path not in done or (done[path]["size"], done[path]["mtime"]) != _file_signature(path)
+    ]
+    print(f"📂 PDF {len(paths)}개 발견, 이미 수집 {len(paths) - len(todo)}개, 이번에 수집 {len(todo)}개")
+
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    summary = {"docs": 0, "pages": 0, "chunks": 0, "cached": 0, "errors": 0, "interrupted": False,
+               "snapshot": None, "indexed": 0}
+    written = set()  # 이번 실행에서 쓴 캐시 항목 (용량 정리에서 제외)
+    t0 = time.perf_counter()
+    with open(manifest_path, "a", encoding="utf-8") as manifest, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                ingest_file, path, chunk_size, overlap, ocr, cache_dir, backend, chunk_mode, max_chars, max_tokens
+            )
+            for path in todo
+        ]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                # 한 줄씩 바로 기록해 중단되어도 완료분은 유지
+                manifest.write(json.dumps(result, ensure_ascii=False) + "\n")
+                manifest.flush()
+                if result["status"] == "done":
+                    written.add(result["hash"])
+                    summary["docs"] += 1
+                    summary["pages"] += result["pages"]
+                    summary["chunks"] += result["chunks"]
+                    summary["cached"] += result["cached"]
+                else:
+                    summary["errors"] += 1
+                    print(f"❌ {result['path']}: {result['error']}", file=sys.stderr)
+                finished = summary["docs"] + summary["errors"]
+                if finished % PROGRESS_EVERY == 0:
+                    print(f"  ... {finished}/{len(todo)} ({time.perf_counter() - t0:.1f}초)")
+        except KeyboardInterrupt:
+            summary["interrupted"] = True
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    if snapshot_dir is not None and not summary["interrupted"]:
+        summary["snapshot"], summary["indexed"] = write_snapshot(
+            folder, manifest_path, chunk_size, overlap, ocr, cache_dir, backend, chunk_mode, max_chars, max_tokens,
+            snapshot_dir,
+        )
+    if max_cache_bytes is not None:
+        evict_lru(cache_dir, max_cache_bytes, keep=written)
+    summary["elapsed"] = time.perf_counter() - t0
+    elapsed = max(summary["elapsed"], 1e-9)
+    summary["docs_per_sec"] = summary["docs"] / elapsed
+    summary["pages_per_sec"] = summary["pages"] / elapsed
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PDF 폴더 일괄 수집 (중단 후 다시 실행하면 이어서 수집)")
+    parser.add_argument("folder", help="PDF가 들어 있는 폴더 (하위 폴더 포함)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="워커 프로세스 수")
+    parser.add_argument("--chunk-size", type=int, default=200, help="청크 크기 (단어)")
+    parser.add_argument("--overlap", type=int, default=50, help="청크 겹침 (단어)")
+    parser.add_argument("--chunk-mode", choices=list(CHUNK_MODES), default="words", help="청킹 방식")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="문장 단위 청크 최대 문자 수")
+    parser.add_argument(
+        "--max-tokens", type=int, default=MAX_CHUNK_TOKENS,
+        help="토큰 예산 청크 최대 토큰 수 (--chunk-mode tokens, 기본값은 app6와 같은 청크 예산)"
+    )
+    parser.add_argument("--ocr", action="store_true", help="텍스트가 없는 스캔 페이지 OCR")
+    parser.add_argument("--backend", choices=list(PDF_BACKENDS), default=DEFAULT_BACKEND, help="PDF 텍스트 추출 엔진")
+    parser.add_argument("--manifest", help="매니페스트 경로 (기본: app_data/bulk_manifests/<폴더별>.jsonl)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="PDF 캐시 폴더")
+    parser.add_argument(
+        "--max-cache-mb", type=float, default=CACHE_MAX_BYTES / (1024 * 1024),
+        help="수집 후 캐시 최대 용량 (MB, 0이면 정리하지 않음, 이번에 수집한 항목은 남김)"
+    )
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help="전역 인덱스 스냅샷 폴더 (app6이 시작할 때 불러옴)")
+    parser.add_argument("--no-snapshot", action="store_true", help="스냅샷을 저장하지 않고 캐시만 채움")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"폴더를 찾을 수 없습니다: {args.folder}")
+    summary = run(
+        args.folder,
+        max(1, args.workers),
+        args.chunk_size,
+        args.overlap,
+        args.ocr,
+        args.manifest or default_manifest_path(args.folder),
+        args.cache_dir,
+        int(args.max_cache_mb * 1024 * 1024) if args.max_cache_mb > 0 else None,
+        args.backend,
+        args.chunk_mode,
+        args.max_chars,
+        args.max_tokens,
+        None if args.no_snapshot else args.snapshot_dir,
+    )
+
+    print("\n📊 수집 결과")
+    print(f"  문서: {summary['docs']}개 (캐시 재사용 {summary['cached']}개), 오류: {summary['errors']}개")
+    print(f"  페이지: {summary['pages']}개, 청크: {summary['chunks']}개")
+    print(f"  소요 시간: {summary['elapsed']:.1f}초")
+    print(f"  처리 속도: {summary['docs_per_sec']:.2f} docs/sec, {summary['pages_per_sec']:.1f} pages/sec")
+    if summary["snapshot"]:
+        print(f"  스냅샷: {summary['snapshot']} (PDF {summary['indexed']}개 추가 색인)")
+    if summary["interrupted"]:
+        print("⏸️ 중단됨 - 같은 명령을 다시 실행하면 이어서 수집합니다.")
+        return 130
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""텍스트 청킹 (PDF 수집 파이프라인 공용)"""
+import re
+
+import numpy as np
+
+from token_budget import count_tokens
+
+# chunk_text의 text.split()과 같은 기준의 단어 패턴
+_WORD_RE = re.compile(r"\S+")
+
+# 문장 끝 패턴 - 문장부호 뒤 공백/끝, 띄어쓰기 없이 이어지는 한국어 종결(했다.다음), 빈 줄(문단/표 경계)
+_SENTENCE_END_RE = re.compile(
+    r"[.!?…。！？]+[\"'”’)\]]*(?=\s|$)"
+    r"|(?<=[다요죠까])[.!?](?=[가-힣A-Za-z])"
+    r"|\n[ \t]*\n"
+)
+_SPACE_RE = re.compile(r"\s*")
+
+# 청킹 방식 {키: 사이드바 표시 이름}
+CHUNK_MODES = {
+    "words": "단어 수 (겹침)",
+    "sentence": "문장 단위 (페이지 경계 유지)",
+    "tokens": "문장 단위 (모델 토큰 예산)",
+}
+
+# 문장 단위 청크의 기본 최대 문자 수
+DEFAULT_MAX_CHARS = 1000
+
+
+def chunk_bounds(text, chunk_size: int = 200, overlap: int = 50) -> np.ndarray:
+    """chunk_text와 같은 청크의 (시작, 끝) 문자 오프셋 - (청크 수, 2) int64 배열"""
+    spans = np.fromiter(
+        (pos for m in _WORD_RE.finditer(text) for pos in m.span()), dtype=np.int64
+    ).reshape(-1, 2)
+    step = max(1, chunk_size - overlap)
+    starts = np.arange(0, len(spans), step)
+    last = np.minimum(starts + chunk_size, len(spans)) - 1
+    return np.stack((spans[starts, 0], spans[last, 1]), axis=1).reshape(-1, 2)
+
+
+def _pack_sentences(text: str, max_chars: int) -> np.ndarray:
+    """페이지 하나를 최대 max_chars 문자까지 문장 단위로 묶은 청크 경계"""
+    ends = np.fromiter((m.end() for m in _SENTENCE_END_RE.finditer(text)), dtype=np.int64)
+    ends = np.append(ends, len(text))
+    bounds = []
+    start = _SPACE_RE.match(text, 0).end()
+    while start < len(text):
+        limit = min(start + max_chars, len(text))
+        i = np.searchsorted(ends, limit, side="right") - 1
+        if i >= 0 and ends[i] > start:
+            end = int(ends[i])
+        else:
+            # 한 문장이 예산보다 길면 마지막 공백에서 (없으면 예산 위치에서) 자름
+            space = max(text.rfind(" ", start, limit), text.rfind("\n", start, limit))
+            end = space if space > start and limit < len(text) else limit
+        stripped = start + len(text[start:end].rstrip())
+        if stripped > start:
+            bounds.append((start, stripped))
+        start = _SPACE_RE.match(text, end).end()
+    return np.asarray(bounds, dtype=np.int64).reshape(-1, 2)
+
+
+def sentence_spans(text: str, max_chars: int = None) -> np.ndarray:
+    """문장별 (시작, 끝) 문자 오프셋 (앞뒤 공백 제외, 빈 문장 제외) - (문장 수, 2) int64 배열
+
+    max_chars를 주면 그보다 긴 문장(문장부호 없는 표/목록 등)은 마지막 공백에서 나눈다.
+    """
+    spans = []
+    start = 0
+    for end in [m.end() for m in _SENTENCE_END_RE.finditer(text)] + [len(text)]:
+        start = _SPACE_RE.match(text, start).end()
+        while max_chars and end - start > max_chars:
+            limit = start + max_chars
+            space = max(text.rfind(" ", start, limit), text.rfind("\n", start, limit))
+            cut = space if space > start else limit
+            spans.append((start, start + len(text[start:cut].rstrip())))
+            start = _SPACE_RE.match(text, cut).end()
+        stripped = start + len(text[start:end].rstrip())
+        if stripped > start:
+            spans.append((start, stripped))
+        start = max(start, end)
+    return np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def _split_by_tokens(text: str, start: int, end: int, max_tokens: int) -> list:
+    """예산보다 긴 문장 하나를 단어 단위로 max_tokens씩 나눈 경계"""
+    bounds = []
+    piece_start = piece_end = None
+    used = 0
+    for m in _WORD_RE.finditer(text, start, end):
+        tokens = count_tokens(m.group())
+        if piece_start is not None and used + tokens > max_tokens:
+            bounds.append((piece_start, piece_end))
+            piece_start = None
+        if piece_start is None:
+            piece_start, used = m.start(), 0
+        piece_end = m.end()
+        used += tokens
+    if piece_start is not None:
+        bounds.append((piece_start, piece_end))
+    return bounds
+
+
+def _pack_sentences_by_tokens(text: str, max_tokens: int) -> np.ndarray:
+    """페이지 하나를 최대 max_tokens 토큰까지 문장 단위로 묶은 청크 경계"""
+    bounds = []
+    chunk_start = chunk_end = None
+    used = 0
+    prev = 0
+    for end in [m.end() for m in _SENTENCE_END_RE.finditer(text)] + [len(text)]:
+        start = _SPACE_RE.match(text, prev).end()
+        prev = end
+        end = start + len(text[start:end].rstrip())
+        if end <= start:
+            continue
+        tokens = count_tokens(text[start:end])
+        if chunk_start is not None and used + tokens > max_tokens:
+            bounds.append((chunk_start, chunk_end))
+            chunk_start = None
+        if tokens > max_tokens:
+            bounds.extend(_split_by_tokens(text, start, end, max_tokens))
+            continue
+        if chunk_start is None:
+            chunk_start, used = start, 0
+        chunk_end = end
+        used += tokens
+    if chunk_start is not None:
+        bounds.append((chunk_start, chunk_end))
+    return np.asarray(bounds, dtype=np.int64).reshape(-1, 2)
+
+
+def _pack_page(text: str, max_chars: int, max_tokens: int = None) -> np.ndarray:
+    """max_tokens가 있으면 토큰 예산, 없으면 문자 수 예산으로 문장 묶기"""
+    if max_tokens:
+        return _pack_sentences_by_tokens(text, max(1, max_tokens))
+    return _pack_sentences(text, max(1, max_chars))
+
+
+def sentence_chunk_bounds(text: str, max_chars: int = DEFAULT_MAX_CHARS, page_offsets=None,
+                          max_tokens: int = None) -> np.ndarray:
+    """문장을 자르지 않고 페이지를 넘지 않는 청크 경계 - (청크 수, 2) int64 배열"""
+    if page_offsets is None:
+        page_offsets = [0, len(text)]
+    parts = [
+        _pack_page(text[start:end], max_chars, max_tokens) + start
+        for start, end in zip(page_offsets[:-1], page_offsets[1:]) if end > start
+    ]
+    return np.concatenate(parts) if parts else np.empty((0, 2), dtype=np.int64)
+
+
+def document_chunk_bounds(text: str, page_offsets, chunk_mode: str = "words", chunk_size: int = 200,
+                          overlap: int = 50, max_chars: int = DEFAULT_MAX_CHARS,
+                          max_tokens: int = None) -> np.ndarray:
+    """청킹 방식에 맞는 문서 전체 청크 경계"""
+    if chunk_mode == "sentence":
+        return sentence_chunk_bounds(text, max_chars, page_offsets)
+    if chunk_mode == "tokens":
+        return sentence_chunk_bounds(text, max_chars, page_offsets, max_tokens)
+    return chunk_bounds(text, chunk_size, overlap)
+
+
+def chunks_from_bounds(text, bounds) -> list:
+    """오프셋 목록으로 청크 문자열 복원 (text는 str 또는 PageStore)"""
+    return [" ".join(text[start:end].split()) for start, end in bounds]
+
+
+class ChunkView:
+    """원문 버퍼 하나와 청크 오프셋 배열 - 청크 문자열은 꺼낼 때만 잘라서 만듦
+
+    list처럼 len(), 인덱싱, 슬라이싱, 반복을 지원하므로 chunk_text 결과를 쓰던 코드를 그대로 쓸 수 있다.
+    """
+
+    def __init__(self, text, bounds):
+        self.text = text  # str 또는 PageStore
+        self.bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ChunkView(self.text, self.bounds[key])
+        start, end = self.bounds[key]
+        return " ".join(self.text[start:end].split())
+
+    def __iter__(self):
+        for start, end in self.bounds.tolist():
+            yield " ".join(self.text[start:end].split())
+
+    def tolist(self) -> list:
+        """청크 문자열 목록으로 복원"""
+        return chunks_from_bounds(self.text, self.bounds.tolist())
+
+
+class IncrementalChunker:
+    """페이지 단위로 텍스트를 받아 chunk_bounds와 동일한 청크 경계를 순차 생성"""
+
+    def __init__(self, chunk_size: int = 200, overlap: int = 50):
+        self.chunk_size = chunk_size
+        self.step = max(1, chunk_size - overlap)
+        self.spans = []  # 아직 청크로 내보내지 않은 구간의 단어 (시작, 끝) 위치
+
+    def feed(self, text: str, offset: int = 0) -> list:
+        """문서 내 위치 offset에서 시작하는 텍스트를 추가하고 완성된 청크 경계 반환"""
+        self.spans.extend((offset + m.start(), offset + m.end()) for m in _WORD_RE.finditer(text))
+        bounds = []
+        while len(self.spans) >= self.chunk_size:
+            bounds.append((self.spans[0][0], self.spans[self.chunk_size - 1][1]))
+            del self.spans[:self.step]
+        return bounds
+
+    def finish(self) -> list:
+        """남은 단어로 마지막 청크 경계들 반환"""
+        bounds = []
+        while self.spans:
+            bounds.append((self.spans[0][0], self.spans[min(self.chunk_size, len(self.spans)) - 1][1]))
+            del self.spans[:self.step]
+        return bounds
+
+
+class SentenceChunker:
+    """IncrementalChunker와 같은 인터페이스의 문장 단위 청커 (페이지마다 바로 청크 완성)"""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None):
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+
+    def feed(self, text: str, offset: int = 0) -> list:
+        """페이지 텍스트를 받아 그 페이지의 청크 경계 반환"""
+        return (_pack_page(text, self.max_chars, self.max_tokens) + offset).tolist()
+
+    def finish(self) -> list:
+        """페이지를 넘는 청크가 없으므로 남은 경계 없음"""
+        return []
+
+
+def make_chunker(chunk_mode: str = "words", chunk_size: int = 200, overlap: int = 50,
+                 max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None):
+    """청킹 방식에 맞는 점진 청커"""
+    if chunk_mode == "sentence":
+        return SentenceChunker(max_chars)
+    if chunk_mode == "tokens":
+        return SentenceChunker(max_chars, max_tokens)
+    return IncrementalChunker(chunk_size, overlap)
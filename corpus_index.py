@@ -0,0 +1,496 @@
+"""기억된 PDF 전체에 대한 전역 청크 인덱스 (BM25 + 벡터, 청크마다 문서 번호) + 문장 인덱스 + 주제어 문서 빈도표"""
+import threading
+from array import array
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from chunking import ChunkView, sentence_spans
+from retrieval import BM25Index, HybridRetriever, IVFVectorIndex, RetrievalCache, hashed_embeddings
+from topics import DocumentFrequencyTable, topic_counts
+
+# 삭제 표시된 청크가 전체의 이 비율(그리고 최소 개수)을 넘으면 백그라운드에서 압축
+COMPACT_TOMBSTONE_RATIO = 0.25
+COMPACT_MIN_TOMBSTONES = 256
+
+# "어떤 PDF" 조회에서 문서마다 돌려주는 문장 수와 문장 인덱스에 넣는 문장의 최대 길이
+SENTENCES_PER_DOCUMENT = 2
+MAX_SENTENCE_CHARS = 300
+
+# "공통 주제" 질문에 보여 줄 주제어 수
+COMMON_TOPIC_COUNT = 10
+
+# 검색이 한 번에 읽어 가는 구성 요소 (교체할 때 통째로 바꿈)
+_State = namedtuple("_State", [
+    "lexical", "vectors", "chunk_doc", "chunk_local",
+    "sentences", "sentence_doc", "sentence_start", "sentence_end", "docs",
+])
+
+
+def _remap_rows(rows: array, remap: np.ndarray) -> array:
+    """행 번호 array를 압축 후 번호로"""
+    return array("i", remap[np.array(rows, dtype=np.int64)].astype(np.int32).tobytes())
+
+
+def _rows_by_doc(row_doc) -> dict:
+    """행별 문서 번호 -> {문서 번호: 행 번호 array} (삭제 표시된 행 제외, 스냅샷을 불러올 때 한 번)"""
+    row_doc = np.asarray(row_doc, dtype=np.int32)
+    order = np.argsort(row_doc, kind="stable").astype(np.int32)
+    doc_ids, starts = np.unique(row_doc[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    return {
+        doc_id: array("i", order[start:end].tobytes())
+        for doc_id, start, end in zip(doc_ids.tolist(), starts.tolist(), ends.tolist()) if doc_id >= 0
+    }
+
+
+class CorpusIndex:
+    """모든 기억 항목의 청크를 전역 번호로 색인 - 검색 결과는 (문서 번호, 문서 내 청크 번호)로 돌려줌
+
+    기억 항목은 add_document로 등록하고, 수집 중에 청크가 늘면 sync로 새 청크만 색인한다.
+    수집이 끝난 페이지는 문장으로 나누어 문장 BM25 인덱스에도 넣고 ("어떤 PDF" 조회용),
+    주제어 횟수를 문서 빈도표에 더한다 ("공통 주제" 조회용).
+    문서마다 자기 청크/문장의 전역 행 번호를 들고 있어, remove_document는 그 행에만 삭제 표시를 하므로
+    바뀐 문서 크기에만 비례한다. 삭제 표시가 쌓이면 백그라운드 스레드가 잠금 밖에서 살아 있는 항목만으로
+    인덱스를 다시 만들고, 그동안 바뀐 부분만 잠금 안에서 반영해 바꿔 끼운다.
+    검색 결과는 색인 버전을 키에 넣어 캐시하므로 문서가 추가/삭제되거나 청크가 늘면 자동으로 무효가 된다.
+    """
+
+    def __init__(self):
+        self.next_doc_id = 0
+        self.version = 0  # 검색 결과가 바뀔 수 있을 때마다 증가
+        self.cache = RetrievalCache()
+        self.compacting = False
+        self._generation = 0  # 압축/초기화마다 증가 (그 전에 시작한 압축 결과는 버림)
+        self._compaction = None  # 진행 중인 압축이 시작한 뒤 삭제 표시한 행 {"chunks", "sentences"}
+        self._lock = threading.RLock()
+        self._reset()
+
+    def __len__(self) -> int:
+        """삭제 표시된 청크를 포함한 전역 청크 수"""
+        return len(self.chunk_doc)
+
+    def _reset(self):
+        self._publish(_State(
+            BM25Index(), IVFVectorIndex(), array("i"), array("i"),
+            BM25Index(), array("i"), array("q"), array("q"), {},
+        ))
+        self.tombstones = 0
+        self.topics = DocumentFrequencyTable()  # 압축과 무관해 _State 밖에 둠
+        self._generation += 1
+
+    def _publish(self, state: _State):
+        """구성 요소 교체 - 검색은 잠금 없이 _state 하나만 읽으므로 압축 중에도 막히지 않음"""
+        self.lexical = state.lexical
+        self.vectors = state.vectors
+        self.chunk_doc = state.chunk_doc      # 전역 청크 번호 -> 문서 번호 (삭제 표시된 청크는 -1)
+        self.chunk_local = state.chunk_local  # 전역 청크 번호 -> 문서 내 청크 번호
+        self.sentences = state.sentences      # 문장 BM25 인덱스
+        self.sentence_doc = state.sentence_doc      # 문장 번호 -> 문서 번호 (삭제 표시된 문장은 -1)
+        self.sentence_start = state.sentence_start  # 문장 번호 -> 문서 저장소 안 시작/끝 문자 오프셋
+        self.sentence_end = state.sentence_end
+        # {문서 번호: {"name", "entry", "indexed": 색인한 청크 수, "pages": 문장 색인한 페이지 수,
+        #             "chunk_rows", "sentence_rows": 그 문서의 살아 있는 전역 행 번호 array}}
+        self.docs = state.docs
+        self._state = state
+
+    def add_document(self, name: str, entry: dict) -> int:
+        """기억 항목 등록 후 지금까지의 청크 색인 - 문서 번호 반환"""
+        with self._lock:
+            doc_id = self.next_doc_id
+            self.next_doc_id += 1
+            self.docs[doc_id] = {
+                "name": name, "entry": entry, "indexed": 0, "pages": 0,
+                "chunk_rows": array("i"), "sentence_rows": array("i"),
+            }
+            entry["doc_id"] = doc_id
+            entry["corpus"] = self
+            self.version += 1
+            self.sync(entry)
+        return doc_id
+
+    def sync(self, entry: dict):
+        """항목에서 아직 색인하지 않은 청크와 끝난 페이지의 문장만 색인 (수집 스레드에서 청크가 늘 때마다 호출)"""
+        with self._lock:
+            doc = self.docs.get(entry.get("doc_id"))
+            if doc is None or doc["entry"] is not entry:
+                return
+            changed = self._sync_sentences(entry, doc)
+            start = doc["indexed"]
+            new_bounds = entry["chunk_bounds"][start:]
+            if len(new_bounds):
+                texts = list(ChunkView(entry["store"], new_bounds))
+                vectors = hashed_embeddings(texts)
+                # 번호 표를 먼저 늘려 검색 결과의 전역 번호가 항상 표 안에 있게 함
+                first_row = len(self.chunk_doc)
+                doc["chunk_rows"].extend(range(first_row, first_row + len(texts)))
+                self.chunk_doc.extend([entry["doc_id"]] * len(texts))
+                self.chunk_local.extend(range(start, start + len(texts)))
+                self.lexical.add_many(texts)
+                self.vectors.add_vectors(vectors)
+                doc["indexed"] = start + len(texts)
+                changed = True
+            if changed:
+                self.version += 1
+
+    def _sync_sentences(self, entry: dict, doc: dict) -> bool:
+        """새로 끝난 페이지를 문장으로 나누어 문장 인덱스에 추가하고 주제어 횟수를 빈도표에 반영 - 바뀌었으면 True
+
+        수집 중인 문서는 지금까지의 주제어 횟수를 doc["topic_counts"]에 들고 있다가 마지막 페이지에서 버린다.
+        """
+        page_offsets = entry["page_offsets"]
+        pages_done = len(page_offsets) - 1
+        if pages_done <= doc["pages"]:
+            return False
+        store = entry["store"]
+        starts, ends, texts = [], [], []
+        page_counts = Counter()
+        for page in range(doc["pages"], pages_done):
+            page_start = int(page_offsets[page])
+            page_text = store[page_start:int(page_offsets[page + 1])]
+            page_counts.update(topic_counts(page_text))
+            for start, end in sentence_spans(page_text, MAX_SENTENCE_CHARS).tolist():
+                starts.append(page_start + start)
+                ends.append(page_start + end)
+                texts.append(" ".join(page_text[start:end].split()))
+        first_row = len(self.sentence_doc)
+        doc["sentence_rows"].extend(range(first_row, first_row + len(texts)))
+        self.sentence_doc.extend([entry["doc_id"]] * len(texts))
+        self.sentence_start.extend(starts)
+        self.sentence_end.extend(ends)
+        self.sentences.add_many(texts)
+        doc["pages"] = pages_done
+        counts = doc.setdefault("topic_counts", Counter())
+        old_counts = {term: counts[term] for term in page_counts if term in counts}
+        counts.update(page_counts)
+        self.topics.update(old_counts, {term: counts[term] for term in page_counts})
+        if entry.get("page_count") and pages_done >= entry["page_count"]:
+            del doc["topic_counts"]
+        return bool(texts) or bool(page_counts)
+
+    def _document_topic_counts(self, entry: dict, doc: dict) -> Counter:
+        """문서가 빈도표에 더한 주제어 횟수 (수집이 끝난 문서는 저장소 텍스트에서 다시 셈)"""
+        if "topic_counts" in doc:
+            return doc["topic_counts"]
+        page_offsets = entry["page_offsets"]
+        counts = Counter()
+        for page in range(doc["pages"]):
+            counts.update(topic_counts(entry["store"][int(page_offsets[page]):int(page_offsets[page + 1])]))
+        return counts
+
+    def remove_document(self, entry: dict):
+        """항목의 청크와 문장에 삭제 표시하고 주제어 횟수를 빈도표에서 빼 문서 제거 (수집 중이던 스레드의 이후 sync는 무시됨)
+
+        주제어 횟수를 저장소 텍스트에서 다시 세므로 저장소를 닫기 전에 호출해야 한다.
+        """
+        with self._lock:
+            doc_id = entry.get("doc_id")
+            doc = self.docs.get(doc_id)
+            if doc is None or doc["entry"] is not entry:
+                return
+            self._delete_chunks(doc)
+            self._delete_sentence_rows(np.array(doc["sentence_rows"], dtype=np.int64))
+            doc["sentence_rows"] = array("i")
+            self.topics.remove(self._document_topic_counts(entry, doc))
+            del self.docs[doc_id]
+            self.version += 1
+            self._maybe_compact()
+
+    def _delete_chunks(self, doc: dict):
+        """문서의 청크 행에만 삭제 표시 (잠금을 잡은 상태에서 호출)"""
+        self._delete_chunk_rows(np.array(doc["chunk_rows"], dtype=np.int64))
+        doc["chunk_rows"] = array("i")
+
+    def _delete_chunk_rows(self, rows: np.ndarray):
+        """청크 행에 삭제 표시 (잠금을 잡은 상태에서 호출, 진행 중인 압축이 있으면 기록)"""
+        if not len(rows):
+            return
+        self.lexical.delete(rows.tolist())
+        self.vectors.delete(rows)
+        for row in rows.tolist():
+            self.chunk_doc[row] = -1
+        self.tombstones += len(rows)
+        if self._compaction is not None:
+            self._compaction["chunks"].extend(rows.tolist())
+
+    def _delete_sentence_rows(self, rows: np.ndarray):
+        """문장 행에 삭제 표시 (잠금을 잡은 상태에서 호출, 진행 중인 압축이 있으면 기록)"""
+        if not len(rows):
+            return
+        self.sentences.delete(rows.tolist())
+        for row in rows.tolist():
+            self.sentence_doc[row] = -1
+        if self._compaction is not None:
+            self._compaction["sentences"].extend(rows.tolist())
+
+    def reindex_document(self, entry: dict):
+        """청크가 바뀐 항목의 청크만 다시 색인 (이전 청크는 삭제 표시)
+
+        문장 인덱스와 주제어 빈도표는 청크 설정과 무관하므로 그대로 두고 문서 번호도 유지한다.
+        """
+        with self._lock:
+            doc = self.docs.get(entry.get("doc_id"))
+            if doc is None or doc["entry"] is not entry:
+                return
+            self._delete_chunks(doc)
+            doc["indexed"] = 0
+            self.version += 1
+            self.sync(entry)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        """삭제 표시가 임계값을 넘으면 백그라운드 압축 시작 (잠금을 잡은 상태에서 호출)"""
+        threshold = max(COMPACT_MIN_TOMBSTONES, COMPACT_TOMBSTONE_RATIO * len(self.chunk_doc))
+        if self.compacting or self.tombstones < threshold:
+            return
+        self.compacting = True
+        threading.Thread(target=self.compact, name="corpus-compact", daemon=True).start()
+
+    def compact(self):
+        """삭제 표시된 청크와 문장을 뺀 인덱스로 교체 (문서 내 번호와 오프셋은 그대로라 검색 결과와 캐시는 유지)
+
+        잠금은 시작할 때 번호 표를 복사하는 동안과 끝에 교체하는 동안만 잡는다. 다시 만드는 동안 추가된
+        청크/문장과 새로 삭제 표시된 행은 교체할 때 그만큼만 반영하므로, 그동안에도 수집, 검색, 저장이 계속된다.
+        """
+        with self._lock:
+            generation = self._generation
+            compaction = self._compaction = {"chunks": array("i"), "sentences": array("i")}
+            self.compacting = True
+            state = self._state
+            chunk_doc = np.array(state.chunk_doc, dtype=np.int32)
+            chunk_local = np.array(state.chunk_local, dtype=np.int32)
+            sentence_doc = np.array(state.sentence_doc, dtype=np.int32)
+            sentence_start = np.array(state.sentence_start, dtype=np.int64)
+            sentence_end = np.array(state.sentence_end, dtype=np.int64)
+        try:
+            rows = np.flatnonzero(chunk_doc >= 0)
+            sentence_rows = np.flatnonzero(sentence_doc >= 0)
+            lexical = state.lexical.compacted(rows)
+            vectors = state.vectors.compacted(rows)
+            sentences = state.sentences.compacted(sentence_rows)
+            with self._lock:
+                if self._generation != generation:
+                    return  # 그사이 초기화되었거나 다른 압축이 먼저 교체함
+                self._swap_compacted(
+                    compaction, rows, len(chunk_doc), sentence_rows, len(sentence_doc),
+                    _State(
+                        lexical, vectors, chunk_doc[rows], chunk_local[rows], sentences,
+                        sentence_doc[sentence_rows], sentence_start[sentence_rows], sentence_end[sentence_rows],
+                        self.docs,
+                    ),
+                )
+        finally:
+            with self._lock:
+                if self._compaction is compaction:
+                    self._compaction = None
+                    self.compacting = False
+
+    def _swap_compacted(self, compaction: dict, rows: np.ndarray, chunk_count: int,
+                        sentence_rows: np.ndarray, sentence_count: int, built: _State):
+        """압축을 시작한 뒤의 추가/삭제를 새 구성 요소에 반영하고 교체 (잠금을 잡은 상태에서 호출)
+
+        built는 시작할 때 살아 있던 행(rows, sentence_rows)만으로 만든 구성 요소이며 번호 표는 numpy 배열이다.
+        """
+        self._generation += 1
+
+        # 시작 뒤에 추가되어 아직 살아 있는 청크 - 텍스트는 항목에서, 벡터는 기존 행렬에서 가져옴
+        chunk_doc = np.array(self.chunk_doc, dtype=np.int32)
+        chunk_local = np.array(self.chunk_local, dtype=np.int32)
+        added = chunk_count + np.flatnonzero(chunk_doc[chunk_count:] >= 0)
+        remap = np.full(len(chunk_doc), -1, dtype=np.int64)
+        remap[rows] = np.arange(len(rows))
+        remap[added] = len(rows) + np.arange(len(added))
+        if len(added):
+            built.lexical.add_many(
+                ChunkView(self.docs[doc_id]["entry"]["store"], self.docs[doc_id]["entry"]["chunk_bounds"])[local]
+                for doc_id, local in zip(chunk_doc[added].tolist(), chunk_local[added].tolist())
+            )
+            built.vectors.add_vectors(self.vectors.matrix[added])
+        new_chunk_doc = np.concatenate((built.chunk_doc, chunk_doc[added]))
+        # 시작 뒤에 삭제 표시된 청크는 새 인덱스에서도 삭제 표시
+        deleted = remap[np.array(compaction["chunks"], dtype=np.int64)]
+        deleted = deleted[deleted >= 0]
+        built.lexical.delete(deleted.tolist())
+        built.vectors.delete(deleted)
+        new_chunk_doc[deleted] = -1
+
+        # 문장도 같은 방식
+        sentence_doc = np.array(self.sentence_doc, dtype=np.int32)
+        sentence_start = np.array(self.sentence_start, dtype=np.int64)
+        sentence_end = np.array(self.sentence_end, dtype=np.int64)
+        added_sentences = sentence_count + np.flatnonzero(sentence_doc[sentence_count:] >= 0)
+        sentence_remap = np.full(len(sentence_doc), -1, dtype=np.int64)
+        sentence_remap[sentence_rows] = np.arange(len(sentence_rows))
+        sentence_remap[added_sentences] = len(sentence_rows) + np.arange(len(added_sentences))
+        built.sentences.add_many(
+            " ".join(self.docs[doc_id]["entry"]["store"][start:end].split())
+            for doc_id, start, end in zip(
+                sentence_doc[added_sentences].tolist(),
+                sentence_start[added_sentences].tolist(),
+                sentence_end[added_sentences].tolist(),
+            )
+        )
+        new_sentence_doc = np.concatenate((built.sentence_doc, sentence_doc[added_sentences]))
+        deleted_sentences = sentence_remap[np.array(compaction["sentences"], dtype=np.int64)]
+        deleted_sentences = deleted_sentences[deleted_sentences >= 0]
+        built.sentences.delete(deleted_sentences.tolist())
+        new_sentence_doc[deleted_sentences] = -1
+
+        for doc in self.docs.values():
+            doc["chunk_rows"] = _remap_rows(doc["chunk_rows"], remap)
+            doc["sentence_rows"] = _remap_rows(doc["sentence_rows"], sentence_remap)
+        self._publish(_State(
+            built.lexical,
+            built.vectors,
+            array("i", new_chunk_doc.tobytes()),
+            array("i", np.concatenate((built.chunk_local, chunk_local[added])).tobytes()),
+            built.sentences,
+            array("i", new_sentence_doc.tobytes()),
+            array("q", np.concatenate((built.sentence_start, sentence_start[added_sentences])).tobytes()),
+            array("q", np.concatenate((built.sentence_end, sentence_end[added_sentences])).tobytes()),
+            self.docs,
+        ))
+        self.tombstones = len(deleted)
+
+    def rebuild(self, memory: dict):
+        """기억 항목 전체로 처음부터 다시 색인"""
+        with self._lock:
+            self._reset()
+            for name, entry in memory.items():
+                self.add_document(name, entry)
+            self.version += 1
+
+    def export_arrays(self) -> tuple:
+        """스냅샷용 평면 배열과 값 - ({이름: 배열}, {이름: 값}) (삭제 표시가 있으면 먼저 압축)
+
+        잠금을 잡은 채로 호출해야 저장하는 동안 청크가 늘지 않는다.
+        """
+        with self._lock:
+            if self.tombstones or self.sentences.tombstones:
+                self.compact()
+            lexical_arrays, lexical_values = self.lexical.export_arrays()
+            vector_arrays, vector_values = self.vectors.export_arrays()
+            sentence_arrays, sentence_values = self.sentences.export_arrays()
+            topic_arrays = self.topics.export_arrays()
+            arrays = {
+                "chunk_doc": np.array(self.chunk_doc, dtype=np.int32),
+                "chunk_local": np.array(self.chunk_local, dtype=np.int32),
+                "sentence_doc": np.array(self.sentence_doc, dtype=np.int32),
+                "sentence_start": np.array(self.sentence_start, dtype=np.int64),
+                "sentence_end": np.array(self.sentence_end, dtype=np.int64),
+                **{f"bm25.{name}": value for name, value in lexical_arrays.items()},
+                **{f"vector.{name}": value for name, value in vector_arrays.items()},
+                **{f"sentence.{name}": value for name, value in sentence_arrays.items()},
+                **{f"topic.{name}": value for name, value in topic_arrays.items()},
+            }
+            return arrays, {"bm25": lexical_values, "vector": vector_values, "sentence": sentence_values}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, values: dict, documents: dict) -> "CorpusIndex":
+        """export_arrays 결과와 {문서 번호: (이름, 기억 항목)}으로 인덱스 복원 (배열은 mmap 그대로)"""
+        index = cls()
+        chunk_rows = _rows_by_doc(arrays["chunk_doc"])
+        sentence_rows = _rows_by_doc(arrays["sentence_doc"])
+        docs = {}
+        for doc_id, (name, entry) in documents.items():
+            docs[doc_id] = {
+                "name": name, "entry": entry,
+                "indexed": len(entry["chunk_bounds"]), "pages": len(entry["page_offsets"]) - 1,
+                "chunk_rows": chunk_rows.pop(doc_id, array("i")),
+                "sentence_rows": sentence_rows.pop(doc_id, array("i")),
+            }
+            entry["doc_id"] = doc_id
+            entry["corpus"] = index
+
+        def section(prefix):
+            return {name[len(prefix):]: value for name, value in arrays.items() if name.startswith(prefix)}
+
+        def copied(name, typecode):
+            return array(typecode, np.ascontiguousarray(arrays[name]).tobytes())
+
+        index._publish(_State(
+            BM25Index.from_arrays(section("bm25."), values["bm25"]),
+            IVFVectorIndex.from_arrays(section("vector."), values["vector"]),
+            copied("chunk_doc", "i"),
+            copied("chunk_local", "i"),
+            BM25Index.from_arrays(section("sentence."), values["sentence"]),
+            copied("sentence_doc", "i"),
+            copied("sentence_start", "q"),
+            copied("sentence_end", "q"),
+            docs,
+        ))
+        index.topics = DocumentFrequencyTable.from_arrays(section("topic."))
+        index.next_doc_id = max(docs, default=-1) + 1
+        # 문서 목록에 남지 않은 행은 스냅샷에서 뺀 오류 항목의 것이므로 삭제 표시
+        for rows in chunk_rows.values():
+            index._delete_chunk_rows(np.array(rows, dtype=np.int64))
+        for rows in sentence_rows.values():
+            index._delete_sentence_rows(np.array(rows, dtype=np.int64))
+        return index
+
+    def stats(self) -> dict:
+        """{"documents", "chunks", "sentences", "topic_terms", "tombstones", "compacting"}
+
+        잠금 없이 카운터만 읽으므로 압축 중에도 바로 돌아온다 (값은 잠깐 어긋날 수 있음).
+        """
+        state = self._state
+        return {
+            "documents": len(state.docs),
+            "chunks": len(state.chunk_doc) - self.tombstones,
+            "sentences": len(state.sentence_doc) - state.sentences.tombstones,
+            "topic_terms": len(self.topics),
+            "tombstones": self.tombstones,
+            "compacting": self.compacting,
+        }
+
+    def _snapshot(self) -> tuple:
+        """검색에 쓸 버전과 구성 요소 (교체돼도 번호가 서로 맞도록 한 번에 가져옴)"""
+        return self.version, self._state
+
+    def search(self, query: str, top_k: int = 3, nprobe: int = None) -> list:
+        """어휘+벡터 RRF 상위 청크 - [{"doc_id", "name", "chunk_id", "score", "bm25", "vector", ...}] (캐시됨)"""
+        version, state = self._snapshot()
+        return self.cache.get_or_compute(
+            version, query, ("hybrid", top_k, nprobe), lambda: self._search(query, top_k, nprobe, state)
+        )
+
+    @staticmethod
+    def _search(query, top_k, nprobe, state) -> list:
+        hits = []
+        for hit in HybridRetriever(state.lexical, state.vectors).search(query, top_k, nprobe):
+            global_id = hit["chunk_id"]
+            doc_id = state.chunk_doc[global_id]
+            doc = state.docs.get(doc_id)
+            if doc is not None:
+                hits.append({**hit, "chunk_id": state.chunk_local[global_id], "doc_id": doc_id, "name": doc["name"]})
+        return hits
+
+    def best_sentences_per_document(self, query: str, per_document: int = SENTENCES_PER_DOCUMENT) -> list:
+        """문장 포스팅으로 찾은 문서별 상위 문장 - [(문서 번호, [(시작, 끝, 점수)])], 문서는 최고 문장 점수 순 (캐시됨)"""
+        version, state = self._snapshot()
+        return self.cache.get_or_compute(
+            version, query, ("sentences", per_document),
+            lambda: self._best_sentences_per_document(query, per_document, state),
+        )
+
+    @staticmethod
+    def _best_sentences_per_document(query, per_document, state) -> list:
+        best = {}
+        for sentence_id, score in state.sentences.search(query, len(state.sentences)):
+            doc_id = state.sentence_doc[sentence_id]
+            if doc_id not in state.docs:
+                continue
+            sentences = best.setdefault(doc_id, [])
+            if len(sentences) < per_document:
+                sentences.append((state.sentence_start[sentence_id], state.sentence_end[sentence_id], score))
+        return list(best.items())
+
+    def common_topics(self, top_n: int = COMMON_TOPIC_COUNT) -> list:
+        """여러 문서에 걸쳐 나오는 주제어 - [(주제어, 문서 수, 점수)] (문서 빈도표에서 바로, 캐시됨)
+
+        빈도표 자체 잠금만 쓰므로 압축 중에도 막히지 않는다.
+        """
+        version, state = self._snapshot()
+        return self.cache.get_or_compute(
+            version, "", ("topics", top_n), lambda: self.topics.common_terms(len(state.docs), top_n)
+        )
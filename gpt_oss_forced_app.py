@@ -1,6 +1,5 @@
 import os
 import streamlit as st
-from PyPDF2 import PdfReader
 import numpy as np
 import time
 import re
@@ -11,6 +10,10 @@ import json
 from typing import Dict, List, Optional
 import base64
 from io import BytesIO
+from pdf_pipeline import extract_pages, pages_to_text
+from chunking import ChunkView, chunk_bounds
+from retrieval import BM25Index, VectorIndex, HybridRetriever, describe_hit
+from pdf_cache import pdf_hash
 
 # 페이지 설정
 st.set_page_config(
@@ -54,6 +57,8 @@ if "business_cards" not in st.session_state:
     st.session_state.business_cards = load_data_from_file(BUSINESS_CARDS_FILE, [])
 if "pdf_docs" not in st.session_state:
     st.session_state.pdf_docs = None
+if "pdf_retriever" not in st.session_state:
+    st.session_state.pdf_retriever = None
 if "conversation_history" not in st.session_state:
     st.session_state.conversation_history = load_data_from_file(CONVERSATION_FILE, [])
 
@@ -325,43 +330,22 @@ def structure_business_card_info(raw_text):
     except Exception as e:
         return {"error": str(e), "raw_text": raw_text}
 
-def read_pdf(file) -> str:
-    """PDF 읽기"""
-    text = ""
-    reader = PdfReader(file)
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-    return text
-
-def chunk_text(text: str, chunk_size: int = 200, overlap: int = 50):
-    """텍스트 청킹"""
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        chunk = " ".join(words[start : start + chunk_size])
-        chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks
-
-def get_context(question: str, docs: list) -> str:
-    """컨텍스트 생성"""
-    if not docs:
-        return ""
-    
-    # 간단한 키워드 매칭
-    question_words = set(question.lower().split())
-    best_chunks = []
-    
-    for i, doc in enumerate(docs[:5]):
-        doc_words = set(doc.lower().split())
-        overlap = len(question_words.intersection(doc_words))
-        if overlap > 0:
-            best_chunks.append(doc)
-    
-    return "\n\n".join(best_chunks[:3]) if best_chunks else docs[0] if docs else ""
+def read_pdf(file, mode: str = "auto", ocr: bool = True) -> str:
+    """PDF 읽기 (페이지가 많으면 자동으로 병렬 추출, 스캔 페이지는 OCR)"""
+    return pages_to_text(extract_pages(file, mode, ocr=ocr)["pages"])
+
+def chunk_text(text: str, chunk_size: int = 200, overlap: int = 50) -> ChunkView:
+    """텍스트 청킹 (원문 오프셋만 보관, 청크 문자열은 꺼낼 때 생성)"""
+    return ChunkView(text, chunk_bounds(text, chunk_size, overlap))
+
+def get_context(question: str, docs, retriever, top_k: int = 3) -> tuple:
+    """컨텍스트 생성 (어휘+벡터 하이브리드 검색) - (컨텍스트, 소스별 점수가 든 검색 결과)"""
+    if not docs or retriever is None:
+        return "", []
+    hits = retriever.search(question, top_k)
+    if not hits:
+        return docs[0], []
+    return "\n\n".join(docs[hit["chunk_id"]] for hit in hits), hits
 
 def generate_answer(question: str, context: str) -> str:
     """GPT-OSS를 사용한 답변 생성"""
@@ -537,16 +521,23 @@ uploaded_pdf = st.file_uploader(
 )
 
 if uploaded_pdf is not None:
-    with st.spinner("PDF를 처리하고 있습니다..."):
-        pdf_text = read_pdf(uploaded_pdf)
-        if pdf_text:
-            chunks = chunk_text(pdf_text)
-            st.session_state.pdf_docs = chunks
-            st.success(f"✅ PDF 처리 완료! {len(chunks)}개 청크 생성")
-            
-            # PDF 내용 미리보기
-            with st.expander("📖 PDF 내용 미리보기"):
-                st.text_area("PDF 내용", pdf_text[:1000] + "...", height=200, disabled=True)
+    # 질문할 때마다 스크립트가 다시 실행되므로 같은 파일이면 추출/색인을 다시 하지 않음
+    pdf_digest = pdf_hash(uploaded_pdf.getvalue())
+    if st.session_state.get("pdf_digest") != pdf_digest:
+        with st.spinner("PDF를 처리하고 있습니다..."):
+            pdf_text = read_pdf(uploaded_pdf)
+            if pdf_text:
+                chunks = chunk_text(pdf_text)
+                st.session_state.pdf_docs = chunks
+                st.session_state.pdf_retriever = HybridRetriever(BM25Index.from_chunks(chunks), VectorIndex.from_chunks(chunks))
+                st.session_state.pdf_preview = pdf_text[:1000]
+                st.session_state.pdf_digest = pdf_digest
+                st.success(f"✅ PDF 처리 완료! {len(chunks)}개 청크 생성")
+    
+    if st.session_state.get("pdf_digest") == pdf_digest:
+        # PDF 내용 미리보기
+        with st.expander("📖 PDF 내용 미리보기"):
+            st.text_area("PDF 내용", st.session_state.pdf_preview + "...", height=200, disabled=True)
 
 # 질문 입력
 if st.session_state.pdf_docs:
@@ -561,7 +552,7 @@ if st.session_state.pdf_docs:
     if st.button("🤖 AI 답변 생성", type="primary", key="pdf_button") and question:
         with st.spinner("AI가 답변을 생성하고 있습니다..."):
             # 컨텍스트 생성
-            context = get_context(question, st.session_state.pdf_docs)
+            context, hits = get_context(question, st.session_state.pdf_docs, st.session_state.pdf_retriever)
             
             # GPT-OSS 답변 생성
             answer = generate_answer(question, context)
@@ -586,6 +577,8 @@ if st.session_state.pdf_docs:
             
             if context:
                 with st.expander("📄 사용된 컨텍스트"):
+                    for hit in hits:
+                        st.caption(describe_hit(hit))
                     st.text(context)
             
             st.markdown('</div>', unsafe_allow_html=True)
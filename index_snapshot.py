@@ -0,0 +1,356 @@
+"""기억된 PDF와 전역 인덱스의 디스크 스냅샷 (버전별 .npy 평면 배열 + manifest.json, mmap으로 불러옴)
+
+    SNAPSHOT_DIR/
+        CURRENT              최신 스냅샷 디렉터리 이름
+        LOCK                 새 버전을 쓰는 프로세스가 잡는 파일 잠금
+        texts/<이름>.u32      문서 텍스트 (PageStore 형식, 버전 사이에 공유)
+        leases/<pid>.json    그 프로세스가 불러와 열어 둔 텍스트 파일 이름 (정리할 때 지우지 않음)
+        v000001/manifest.json, <배열 이름>.npy
+
+새 워커는 배열을 mmap으로 열기만 하므로 재파싱/재색인 없이 바로 검색할 수 있다.
+여러 세션이 같은 디렉터리를 쓰므로 세션은 merge_snapshot으로 새로 올린 PDF만 최신 버전에 더하고
+(세션에서의 삭제/초기화는 스냅샷에 반영하지 않음), 새 버전은 LOCK 파일 잠금 안에서만 쓴다.
+다른 프로세스가 아직 열어 둔 텍스트는 최근 버전에 없어도 남긴다.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# 프로세스 사이 쓰기 잠금 (POSIX) - 없으면 프로세스 안의 스레드 잠금만 씀
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import numpy as np
+
+from corpus_index import CorpusIndex
+from page_store import PageStore
+from pdf_pipeline import is_ingesting
+
+# 스냅샷 위치, 형식 버전(배열 구성이 바뀌면 올림), 남겨 둘 이전 버전 수
+SNAPSHOT_DIR = os.path.join("app_data", "index_snapshot")
+SNAPSHOT_FORMAT = 3
+SNAPSHOT_KEEP = 3
+
+# 기억 항목에서 manifest에 그대로 적는 값
+_ENTRY_FIELDS = ("upload_time", "size", "page_count", "pages_done", "hash", "chunk_key", "metadata")
+
+# 저장은 한 번에 하나씩 백그라운드에서
+_save_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-snapshot")
+_save_lock = threading.Lock()
+
+# 스냅샷에 넣을 때 세션 항목에서 빼는 값 (세션의 전역 인덱스 연결과 이전 청크 설정)
+_SESSION_FIELDS = ("corpus", "doc_id", "chunk_variants", "chunk_tokens")
+
+# 이 프로세스가 불러온 텍스트 파일 이름 (leases/<pid>.json에 기록)
+_leased_texts = set()
+_lease_lock = threading.Lock()
+
+
+def _current_name(snapshot_dir: str):
+    try:
+        with open(os.path.join(snapshot_dir, "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_atomic(path: str, data: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _writer_lock(snapshot_dir: str):
+    """새 버전 쓰기 잠금 - 버전 번호를 고르고 CURRENT를 바꾸고 정리하는 동안 다른 프로세스/스레드를 막음"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with _save_lock, open(os.path.join(snapshot_dir, "LOCK"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # 파일을 닫으면 풀림
+        yield
+
+
+def _link_text(store_path: str, texts_dir: str) -> str:
+    """문서 텍스트를 공유 texts 디렉터리에 두기 (이미 있으면 그대로, 가능하면 하드 링크) - 파일 이름 반환"""
+    name = os.path.basename(store_path)
+    path = os.path.join(texts_dir, name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.link(store_path, tmp_path)
+        except OSError:
+            shutil.copyfile(store_path, tmp_path)
+        os.replace(tmp_path, path)
+    return name
+
+
+def save_snapshot(corpus: CorpusIndex, memory: dict, snapshot_dir: str = SNAPSHOT_DIR):
+    """corpus와 memory 전체를 새 버전으로 저장 - 저장한 디렉터리 이름 반환 (수집 중인 PDF가 있으면 None)
+
+    최신 버전의 내용을 그대로 바꾸므로, 다른 세션과 함께 쓰는 디렉터리에는 merge_snapshot을 쓴다.
+    """
+    with _writer_lock(snapshot_dir):
+        name = _write_snapshot(corpus, memory, snapshot_dir)
+        prune_snapshots(snapshot_dir)
+    return name
+
+
+def _write_snapshot(corpus: CorpusIndex, memory: dict, snapshot_dir: str):
+    """새 버전 디렉터리를 쓰고 CURRENT를 바꿈 (쓰기 잠금을 잡은 상태에서 호출)
+
+    수집이 오류로 끝난 PDF는 스냅샷에서 빼고 (불러올 때 그 청크는 삭제 표시됨) 나머지만 저장한다.
+
+    전역 인덱스 잠금은 배열을 내보내 복사하는 동안만 잡고, 파일 쓰기는 잠금을 푼 뒤에 하므로
+    저장하는 동안에도 검색과 수집이 멈추지 않는다.
+    """
+    with corpus._lock:
+        if any(map(is_ingesting, memory.values())):
+            return None
+        memory = {name: entry for name, entry in memory.items() if entry.get("status") == "done"}
+        arrays, values = corpus.export_arrays()
+        # 살아 있는 인덱스와 메모리를 공유하는 배열(벡터 행렬 등)은 잠금을 풀기 전에 복사
+        arrays = {array_name: np.array(value) for array_name, value in arrays.items()}
+        bounds, page_offsets, documents = [], [], []
+        chunk_start = page_start = 0
+        for name, entry in memory.items():
+            entry_bounds = np.array(entry["chunk_bounds"], dtype=np.int64).reshape(-1, 2)
+            entry_pages = np.array(entry["page_offsets"], dtype=np.int64)
+            documents.append({
+                "doc_id": entry["doc_id"],
+                "name": name,
+                "text": entry["store"].path,
+                "text_length": len(entry["store"]),
+                "chunks": [chunk_start, chunk_start + len(entry_bounds)],
+                "pages": [page_start, page_start + len(entry_pages)],
+                **{field: entry.get(field) for field in _ENTRY_FIELDS},
+            })
+            bounds.append(entry_bounds)
+            page_offsets.append(entry_pages)
+            chunk_start += len(entry_bounds)
+            page_start += len(entry_pages)
+    arrays["chunk_bounds"] = np.concatenate(bounds) if bounds else np.zeros((0, 2), dtype=np.int64)
+    arrays["page_offsets"] = np.concatenate(page_offsets) if page_offsets else np.zeros(0, dtype=np.int64)
+
+    texts_dir = os.path.join(snapshot_dir, "texts")
+    os.makedirs(texts_dir, exist_ok=True)
+    for doc in documents:
+        doc["text"] = _link_text(doc["text"], texts_dir)
+
+    current = _current_name(snapshot_dir)
+    version = int(current[1:]) + 1 if current else 1
+    name = f"v{version:06d}"
+    tmp_dir = os.path.join(snapshot_dir, f"{name}.{os.getpid()}.tmp")
+    os.makedirs(tmp_dir)
+    for array_name, value in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{array_name}.npy"), np.ascontiguousarray(value))
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "arrays": sorted(arrays),
+        "index": values,
+        "documents": documents,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_dir, os.path.join(snapshot_dir, name))
+    _write_atomic(os.path.join(snapshot_dir, "CURRENT"), name)
+    return name
+
+
+def snapshot_documents(snapshot_dir: str = SNAPSHOT_DIR) -> tuple:
+    """최신 스냅샷에 있는 PDF의 (이름 집합, 내용 해시 집합) - 배열은 읽지 않음"""
+    name = _current_name(snapshot_dir)
+    manifest = _read_manifest(snapshot_dir, name) if name else None
+    if manifest is None or manifest.get("format") != SNAPSHOT_FORMAT:
+        return set(), set()
+    documents = manifest["documents"]
+    return {doc["name"] for doc in documents}, {doc["hash"] for doc in documents if doc.get("hash")}
+
+
+def merge_snapshot(memory: dict, snapshot_dir: str = SNAPSHOT_DIR) -> tuple:
+    """memory 중 최신 스냅샷에 없는 PDF(이름과 내용 해시가 모두 새로운 것)만 더해 새 버전 저장
+    - (저장한 디렉터리 이름 또는 None, 더한 PDF 이름 목록)
+
+    최신 버전을 읽고 새 버전을 쓰는 동안 쓰기 잠금을 잡으므로 여러 세션/프로세스가 동시에 더해도
+    서로의 PDF를 잃지 않는다. 스냅샷에서 빼는 일은 하지 않으므로 세션의 삭제/초기화는 그 세션에만 적용된다.
+    수집 중이거나 오류로 끝난 항목은 더하지 않는다. 세션 항목은 바꾸지 않고 복사해서 색인한다.
+    """
+    with _writer_lock(snapshot_dir):
+        known_names, known_hashes = snapshot_documents(snapshot_dir)
+        added = {}
+        for name, entry in memory.items():
+            digest = entry.get("hash")
+            if entry.get("status") != "done" or name in known_names or (digest and digest in known_hashes):
+                continue
+            added[name] = {key: value for key, value in entry.items() if key not in _SESSION_FIELDS}
+            if digest:
+                known_hashes.add(digest)
+        if not added:
+            return None, []
+        # 잠금 안에서는 정리가 돌지 않으므로 불러온 텍스트를 임대하지 않음
+        snapshot = load_snapshot(snapshot_dir, lease=False) if known_names else None
+        merged, corpus = (snapshot["memory"], snapshot["corpus"]) if snapshot else ({}, CorpusIndex())
+        for name, entry in added.items():
+            entry["chunk_variants"] = {}
+            merged[name] = entry
+            corpus.add_document(name, entry)
+        version = _write_snapshot(corpus, merged, snapshot_dir)
+        prune_snapshots(snapshot_dir)
+    return version, list(added)
+
+
+def merge_snapshot_async(memory: dict, snapshot_dir: str = SNAPSHOT_DIR):
+    """백그라운드로 merge_snapshot (기억 목록은 지금 상태로 복사해 넘김) - Future 반환"""
+    return _save_pool.submit(merge_snapshot, dict(memory), snapshot_dir)
+
+
+def _read_manifest(snapshot_dir: str, name: str):
+    try:
+        with open(os.path.join(snapshot_dir, name, "manifest.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _lease_texts(snapshot_dir: str, names):
+    """이 프로세스가 연 텍스트 파일을 임대 파일에 기록 - 프로세스가 살아 있는 동안 정리 대상에서 빠짐"""
+    lease_dir = os.path.join(snapshot_dir, "leases")
+    os.makedirs(lease_dir, exist_ok=True)
+    with _lease_lock:
+        _leased_texts.update(names)
+        _write_atomic(os.path.join(lease_dir, f"{os.getpid()}.json"), json.dumps(sorted(_leased_texts)))
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # 신호 0으로 확인할 수 없으므로 살아 있다고 봄 (임대 텍스트는 지우지 않음)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _leased_by_live_processes(snapshot_dir: str) -> set:
+    """살아 있는 프로세스가 임대한 텍스트 파일 이름 (끝난 프로세스의 임대 파일은 삭제)"""
+    lease_dir = os.path.join(snapshot_dir, "leases")
+    leased = set()
+    try:
+        items = os.listdir(lease_dir)
+    except OSError:
+        return leased
+    for item in items:
+        stem, ext = os.path.splitext(item)
+        if ext != ".json" or not stem.isdigit():
+            continue
+        path = os.path.join(lease_dir, item)
+        if not _pid_alive(int(stem)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                leased.update(json.load(f))
+        except (OSError, ValueError):
+            return None  # 읽을 수 없으면 이번에는 텍스트를 지우지 않음
+    return leased
+
+
+def load_snapshot(snapshot_dir: str = SNAPSHOT_DIR, lease: bool = True):
+    """최신 스냅샷 불러오기 - {"memory", "corpus", "version", "elapsed"}, 없거나 형식이 다르면 None
+
+    배열은 mmap으로 열고(벡터 행렬은 copy-on-write), 문서 텍스트는 공유 파일을 PageStore로 연다.
+    lease면 연 텍스트를 이 프로세스가 끝날 때까지 정리에서 빼도록 임대 파일에 기록한다.
+    """
+    start = time.perf_counter()
+    name = _current_name(snapshot_dir)
+    manifest = _read_manifest(snapshot_dir, name) if name else None
+    if manifest is None or manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+    try:
+        # np.memmap 하위 클래스는 슬라이싱마다 비용이 커서 같은 매핑을 보는 ndarray로 바꿔 씀
+        arrays = {
+            array_name: np.asarray(np.load(
+                os.path.join(snapshot_dir, name, f"{array_name}.npy"),
+                mmap_mode="c" if array_name == "vector.matrix" else "r",
+            ))
+            for array_name in manifest["arrays"]
+        }
+    except (OSError, ValueError):
+        return None
+
+    memory, documents = {}, {}
+    texts_dir = os.path.join(snapshot_dir, "texts")
+    if lease:
+        _lease_texts(snapshot_dir, [doc["text"] for doc in manifest["documents"]])
+    for doc in manifest["documents"]:
+        chunk_start, chunk_end = doc["chunks"]
+        page_start, page_end = doc["pages"]
+        entry = {
+            "store": PageStore(
+                os.path.join(texts_dir, doc["text"]), delete_on_close=False, length=doc["text_length"]
+            ),
+            "chunk_bounds": arrays["chunk_bounds"][chunk_start:chunk_end],
+            "chunk_variants": {},
+            "status": "done",
+            "page_offsets": arrays["page_offsets"][page_start:page_end],
+            **{field: doc.get(field) for field in _ENTRY_FIELDS},
+        }
+        memory[doc["name"]] = entry
+        documents[doc["doc_id"]] = (doc["name"], entry)
+    corpus = CorpusIndex.from_arrays(arrays, manifest["index"], documents)
+    return {
+        "memory": memory,
+        "corpus": corpus,
+        "version": manifest["version"],
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def prune_snapshots(snapshot_dir: str = SNAPSHOT_DIR, keep: int = SNAPSHOT_KEEP) -> int:
+    """최근 keep개 버전만 남기고, 남은 버전과 살아 있는 프로세스의 임대 어디에도 없는 텍스트 파일 삭제
+    - 삭제한 버전 수 반환
+
+    이전 버전을 불러온 워커의 배열은 이미 mmap되어 있어 디렉터리가 지워져도 계속 읽을 수 있고,
+    그 워커가 연 텍스트는 임대 파일에 남아 있으므로 워커가 끝날 때까지 지우지 않는다.
+    """
+    try:
+        names = sorted(
+            item for item in os.listdir(snapshot_dir) if item.startswith("v") and item[1:].isdigit()
+        )
+    except OSError:
+        return 0
+    removed = names[:-keep] if keep else names
+    for name in removed:
+        shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+    used = set()
+    for name in names[len(removed):]:
+        manifest = _read_manifest(snapshot_dir, name)
+        if manifest is None:
+            return len(removed)
+        used.update(doc["text"] for doc in manifest["documents"])
+    leased = _leased_by_live_processes(snapshot_dir)
+    if leased is None:
+        return len(removed)
+    used |= leased
+    texts_dir = os.path.join(snapshot_dir, "texts")
+    try:
+        with os.scandir(texts_dir) as it:
+            for item in it:
+                if item.name.endswith(".u32") and item.name not in used:
+                    os.remove(item.path)
+    except OSError:
+        pass
+    return len(removed)
@@ -0,0 +1,35 @@
+"""검색 색인용 토크나이저 (청크 인덱스, app5 전체 PDF 검색, app6 '어떤 PDF' 조회 공용)
+
+한글은 조사/어미가 붙어도 맞도록 음절 2-gram과 3-gram으로, 그 밖의 문자는 소문자 단어로 나눈다.
+예: "계약기간은" -> 계약, 약기, 기간, 간은, 계약기, 약기간, 기간은
+"""
+import re
+
+# 한글 음절 연속 구간 | 한글을 뺀 단어 문자 연속 구간
+_RUN_RE = re.compile(r"([가-힣]+)|([^\W_가-힣]+)")
+
+# 한글 n-gram 길이
+NGRAM_SIZES = (2, 3)
+
+
+def index_tokens(text: str) -> list:
+    """색인/질의 토큰 목록 (한글 2·3-gram + 소문자 단어, 한 글자 한글 구간은 그대로)"""
+    tokens = []
+    extend = tokens.extend
+    append = tokens.append
+    for hangul, word in _RUN_RE.findall(text.lower()):
+        if word:
+            append(word)
+            continue
+        n = len(hangul)
+        if n <= NGRAM_SIZES[0]:
+            append(hangul)
+            continue
+        for size in NGRAM_SIZES:
+            extend([hangul[i:i + size] for i in range(n - size + 1)])
+    return tokens
+
+
+def index_terms(text: str) -> set:
+    """중복 없는 토큰 집합"""
+    return set(index_tokens(text))
@@ -0,0 +1,119 @@
+"""문서 텍스트 디스크 저장소 (세션에는 오프셋만 두고 필요한 구간만 mmap으로 읽음)
+
+UTF-32-LE로 저장하므로 문자 오프셋 * 4 = 바이트 오프셋이 되어
+페이지 오프셋 표와 청크 경계(문자 오프셋)를 변환 없이 그대로 쓸 수 있다.
+"""
+import mmap
+import os
+import threading
+import uuid
+import weakref
+
+STORE_DIR = os.path.join("app_data", "page_store")
+
+_ENCODING = "utf-32-le"
+_CHAR_BYTES = 4
+
+
+def _remove_file(path: str):
+    """저장 파일 삭제 (이미 없으면 무시)"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PageStore:
+    """문서 하나의 텍스트 버퍼 - str처럼 len()과 슬라이싱 지원"""
+
+    def __init__(self, path: str, delete_on_close: bool = True, length: int = None):
+        self.path = path
+        if length is None:
+            length = os.path.getsize(path) // _CHAR_BYTES if os.path.exists(path) else 0
+        self.length = length  # 문자 수 (알고 있으면 넘겨 파일 stat 생략)
+        self._mm = None
+        self._lock = threading.Lock()
+        self.deleted = False  # delete() 이후에는 append가 파일을 다시 만들지 않음
+        # 세션이 끝나 객체가 사라지면 파일도 정리
+        self._finalizer = weakref.finalize(self, _remove_file, path) if delete_on_close else None
+
+    @classmethod
+    def create(cls, store_dir: str = STORE_DIR):
+        """빈 저장소 파일 생성"""
+        os.makedirs(store_dir, exist_ok=True)
+        path = os.path.join(store_dir, f"{uuid.uuid4().hex}.u32")
+        open(path, "wb").close()
+        return cls(path)
+
+    @classmethod
+    def from_text(cls, text: str, store_dir: str = STORE_DIR):
+        """텍스트 전체를 저장소로 옮기기"""
+        store = cls.create(store_dir)
+        store.append(text)
+        return store
+
+    def append(self, text: str) -> int:
+        """텍스트 추가 - 추가된 구간의 시작 오프셋 반환 (삭제된 저장소면 아무것도 쓰지 않음)"""
+        with self._lock:
+            start = self.length
+            if self.deleted:
+                # 수집 취소와 겹쳐 삭제 뒤에 도착한 페이지 - "ab"로 열면 지운 파일이 다시 생겨 남으므로 버림
+                return start
+            with open(self.path, "ab") as f:
+                f.write(text.encode(_ENCODING))
+            self.length = start + len(text)
+        return start
+
+    def _mapped(self, end: int):
+        """end까지 읽을 수 있는 mmap (파일이 커졌으면 다시 매핑)"""
+        with self._lock:
+            if self._mm is None or len(self._mm) < end * _CHAR_BYTES:
+                if self._mm is not None:
+                    self._mm.close()
+                with open(self.path, "rb") as f:
+                    self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mm
+
+    def read(self, start: int = 0, end: int = None) -> str:
+        """문자 구간 [start, end) 읽기"""
+        length = self.length
+        end = length if end is None else min(end, length)
+        start = max(0, start)
+        if end <= start:
+            return ""
+        mm = self._mapped(end)
+        return mm[start * _CHAR_BYTES:end * _CHAR_BYTES].decode(_ENCODING)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, key) -> str:
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("PageStore는 연속 구간 슬라이스만 지원합니다")
+        start, end, _ = key.indices(self.length)
+        return self.read(start, end)
+
+    def text(self) -> str:
+        """전체 텍스트 (검색 등 일시적으로 필요할 때만 사용)"""
+        return self.read(0, self.length)
+
+    def _close_locked(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def close(self):
+        """mmap 닫기 (파일은 유지)"""
+        with self._lock:
+            self._close_locked()
+
+    def delete(self):
+        """mmap을 닫고 저장 파일 삭제 (delete_on_close=False로 연 공유 파일은 남겨 둠)
+
+        삭제 표시와 파일 삭제를 append와 같은 잠금 안에서 하므로, 이후의 append는 파일을 다시 만들지 않는다.
+        """
+        with self._lock:
+            self.deleted = True
+            self._close_locked()
+            if self._finalizer is not None:
+                self._finalizer()
@@ -0,0 +1,150 @@
+"""PDF 텍스트 추출 엔진 (PyPDF2 기본, pypdfium2/pdfminer는 설치된 경우에만 사용)"""
+import io
+import os
+import threading
+
+from PyPDF2 import PdfReader
+
+# 빠른 로컬 엔진 (선택)
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+    from pdfminer.utils import decode_text
+    PDFMINER_AVAILABLE = True
+except ImportError:
+    PDFMINER_AVAILABLE = False
+
+# pdfium은 스레드 안전하지 않으므로 같은 프로세스 안에서는 한 번에 하나씩 호출
+_PDFIUM_LOCK = threading.Lock()
+
+
+def clean_metadata(info) -> dict:
+    """PDF 문서 정보 (제목, 작성자 등) - 키는 "/" 없이 소문자, 빈 값 제외"""
+    return {str(key).lstrip("/").lower(): str(value) for key, value in (info or {}).items() if value}
+
+
+class PyPDF2Backend:
+    """PyPDF2 추출 엔진 (기본)"""
+
+    label = "PyPDF2 (기본)"
+
+    def __init__(self, pdf_bytes: bytes):
+        self.reader = PdfReader(io.BytesIO(pdf_bytes))
+
+    def page_count(self) -> int:
+        return len(self.reader.pages)
+
+    def extract(self, page_no: int) -> str:
+        return self.reader.pages[page_no].extract_text() or ""
+
+    def metadata(self) -> dict:
+        try:
+            return clean_metadata(self.reader.metadata)
+        except Exception:
+            return {}
+
+    def close(self):
+        pass
+
+
+class PdfiumBackend:
+    """pypdfium2 추출 엔진 (네이티브, 빠름)"""
+
+    label = "pypdfium2 (빠름)"
+
+    def __init__(self, pdf_bytes: bytes):
+        with _PDFIUM_LOCK:
+            self.document = pdfium.PdfDocument(pdf_bytes)
+
+    def page_count(self) -> int:
+        return len(self.document)
+
+    def extract(self, page_no: int) -> str:
+        with _PDFIUM_LOCK:
+            page = self.document[page_no]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+        return text.replace("\r\n", "\n")
+
+    def metadata(self) -> dict:
+        try:
+            with _PDFIUM_LOCK:
+                return clean_metadata(self.document.get_metadata_dict())
+        except Exception:
+            return {}
+
+    def close(self):
+        with _PDFIUM_LOCK:
+            self.document.close()
+
+
+class PdfminerBackend:
+    """pdfminer.six 추출 엔진 (레이아웃 분석, 느리지만 정확)"""
+
+    label = "pdfminer (레이아웃)"
+
+    def __init__(self, pdf_bytes: bytes):
+        self.document = PDFDocument(PDFParser(io.BytesIO(pdf_bytes)))
+        self.pages = list(PDFPage.create_pages(self.document))
+        self.resources = PDFResourceManager()
+
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def extract(self, page_no: int) -> str:
+        output = io.StringIO()
+        device = TextConverter(self.resources, output, laparams=LAParams())
+        try:
+            PDFPageInterpreter(self.resources, device).process_page(self.pages[page_no])
+        finally:
+            device.close()
+        return output.getvalue().replace("\x0c", "").strip()
+
+    def metadata(self) -> dict:
+        try:
+            info = {}
+            for item in self.document.info:
+                for key, value in item.items():
+                    value = resolve1(value)
+                    info[key] = decode_text(value) if isinstance(value, bytes) else value
+            return clean_metadata(info)
+        except Exception:
+            return {}
+
+    def close(self):
+        pass
+
+
+# 사용 가능한 엔진 {키: 클래스}
+PDF_BACKENDS = {"pypdf2": PyPDF2Backend}
+if PDFIUM_AVAILABLE:
+    PDF_BACKENDS["pypdfium2"] = PdfiumBackend
+if PDFMINER_AVAILABLE:
+    PDF_BACKENDS["pdfminer"] = PdfminerBackend
+
+# 배포별 기본 엔진 (PDF_BACKEND 환경 변수, 설치되지 않았으면 PyPDF2)
+DEFAULT_BACKEND = os.getenv("PDF_BACKEND", "pypdf2")
+if DEFAULT_BACKEND not in PDF_BACKENDS:
+    DEFAULT_BACKEND = "pypdf2"
+
+
+def open_backend(name: str, pdf_bytes: bytes):
+    """엔진으로 PDF 열기"""
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"사용할 수 없는 PDF 엔진입니다: {name}")
+    return PDF_BACKENDS[name](pdf_bytes)
@@ -0,0 +1,143 @@
+"""PDF 텍스트 엔진 벤치마크 CLI - 설치된 엔진별 속도, 최대 메모리, 문자 일치율 비교
+
+사용법:
+    python pdf_benchmark.py <PDF 폴더 또는 파일...> [--limit 20] [--reference pypdf2]
+
+엔진마다 새 프로세스에서 같은 샘플 PDF를 추출하여 pages/sec와 최대 메모리 증가량을 재고,
+기준 엔진(기본 PyPDF2)과의 문자 단위 일치율(공백 제외)을 계산한다.
+배포 기본 엔진은 결과를 보고 PDF_BACKEND 환경 변수로 정한다.
+"""
+import argparse
+import difflib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+from bulk_ingest import find_pdfs
+from pdf_backends import PDF_BACKENDS, open_backend
+
+
+def _peak_rss_mb() -> float:
+    """현재 프로세스의 최대 RSS (MB)"""
+    if not RESOURCE_AVAILABLE:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_backend(name: str, paths: list, max_pages: int) -> dict:
+    """벤치마크 프로세스: 엔진 하나로 모든 샘플 추출"""
+    baseline = _peak_rss_mb()
+    texts = {}
+    page_total = 0
+    errors = 0
+    t0 = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        try:
+            document = open_backend(name, pdf_bytes)
+            try:
+                page_count = min(document.page_count(), max_pages) if max_pages else document.page_count()
+                texts[path] = [document.extract(page_no) for page_no in range(page_count)]
+            finally:
+                document.close()
+        except Exception:
+            errors += 1
+            continue
+        page_total += page_count
+    return {
+        "backend": name,
+        "pages": page_total,
+        "seconds": time.perf_counter() - t0,
+        "peak_mb": _peak_rss_mb() - baseline,
+        "errors": errors,
+        "texts": texts,
+    }
+
+
+def _normalize(text: str) -> str:
+    """엔진마다 다른 공백/줄바꿈 차이는 비교에서 제외"""
+    return "".join(text.split())
+
+
+def agreement(reference: dict, candidate: dict) -> float:
+    """기준 엔진 대비 문자 단위 일치율 (페이지 길이 가중 평균, 0~1)"""
+    matched = 0.0
+    total = 0
+    for path, ref_pages in reference.items():
+        cand_pages = candidate.get(path, [])
+        for page_no, ref_text in enumerate(ref_pages):
+            a = _normalize(ref_text)
+            b = _normalize(cand_pages[page_no]) if page_no < len(cand_pages) else ""
+            weight = max(len(a), len(b))
+            if weight == 0:
+                continue
+            matched += difflib.SequenceMatcher(None, a, b).ratio() * weight
+            total += weight
+    return matched / total if total else 1.0
+
+
+def benchmark(paths: list, backends: list = None, reference: str = "pypdf2", max_pages: int = 0) -> list:
+    """설치된 엔진을 각각 새 프로세스에서 실행해 결과 비교"""
+    backends = backends or list(PDF_BACKENDS)
+    if reference not in backends:
+        raise ValueError(f"일치율 기준 엔진 {reference}이(가) 비교 대상에 없습니다")
+    results = []
+    # spawn으로 띄워 엔진 간 메모리 측정이 서로 섞이지 않도록 함
+    context = multiprocessing.get_context("spawn")
+    for name in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.append(pool.submit(_run_backend, name, paths, max_pages).result())
+
+    reference_texts = next(r["texts"] for r in results if r["backend"] == reference)
+    for result in results:
+        result["pages_per_sec"] = result["pages"] / max(result["seconds"], 1e-9)
+        result["agreement"] = agreement(reference_texts, result.pop("texts"))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PDF 텍스트 엔진 속도/메모리/일치율 벤치마크")
+    parser.add_argument("inputs", nargs="+", help="샘플 PDF 파일 또는 폴더")
+    parser.add_argument("--backends", nargs="+", choices=list(PDF_BACKENDS), help="비교할 엔진 (기본: 설치된 전체)")
+    parser.add_argument("--reference", default="pypdf2", choices=list(PDF_BACKENDS),
+                        help="일치율 기준 엔진 (--backends를 주면 그 안에 있어야 함)")
+    parser.add_argument("--limit", type=int, default=0, help="사용할 최대 PDF 수 (0이면 전체)")
+    parser.add_argument("--max-pages", type=int, default=0, help="PDF당 최대 페이지 수 (0이면 전체)")
+    args = parser.parse_args(argv)
+    if args.backends and args.reference not in args.backends:
+        parser.error(f"--reference {args.reference}이(가) --backends에 없습니다")
+
+    paths = []
+    for item in args.inputs:
+        paths.extend(find_pdfs(item) if os.path.isdir(item) else [item])
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        parser.error("샘플 PDF를 찾을 수 없습니다")
+
+    print(f"📚 샘플 PDF {len(paths)}개, 엔진: {', '.join(args.backends or PDF_BACKENDS)}")
+    results = benchmark(paths, args.backends, args.reference, args.max_pages)
+
+    print(f"\n{'엔진':<12}{'페이지':>8}{'초':>9}{'pages/sec':>12}{'메모리(MB)':>12}{'일치율':>9}{'오류':>6}")
+    for r in results:
+        print(
+            f"{r['backend']:<12}{r['pages']:>8}{r['seconds']:>9.2f}{r['pages_per_sec']:>12.1f}"
+            f"{r['peak_mb']:>12.1f}{r['agreement'] * 100:>8.1f}%{r['errors']:>6}"
+        )
+    print(f"\n일치율 기준: {args.reference} (공백 제외 문자 단위)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""PDF 추출 결과 디스크 캐시 (PDF 바이트의 SHA-256 기준, LRU 삭제)"""
+import hashlib
+import json
+import os
+
+# 캐시 저장 위치와 최대 용량
+CACHE_DIR = os.path.join("app_data", "pdf_cache")
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+
+def pdf_hash(pdf_bytes: bytes) -> str:
+    """PDF 내용 해시 (파일 이름과 무관)"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _cache_path(digest: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def load_cached_pdf(digest: str, cache_dir: str = CACHE_DIR):
+    """캐시된 추출 결과 읽기 - 없으면 None"""
+    path = _cache_path(digest, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # 수정 시각을 LRU 사용 시각으로 사용
+    os.utime(path)
+    return record
+
+
+def save_cached_pdf(digest: str, record: dict, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES) -> bool:
+    """추출 결과 저장 후 용량 초과분 LRU 삭제 (max_bytes가 None이면 삭제 생략)"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _cache_path(digest, cache_dir)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+    if max_bytes is not None:
+        evict_lru(cache_dir, max_bytes)
+    return True
+
+
+def _cache_files(cache_dir: str) -> list:
+    """캐시 파일 목록 - [(수정 시각, 크기, 경로)], 오래된 순"""
+    files = []
+    try:
+        with os.scandir(cache_dir) as it:
+            for item in it:
+                if item.name.endswith(".json"):
+                    st = item.stat()
+                    files.append((st.st_mtime, st.st_size, item.path))
+    except OSError:
+        return []
+    return sorted(files)
+
+
+def evict_lru(cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES, keep=()) -> int:
+    """가장 오래 사용하지 않은 항목부터 삭제 (keep에 있는 해시는 남김) - 삭제한 파일 수 반환"""
+    files = _cache_files(cache_dir)
+    total = sum(size for _, size, _ in files)
+    keep = {_cache_path(digest, cache_dir) for digest in keep}
+    removed = 0
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def cache_usage(cache_dir: str = CACHE_DIR) -> dict:
+    """캐시 사용량"""
+    files = _cache_files(cache_dir)
+    return {"files": len(files), "bytes": sum(size for _, size, _ in files)}
@@ -0,0 +1,559 @@
+"""PDF 텍스트 추출 파이프라인 (app6.py, gpt_oss_forced_app.py, business_card_ocr_app.py 공용)"""
+import functools
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+from PyPDF2 import PdfReader
+
+# 스캔 페이지 OCR (선택)
+try:
+    import pytesseract
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+# 페이지 렌더링 (선택) - 없으면 페이지에 포함된 스캔 이미지를 직접 사용
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+from chunking import DEFAULT_MAX_CHARS, ChunkView, document_chunk_bounds, make_chunker
+from pdf_backends import DEFAULT_BACKEND, open_backend
+from page_store import PageStore
+from pdf_cache import CACHE_DIR, load_cached_pdf, save_cached_pdf
+from token_budget import count_tokens
+
+# 자동 모드에서 병렬 추출로 전환하는 최소 페이지 수
+PARALLEL_MIN_PAGES = 40
+
+# 병렬 추출 최대 워커 수 (모든 업로드가 함께 쓰는 프로세스 풀 크기)
+MAX_WORKERS = 8
+
+# 추출 방식 {키: 사이드바 표시 이름}
+EXTRACT_MODES = {
+    "auto": "자동 (페이지 수 기준)",
+    "serial": "단일 스레드",
+    "parallel": "병렬 (프로세스 풀)",
+}
+
+# OCR 언어 (명함 OCR과 동일)와 렌더링 해상도
+OCR_LANG = "kor+eng"
+OCR_DPI = 300
+
+# 추출/OCR 공용 프로세스 풀 (처음 쓸 때 생성)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def read_pdf_bytes(file) -> bytes:
+    """업로드 파일, 경로 또는 바이트에서 PDF 바이트 읽기"""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return file.read()
+
+
+def _extract_range(document, start: int, end: int) -> list:
+    """페이지 구간 추출 - [(페이지 번호, 텍스트, 소요 시간)]"""
+    results = []
+    for page_no in range(start, end):
+        t0 = time.perf_counter()
+        text = document.extract(page_no)
+        results.append((page_no, text, time.perf_counter() - t0))
+    return results
+
+
+def _shared_pool() -> ProcessPoolExecutor:
+    """모든 업로드가 함께 쓰는 프로세스 풀 (워커 최대 MAX_WORKERS개)
+
+    Streamlit 서버와 수집 스레드가 도는 프로세스를 fork하면 다른 스레드가 잡고 있던 잠금이 복제되어
+    워커가 멈출 수 있으므로 forkserver(없으면 spawn)로 워커를 띄운다.
+    """
+    global _pool
+    with _pool_lock:
+        # 워커가 비정상 종료해 풀이 깨졌으면 새로 만듦
+        if _pool is None or getattr(_pool, "_broken", False):
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, MAX_WORKERS), mp_context=context)
+        return _pool
+
+
+@functools.lru_cache(maxsize=2)
+def _worker_document(pdf_path: str, backend: str):
+    """워커 프로세스에서 연 추출 엔진 문서 (같은 PDF의 다음 구간은 다시 파싱하지 않음)"""
+    with open(pdf_path, "rb") as f:
+        return open_backend(backend, f.read())
+
+
+def _extract_range_in_worker(pdf_path: str, backend: str, start: int, end: int) -> list:
+    """워커 프로세스에서 페이지 구간 추출"""
+    return _extract_range(_worker_document(pdf_path, backend), start, end)
+
+
+def page_ranges(page_count: int, workers: int) -> list:
+    """페이지를 워커 수의 4배 구간으로 나누기 (느린 페이지 편중 완화)"""
+    batch = max(1, -(-page_count // (workers * 4)))
+    return [(start, min(start + batch, page_count)) for start in range(0, page_count, batch)]
+
+
+def resolve_mode(mode: str, page_count: int, workers: int) -> str:
+    """추출 방식 결정 - 자동이면 페이지 수로 판단"""
+    if mode == "auto":
+        mode = "parallel" if page_count >= PARALLEL_MIN_PAGES else "serial"
+    if workers < 2 or page_count < 2:
+        return "serial"
+    return mode
+
+
+@functools.lru_cache(maxsize=1)
+def ocr_available() -> bool:
+    """pytesseract와 tesseract 실행 파일이 모두 있는지 확인"""
+    if not OCR_AVAILABLE:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def needs_ocr(page_text: str) -> bool:
+    """텍스트 레이어가 없는 (스캔) 페이지인지"""
+    return not page_text.strip()
+
+
+@functools.lru_cache(maxsize=2)
+def _ocr_document(pdf_path: str):
+    """워커 프로세스에서 연 OCR용 문서 (pypdfium2 문서 또는 PdfReader)"""
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+    return pdfium.PdfDocument(pdf_bytes) if PDFIUM_AVAILABLE else PdfReader(io.BytesIO(pdf_bytes))
+
+
+def render_page_image(document, page_no: int):
+    """페이지를 OCR용 이미지로 변환 (pypdfium2가 없으면 가장 큰 내장 이미지 사용)"""
+    if PDFIUM_AVAILABLE:
+        return document[page_no].render(scale=OCR_DPI / 72).to_pil()
+    images = [Image.open(io.BytesIO(image.data)) for image in document.pages[page_no].images]
+    if not images:
+        return None
+    return max(images, key=lambda image: image.width * image.height)
+
+
+def _ocr_page_in_worker(pdf_path: str, page_no: int) -> tuple:
+    """워커 프로세스에서 페이지 하나 OCR - (텍스트, 소요 시간)"""
+    t0 = time.perf_counter()
+    try:
+        image = render_page_image(_ocr_document(pdf_path), page_no)
+        text = pytesseract.image_to_string(image.convert("L"), lang=OCR_LANG) if image else ""
+    except Exception:
+        text = ""
+    return text.strip(), time.perf_counter() - t0
+
+
+def _cancel_pending(futures):
+    """수집 취소 등으로 중간에 끝나면 아직 시작하지 않은 작업 취소 (공용 풀은 닫지 않음)"""
+    for future in futures:
+        future.cancel()
+
+
+def _iter_text_layer(pdf_path: str, document, backend: str, mode: str, workers: int, page_count: int):
+    """텍스트 레이어 추출 (단일 스레드 또는 공용 프로세스 풀)"""
+    if mode == "parallel":
+        pool = _shared_pool()
+        futures = [
+            pool.submit(_extract_range_in_worker, pdf_path, backend, start, end)
+            for start, end in page_ranges(page_count, workers)
+        ]
+        try:
+            # 제출 순서대로 결과를 기다리므로 페이지 순서가 유지됨
+            for future in futures:
+                yield from future.result()
+        finally:
+            _cancel_pending(futures)
+    else:
+        for page_no in range(page_count):
+            yield from _extract_range(document, page_no, page_no + 1)
+
+
+def _with_ocr_fallback(pages, pdf_path: str, ocr_pages: list):
+    """텍스트 없는 페이지만 공용 프로세스 풀에 보내 OCR하고 결과를 페이지 순서대로 합치기"""
+    pool = _shared_pool()
+    pending = deque()  # (페이지 번호, 텍스트 또는 OCR future, 소요 시간)
+    try:
+        for page_no, text, elapsed in pages:
+            if needs_ocr(text):
+                ocr_pages.append(page_no + 1)
+                pending.append((page_no, pool.submit(_ocr_page_in_worker, pdf_path, page_no), elapsed))
+            else:
+                pending.append((page_no, text, elapsed))
+            # 앞쪽 페이지가 준비된 만큼만 순서대로 내보냄 (텍스트 페이지는 OCR을 기다리지 않음)
+            while pending and (isinstance(pending[0][1], str) or pending[0][1].done()):
+                yield _resolve_pending(pending.popleft())
+        while pending:
+            yield _resolve_pending(pending.popleft())
+    finally:
+        _cancel_pending(result for _, result, _ in pending if not isinstance(result, str))
+
+
+def _resolve_pending(item: tuple) -> tuple:
+    """대기 항목을 (페이지 번호, 텍스트, 소요 시간)으로 변환"""
+    page_no, result, elapsed = item
+    if isinstance(result, str):
+        return page_no, result, elapsed
+    text, ocr_elapsed = result.result()
+    return page_no, text, elapsed + ocr_elapsed
+
+
+def iter_pages(file, mode: str = "auto", max_workers: int = None, stats: dict = None, ocr: bool = False,
+               backend: str = DEFAULT_BACKEND):
+    """추출되는 대로 페이지를 순서대로 내보내는 제너레이터 - (페이지 번호, 텍스트, 소요 시간)"""
+    pdf_bytes = read_pdf_bytes(file)
+    document = open_backend(backend, pdf_bytes)
+    pdf_path = None
+    try:
+        page_count = document.page_count()
+        workers = max_workers or min(os.cpu_count() or 1, MAX_WORKERS)
+        mode = resolve_mode(mode, page_count, workers)
+        ocr = ocr and ocr_available()
+        ocr_pages = []
+        if stats is not None:
+            stats.update(
+                page_count=page_count, mode=mode, workers=1 if mode == "serial" else workers, backend=backend,
+                metadata=document.metadata(), ocr=ocr, ocr_pages=ocr_pages,
+            )
+
+        if mode == "parallel" or ocr:
+            # 공용 풀의 워커는 PDF를 작업마다 받지 않고 임시 파일에서 한 번만 읽음
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                f.write(pdf_bytes)
+            pdf_path = f.name
+        text_pages = _iter_text_layer(pdf_path, document, backend, mode, workers, page_count)
+        with closing(text_pages):
+            yield from _with_ocr_fallback(text_pages, pdf_path, ocr_pages) if ocr else text_pages
+    finally:
+        document.close()
+        if pdf_path is not None:
+            os.remove(pdf_path)
+
+
+def extract_pages(file, mode: str = "auto", max_workers: int = None, ocr: bool = False,
+                  backend: str = DEFAULT_BACKEND) -> dict:
+    """PDF 페이지별 텍스트 추출 (단일 스레드 또는 프로세스 풀, 선택적으로 스캔 페이지 OCR)"""
+    t0 = time.perf_counter()
+    stats = {}
+    results = list(iter_pages(file, mode, max_workers, stats, ocr, backend))
+    return {
+        "pages": [text for _, text, _ in results],
+        "timings": [elapsed for _, _, elapsed in results],
+        **stats,
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def pages_to_text(pages: list) -> str:
+    """페이지 텍스트 합치기 (빈 페이지 제외)"""
+    return "".join(page_text + "\n" for page_text in pages if page_text)
+
+
+def page_offset_table(pages: list) -> np.ndarray:
+    """pages_to_text 결과에서 각 페이지의 시작 문자 위치 (마지막 원소는 전체 길이)"""
+    lengths = [len(page_text) + 1 if page_text else 0 for page_text in pages]
+    return np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))).astype(np.int64)
+
+
+def build_pdf_document(file, mode: str = "auto", ocr: bool = False, backend: str = DEFAULT_BACKEND) -> dict:
+    """한 번의 추출로 문서 레코드 생성 - 전체 텍스트, 페이지 오프셋 표, 페이지 수, 메타데이터"""
+    extraction = extract_pages(file, mode, ocr=ocr, backend=backend)
+    return {
+        "text": pages_to_text(extraction["pages"]),
+        "page_offsets": page_offset_table(extraction["pages"]),
+        "page_count": extraction["page_count"],
+        "metadata": extraction["metadata"],
+    }
+
+
+def page_of_offset(page_offsets, offset: int) -> int:
+    """문자 위치가 속한 페이지 번호 (1부터)"""
+    page_count = len(page_offsets) - 1
+    return int(min(max(np.searchsorted(page_offsets, offset, side="right"), 1), page_count))
+
+
+def pages_in_range(page_offsets, start: int, end: int) -> list:
+    """문자 구간 [start, end)와 겹치는 페이지 번호 목록 (텍스트 없는 페이지 제외)"""
+    page_offsets = np.asarray(page_offsets)
+    starts, ends = page_offsets[:-1], page_offsets[1:]
+    overlaps = (starts < end) & (ends > start) & (ends > starts)
+    return [int(i) + 1 for i in np.flatnonzero(overlaps)]
+
+
+def page_slice(text, page_offsets, page_no: int) -> str:
+    """특정 페이지(1부터) 텍스트 (text는 str 또는 PageStore)"""
+    return text[page_offsets[page_no - 1]:page_offsets[page_no]]
+
+
+def slowest_pages(extraction: dict, top_n: int = 5) -> list:
+    """가장 오래 걸린 페이지 - [(페이지 번호(1부터), 소요 시간)]"""
+    timings = extraction["timings"]
+    order = sorted(range(len(timings)), key=lambda i: timings[i], reverse=True)
+    return [(i + 1, timings[i]) for i in order[:top_n]]
+
+
+def new_memory_entry() -> dict:
+    """수집 전 빈 기억 항목 생성 (텍스트는 디스크 저장소에, 세션에는 오프셋만)"""
+    return {
+        "store": PageStore.create(),
+        "chunk_bounds": [],
+        "chunk_key": None,
+        "chunk_variants": {},  # {청크 설정 키: 청크 상태} - 설정을 되돌릴 때 재사용
+        "upload_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "size": 0,
+        "status": "ingesting",
+        "pages_done": 0,
+        "page_count": 0,
+        "page_offsets": [0],
+    }
+
+
+def is_ingesting(entry: dict) -> bool:
+    """아직 수집 중인 항목인지 (오류로 끝난 항목은 수집 중이 아님)"""
+    return entry.get("status") == "ingesting"
+
+
+def release_memory_entry(entry: dict):
+    """기억 항목 정리 - 수집 중이면 중단하고 저장 파일 삭제"""
+    entry["status"] = "cancelled"
+    entry["store"].delete()
+
+
+# 청크 설정마다 달라지는 기억 항목 값 (청크 경계, 토큰 수 캐시)
+CHUNK_STATE_KEYS = ("chunk_bounds", "chunk_tokens")
+
+
+def chunk_key(chunk_size: int, overlap: int, chunk_mode: str = "words", max_chars: int = DEFAULT_MAX_CHARS,
+              max_tokens: int = None) -> str:
+    """캐시에 저장하는 청크 설정 키"""
+    if chunk_mode == "sentence":
+        return f"sentence:{max_chars}"
+    if chunk_mode == "tokens":
+        return f"tokens:{max_tokens}"
+    return f"{chunk_size}:{overlap}"
+
+
+def _add_chunks(entry: dict, bounds: list):
+    """새 청크 경계를 항목에 추가하고 전역 인덱스에 등록되어 있으면 바로 색인 (끝난 페이지의 문장 포함)"""
+    entry["chunk_bounds"].extend(bounds)
+    if entry.get("corpus") is not None:
+        entry["corpus"].sync(entry)
+
+
+def ingest_pages(entry: dict, file, mode: str = "auto", chunk_size: int = 200, overlap: int = 50,
+                 digest: str = None, ocr: bool = False, backend: str = DEFAULT_BACKEND, chunk_mode: str = "words",
+                 max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None):
+    """페이지를 추출하는 즉시 저장소에 쓰고 청크 경계를 점진적으로 채움 (digest가 있으면 캐시에 저장)"""
+    t0 = time.perf_counter()
+    stats = {}
+    store = entry["store"]
+    key = chunk_key(chunk_size, overlap, chunk_mode, max_chars, max_tokens)
+    entry["chunk_key"] = key
+    chunker = make_chunker(chunk_mode, chunk_size, overlap, max_chars, max_tokens)
+    timings = []
+    try:
+        # 취소되면 바로 닫아 추출 워커에 남은 작업을 취소
+        with closing(iter_pages(file, mode, stats=stats, ocr=ocr, backend=backend)) as pages:
+            for _, page_text, elapsed in pages:
+                if entry.get("status") == "cancelled":
+                    return
+                entry["page_count"] = stats["page_count"]
+                timings.append(elapsed)
+                if page_text:
+                    offset = store.append(page_text + "\n")
+                    _add_chunks(entry, chunker.feed(page_text, offset))
+                    entry["size"] = len(store)
+                entry["page_offsets"].append(len(store))
+                entry["pages_done"] += 1
+        _add_chunks(entry, chunker.finish())
+        entry["chunk_bounds"] = np.asarray(entry["chunk_bounds"], dtype=np.int64).reshape(-1, 2)
+        entry["page_offsets"] = np.asarray(entry["page_offsets"], dtype=np.int64)
+        entry["metadata"] = stats["metadata"]
+        entry["extract_stats"] = {**stats, "elapsed": time.perf_counter() - t0, "timings": timings}
+        entry["status"] = "done"
+    except Exception as e:
+        entry["error"] = str(e)
+        entry["status"] = "error"
+        return
+
+    if digest:
+        offsets = entry["page_offsets"]
+        # 저장소에서 페이지를 다시 읽어 캐시에 저장 (수집 중 페이지 텍스트를 따로 들고 있지 않음)
+        pages = [store.read(start, end)[:-1] if end > start else "" for start, end in zip(offsets[:-1], offsets[1:])]
+        save_cached_pdf(digest, {
+            "pages": pages,
+            "chunk_bounds": {key: entry["chunk_bounds"].tolist()},
+            "extract_stats": entry["extract_stats"],
+        })
+
+
+def start_background_ingest(entry: dict, pdf_bytes: bytes, mode: str = "auto", chunk_size: int = 200,
+                            overlap: int = 50, digest: str = None, ocr: bool = False,
+                            backend: str = DEFAULT_BACKEND, chunk_mode: str = "words",
+                            max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None) -> threading.Thread:
+    """백그라운드 스레드에서 수집 시작 (수집된 페이지부터 바로 질문 가능)"""
+    thread = threading.Thread(
+        target=ingest_pages,
+        args=(entry, pdf_bytes, mode, chunk_size, overlap, digest, ocr, backend, chunk_mode, max_chars, max_tokens),
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def cache_matches(record: dict, ocr: bool = False, backend: str = DEFAULT_BACKEND) -> bool:
+    """캐시된 추출 결과를 이번 설정(엔진, OCR)에 그대로 쓸 수 있는지"""
+    if record["extract_stats"].get("backend", "pypdf2") != backend:
+        return False
+    # OCR 없이 저장된 스캔 페이지가 있으면 OCR로 다시 추출
+    return not (ocr and ocr_available() and not record["extract_stats"].get("ocr")
+                and any(map(needs_ocr, record["pages"])))
+
+
+def cached_memory_entry(digest: str, chunk_size: int = 200, overlap: int = 50, ocr: bool = False,
+                        backend: str = DEFAULT_BACKEND, chunk_mode: str = "words", max_chars: int = DEFAULT_MAX_CHARS,
+                        max_tokens: int = None, cache_dir: str = CACHE_DIR):
+    """캐시에서 기억 항목 복원 - 캐시에 없거나 설정이 다르면 None"""
+    record = load_cached_pdf(digest, cache_dir)
+    if record is None or not cache_matches(record, ocr, backend):
+        return None
+    text = pages_to_text(record["pages"])
+    page_offsets = page_offset_table(record["pages"])
+    key = chunk_key(chunk_size, overlap, chunk_mode, max_chars, max_tokens)
+    bounds = record["chunk_bounds"].get(key)
+    if bounds is None:
+        # 처음 쓰는 청크 설정이면 경계를 계산해 캐시에 추가
+        bounds = document_chunk_bounds(text, page_offsets, chunk_mode, chunk_size, overlap, max_chars, max_tokens)
+        record["chunk_bounds"][key] = bounds.tolist()
+        save_cached_pdf(digest, record, cache_dir)
+    entry = new_memory_entry()
+    entry["store"].append(text)
+    entry.update(
+        chunk_bounds=np.asarray(bounds, dtype=np.int64).reshape(-1, 2),
+        chunk_key=key,
+        size=len(text),
+        status="done",
+        pages_done=len(record["pages"]),
+        page_count=len(record["pages"]),
+        page_offsets=page_offsets,
+        metadata=record["extract_stats"].get("metadata", {}),
+        extract_stats=record["extract_stats"],
+    )
+    return entry
+
+
+def rechunk_entry(entry: dict, chunk_size: int = 200, overlap: int = 50, chunk_mode: str = "words",
+                  max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None) -> bool:
+    """저장된 텍스트로 청크 설정만 바꿔 다시 청킹 - 청크가 바뀌었으면 True (전역 인덱스 갱신은 호출한 쪽에서)
+
+    이전 설정의 청크는 항목에 남겨 두어 설정을 되돌리면 다시 계산하지 않고,
+    새로 계산한 경계는 PDF 캐시에도 추가한다. 수집 중인 항목은 건너뛴다.
+    """
+    key = chunk_key(chunk_size, overlap, chunk_mode, max_chars, max_tokens)
+    if entry.get("status") != "done" or entry.get("chunk_key") == key:
+        return False
+    variants = entry.setdefault("chunk_variants", {})
+    variants[entry.get("chunk_key")] = {name: entry.get(name) for name in CHUNK_STATE_KEYS}
+    if key in variants:
+        state = variants.pop(key)
+    else:
+        bounds = document_chunk_bounds(
+            entry["store"].text(), entry["page_offsets"], chunk_mode, chunk_size, overlap, max_chars, max_tokens
+        )
+        state = {"chunk_bounds": bounds, "chunk_tokens": None}
+        if entry.get("hash"):
+            record = load_cached_pdf(entry["hash"])
+            if record is not None and key not in record["chunk_bounds"]:
+                record["chunk_bounds"][key] = bounds.tolist()
+                save_cached_pdf(entry["hash"], record)
+    entry.update(state, chunk_key=key)
+    return True
+
+
+def rechunk_memory(memory: dict, chunk_size: int = 200, overlap: int = 50, chunk_mode: str = "words",
+                   max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None) -> tuple:
+    """기억 항목 전체를 새 청크 설정으로 다시 청킹하고 전역 인덱스의 청크도 바꿈 - (다시 청킹한 이름 목록, 소요 시간)"""
+    t0 = time.perf_counter()
+    rechunked = []
+    for name, entry in list(memory.items()):
+        corpus = entry.get("corpus")
+        try:
+            if corpus is None:
+                changed = rechunk_entry(entry, chunk_size, overlap, chunk_mode, max_chars, max_tokens)
+            else:
+                # 청크 경계를 바꾸는 것과 이전 청크에 삭제 표시하는 것 사이에 색인이 끼지 않도록 함께 잠금
+                with corpus._lock:
+                    changed = rechunk_entry(entry, chunk_size, overlap, chunk_mode, max_chars, max_tokens)
+                    if changed:
+                        corpus.reindex_document(entry)
+        except OSError:
+            continue  # 다시 청킹하는 동안 삭제된 항목
+        if changed:
+            rechunked.append(name)
+    return rechunked, time.perf_counter() - t0
+
+
+def rechunk_memory_async(memory: dict, chunk_size: int = 200, overlap: int = 50, chunk_mode: str = "words",
+                         max_chars: int = DEFAULT_MAX_CHARS, max_tokens: int = None) -> Future:
+    """새 스레드에서 rechunk_memory (기억 목록은 지금 상태로 복사해 넘김) - Future 반환
+
+    세션마다 자기 스레드를 쓰므로 한 세션의 큰 코퍼스가 다른 세션의 다시 청킹을 막지 않는다.
+    """
+    future = Future()
+    memory = dict(memory)
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(rechunk_memory(memory, chunk_size, overlap, chunk_mode, max_chars, max_tokens))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="rechunk", daemon=True).start()
+    return future
+
+
+def entry_chunks(entry: dict) -> ChunkView:
+    """기억 항목의 청크 (수집 중이면 지금까지 만들어진 청크)"""
+    return ChunkView(entry["store"], entry["chunk_bounds"])
+
+
+def chunk_token_counts(entry: dict, indices) -> np.ndarray:
+    """청크별 토큰 수 - 처음 요청된 청크만 세고 항목에 캐시"""
+    chunks = entry_chunks(entry)
+    counts = entry.get("chunk_tokens")
+    if counts is None or len(counts) < len(chunks):
+        grown = np.full(len(chunks), -1, dtype=np.int32)
+        if counts is not None:
+            grown[:len(counts)] = counts
+        counts = entry["chunk_tokens"] = grown
+    indices = np.asarray(indices, dtype=np.int64)
+    for i in indices[counts[indices] < 0].tolist():
+        counts[i] = count_tokens(chunks[i])
+    return counts[indices]
@@ -0,0 +1,636 @@
+"""청크 검색 인덱스 (BM25 역색인, 해시 임베딩 벡터 인덱스, 검색 결과 캐시)"""
+import functools
+import math
+import sys
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from index_tokenizer import index_tokens
+
+
+def top_scores(ids: np.ndarray, scores: np.ndarray, top_k: int) -> list:
+    """점수 상위 top_k개 - [(번호, 점수)], 점수 내림차순 (argpartition 후 k개만 정렬)"""
+    top_k = min(top_k, len(ids))
+    if top_k <= 0:
+        return []
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+class FrozenPostings:
+    """스냅샷에서 읽은 CSR 포스팅 (mmap 배열 그대로) - 토큰은 crc32 정렬표를 이진 탐색해 찾음
+
+    불러올 때 토큰 수만큼 객체를 만들지 않으므로 코퍼스 크기와 무관하게 바로 쓸 수 있다.
+    """
+
+    ARRAYS = ("term_hash", "term_offsets", "vocab", "posting_offsets", "posting_ids", "posting_tf")
+
+    def __init__(self, arrays: dict):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self) -> int:
+        return len(self.term_hash)
+
+    def _term(self, i: int) -> str:
+        return self.vocab[self.term_offsets[i]:self.term_offsets[i + 1]].tobytes().decode("utf-8")
+
+    def _posting(self, i: int) -> tuple:
+        start, end = self.posting_offsets[i], self.posting_offsets[i + 1]
+        return array("i", self.posting_ids[start:end].tobytes()), array("i", self.posting_tf[start:end].tobytes())
+
+    def get(self, term: str):
+        """토큰의 (청크 번호 array, 빈도 array) - 없으면 None"""
+        key = term.encode("utf-8")
+        h = zlib.crc32(key)
+        lo = int(np.searchsorted(self.term_hash, h, side="left"))
+        hi = int(np.searchsorted(self.term_hash, h, side="right"))
+        for i in range(lo, hi):
+            if self.vocab[self.term_offsets[i]:self.term_offsets[i + 1]].tobytes() == key:
+                return self._posting(i)
+        return None
+
+    def items(self):
+        """(토큰, 포스팅) 전체 순회 (스냅샷 저장과 압축용)"""
+        for i in range(len(self)):
+            yield self._term(i), self._posting(i)
+
+
+class BM25Index:
+    """청크 번호 기준 BM25 역색인 - 청크를 추가하는 대로 바로 검색 가능
+
+    질의 시간은 질문 토큰의 포스팅 길이에만 비례한다 (전체 청크를 훑지 않음).
+    delete는 청크에 삭제 표시만 하고 문서 빈도/평균 길이에서 뺀다. 실제 제거는 compacted로 한다.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # {토큰: (청크 번호 array, 빈도 array)}
+        self.doc_lengths = array("i")
+        self.total_length = 0  # 삭제 표시되지 않은 청크 길이 합
+        self.deleted = np.zeros(0, dtype=bool)  # 청크별 삭제 표시 (용량을 두 배씩 늘리고 제자리에서 갱신)
+        self.tombstones = 0
+        self.frozen = None  # 스냅샷에서 불러온 FrozenPostings (쓰는 토큰만 postings로 옮겨 옴)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_chunks(cls, chunks, **kwargs):
+        """청크 목록(또는 ChunkView)으로 인덱스 생성"""
+        index = cls(**kwargs)
+        index.add_many(chunks)
+        return index
+
+    def __len__(self) -> int:
+        """삭제 표시된 청크를 포함한 청크 번호 범위"""
+        return len(self.doc_lengths)
+
+    def _posting(self, term: str):
+        """토큰 포스팅 - 스냅샷에만 있으면 postings로 옮겨 옴 (잠금을 잡은 상태에서 호출)"""
+        posting = self.postings.get(term)
+        if posting is None and self.frozen is not None:
+            posting = self.frozen.get(term)
+            if posting is not None:
+                self.postings[term] = posting
+        return posting
+
+    def _iter_postings(self):
+        """(토큰, 포스팅) 전체 - 스냅샷에서 아직 옮겨 오지 않은 토큰 포함 (호출하는 쪽에서 추가를 막아야 함)"""
+        postings = dict(self.postings)
+        yield from postings.items()
+        if self.frozen is not None:
+            for term, posting in self.frozen.items():
+                if term not in postings:
+                    yield term, posting
+
+    def export_arrays(self) -> tuple:
+        """스냅샷용 평면 배열과 값 - ({이름: 배열}, {이름: 값}) (삭제 표시가 없어야 함)"""
+        terms, ids, tfs = [], [], []
+        for term, (term_ids, term_tf) in self._iter_postings():
+            terms.append(term.encode("utf-8"))
+            ids.append(np.array(term_ids, dtype=np.int32))
+            tfs.append(np.array(term_tf, dtype=np.int32))
+        hashes = np.array([zlib.crc32(term) for term in terms], dtype=np.uint32)
+        order = np.argsort(hashes, kind="stable").tolist()
+        terms = [terms[i] for i in order]
+        ids = [ids[i] for i in order]
+        tfs = [tfs[i] for i in order]
+        arrays = {
+            "term_hash": hashes[order],
+            "term_offsets": np.concatenate(([0], np.cumsum([len(term) for term in terms], dtype=np.int64))),
+            "vocab": np.frombuffer(b"".join(terms), dtype=np.uint8),
+            "posting_offsets": np.concatenate(([0], np.cumsum([len(i) for i in ids], dtype=np.int64))),
+            "posting_ids": np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32),
+            "posting_tf": np.concatenate(tfs) if tfs else np.zeros(0, dtype=np.int32),
+            "doc_lengths": np.array(self.doc_lengths, dtype=np.int32),
+        }
+        return arrays, {"k1": self.k1, "b": self.b, "total_length": self.total_length}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, values: dict) -> "BM25Index":
+        """export_arrays 결과(mmap 배열 가능)로 인덱스 생성 - 포스팅은 쓸 때 옮겨 옴"""
+        index = cls(values["k1"], values["b"])
+        index.frozen = FrozenPostings(arrays)
+        index.doc_lengths = array("i", np.asarray(arrays["doc_lengths"], dtype=np.int32).tobytes())
+        index.total_length = values["total_length"]
+        index.deleted = np.zeros(len(index.doc_lengths), dtype=bool)
+        return index
+
+    def add(self, text: str) -> int:
+        """청크 하나 색인 - 청크 번호 반환"""
+        counts = {}
+        for token in index_tokens(text):
+            counts[token] = counts.get(token, 0) + 1
+        length = sum(counts.values())
+        with self._lock:
+            doc_id = len(self.doc_lengths)
+            for token, tf in counts.items():
+                posting = self._posting(token)
+                if posting is None:
+                    posting = self.postings[token] = (array("i"), array("i"))
+                posting[0].append(doc_id)
+                posting[1].append(tf)
+            self.doc_lengths.append(length)
+            if doc_id >= len(self.deleted):
+                # 검색 중인 쪽은 이전 배열을 계속 보므로 새 배열로 바꿔 끼움
+                grown = np.zeros(max(1024, 2 * len(self.deleted)), dtype=bool)
+                grown[:len(self.deleted)] = self.deleted
+                self.deleted = grown
+            self.total_length += length
+        return doc_id
+
+    def add_many(self, texts):
+        """여러 청크를 순서대로 색인"""
+        for text in texts:
+            self.add(text)
+
+    def delete(self, doc_ids):
+        """청크에 삭제 표시 - 이후 검색 결과와 문서 빈도/평균 길이에서 빠짐"""
+        with self._lock:
+            for doc_id in doc_ids:
+                if not self.deleted[doc_id]:
+                    self.deleted[doc_id] = True
+                    self.total_length -= self.doc_lengths[doc_id]
+                    self.tombstones += 1
+
+    def compacted(self, doc_ids: np.ndarray) -> "BM25Index":
+        """doc_ids(오름차순) 청크만 0번부터 다시 번호를 매긴 새 인덱스
+
+        만드는 동안 다른 스레드가 청크를 추가해도 되며, 그 청크(포스팅 끝의 큰 번호)는 새 인덱스에 넣지 않는다.
+        """
+        remap = np.full(len(self.doc_lengths), -1, dtype=np.int64)
+        remap[doc_ids] = np.arange(len(doc_ids))
+        index = BM25Index(self.k1, self.b)
+        for term, (ids, tf) in self._iter_postings():
+            ids = np.array(ids, dtype=np.int64)
+            tf = np.array(tf, dtype=np.int32)
+            # 번호와 빈도는 따로 늘어나므로 둘 다 있고 remap 안에 있는 앞부분만 씀
+            size = min(len(ids), len(tf), int(np.searchsorted(ids, len(remap))))
+            new_ids = remap[ids[:size]]
+            keep = new_ids >= 0
+            if keep.any():
+                index.postings[term] = (
+                    array("i", new_ids[keep].astype(np.int32).tobytes()),
+                    array("i", tf[:size][keep].tobytes()),
+                )
+        lengths = np.array(self.doc_lengths, dtype=np.int32)[doc_ids]
+        index.doc_lengths = array("i", lengths.tobytes())
+        index.total_length = int(lengths.sum())
+        index.deleted = np.zeros(len(doc_ids), dtype=bool)
+        return index
+
+    def search(self, query: str, top_k: int = 3) -> list:
+        """BM25 상위 청크 - [(청크 번호, 점수)], 점수 내림차순 (삭제 표시된 청크 제외)"""
+        terms = set(index_tokens(query))
+        with self._lock:
+            n_docs = len(self.doc_lengths) - self.tombstones
+            if not n_docs or not terms:
+                return []
+            avg_length = self.total_length / n_docs
+            deleted = self.deleted if self.tombstones else None
+            ids, scores = [], []
+            for term in terms:
+                posting = self._posting(term)
+                if posting is None:
+                    continue
+                doc_ids = np.array(posting[0], dtype=np.int64)
+                tf = np.array(posting[1], dtype=np.float64)
+                if deleted is not None:
+                    live = ~deleted[doc_ids]
+                    doc_ids, tf = doc_ids[live], tf[live]
+                    if not len(doc_ids):
+                        continue
+                lengths = np.array([self.doc_lengths[i] for i in doc_ids.tolist()], dtype=np.float64)
+                idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                ids.append(doc_ids)
+                scores.append(idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths / avg_length)))
+        if not ids:
+            return []
+        doc_ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        return top_scores(doc_ids, np.bincount(inverse, weights=np.concatenate(scores)), top_k)
+
+
+# 해시 임베딩 차원과 수집 시 한 번에 임베딩하는 청크 수
+EMBEDDING_DIM = 1024
+EMBEDDING_BATCH = 256
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def _token_bucket(token: str) -> tuple:
+    """토큰의 (차원, 부호) - 프로세스와 무관하게 같은 값 (crc32)"""
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % EMBEDDING_DIM, 1.0 if h & 0x80000000 else -1.0
+
+
+def hashed_embeddings(texts) -> np.ndarray:
+    """텍스트 묶음을 부호 해시 TF 벡터로 (L2 정규화, float32 행렬)"""
+    texts = list(texts)
+    matrix = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        counts = {}
+        for token in index_tokens(text):
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            dim, sign = _token_bucket(token)
+            matrix[row, dim] += sign * (1.0 + math.log(tf))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class VectorIndex:
+    """청크 임베딩 행렬 (float32) - 상위 k개는 행렬-벡터 곱 한 번과 argpartition으로 찾음
+
+    해시 공간이 고정이라 수집 중에 계산한 벡터를 청크가 늘어나도 그대로 쓴다.
+    질의 벡터에는 차원별 문서 빈도로 구한 IDF를 곱해 흔한 n-gram의 영향을 줄인다.
+    delete는 행을 0으로 지우고(점수 0이라 결과에서 빠짐) 차원별 빈도에서 뺀다.
+    """
+
+    def __init__(self):
+        self.matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self.count = 0
+        self.dim_df = np.zeros(EMBEDDING_DIM, dtype=np.int64)  # 차원별로 값이 있는 청크 수
+        self.tombstones = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """청크 목록(또는 ChunkView)으로 인덱스 생성"""
+        index = cls()
+        index.add_many(chunks)
+        return index
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add_vectors(self, vectors: np.ndarray):
+        """임베딩 행 추가 (용량을 두 배씩 늘려 재할당 횟수를 줄임)"""
+        with self._lock:
+            self._append(vectors)
+
+    def _append(self, vectors: np.ndarray) -> int:
+        """잠금을 잡은 상태에서 행 추가 - 추가된 첫 행 번호 반환"""
+        start = self.count
+        end = start + len(vectors)
+        if end > len(self.matrix):
+            grown = np.zeros((max(end, 2 * len(self.matrix), EMBEDDING_BATCH), EMBEDDING_DIM), dtype=np.float32)
+            grown[:start] = self.matrix[:start]
+            self.matrix = grown
+        self.matrix[start:end] = vectors
+        self.dim_df += np.count_nonzero(vectors, axis=0)
+        self.count = end
+        return start
+
+    def add_many(self, texts):
+        """청크를 EMBEDDING_BATCH개씩 임베딩해 추가"""
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= EMBEDDING_BATCH:
+                self.add_vectors(hashed_embeddings(batch))
+                batch = []
+        if batch:
+            self.add_vectors(hashed_embeddings(batch))
+
+    def delete(self, rows):
+        """행에 삭제 표시 (0으로 지움) - 같은 행을 두 번 지우지 않아야 함"""
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            self.dim_df -= np.count_nonzero(self.matrix[rows], axis=0)
+            self.matrix[rows] = 0
+            self.tombstones += len(rows)
+
+    def _empty_like(self) -> "VectorIndex":
+        return type(self)()
+
+    def export_arrays(self) -> tuple:
+        """스냅샷용 평면 배열과 값 - ({이름: 배열}, {이름: 값}) (삭제 표시가 없어야 함)"""
+        with self._lock:
+            return {"matrix": self.matrix[:self.count], "dim_df": self.dim_df.copy()}, {}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, values: dict) -> "VectorIndex":
+        """export_arrays 결과로 인덱스 생성 - 행렬은 복사 없이 그대로 씀 (mmap이면 copy-on-write로)"""
+        index = cls(**values)
+        index.matrix = arrays["matrix"]
+        index.count = len(index.matrix)
+        index.dim_df = np.array(arrays["dim_df"], dtype=np.int64)
+        return index
+
+    def compacted(self, rows: np.ndarray) -> "VectorIndex":
+        """rows(오름차순) 행만 0번부터 다시 번호를 매긴 새 인덱스 (만드는 동안 추가되는 행은 넣지 않음)"""
+        index = self._empty_like()
+        index._append(self.matrix[rows])
+        return index
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        """IDF를 곱한 질의 벡터 (잠금을 잡은 상태에서 호출)"""
+        idf = np.log((self.count - self.tombstones + 1) / (self.dim_df + 1)).astype(np.float32) + 1
+        return hashed_embeddings([query])[0] * idf
+
+    def search(self, query: str, top_k: int = 3, nprobe: int = None) -> list:
+        """코사인 유사도 상위 청크 - [(청크 번호, 점수)], 점수 내림차순 (0점 이하 제외)
+
+        nprobe는 IVFVectorIndex와 같은 호출을 쓰기 위한 인자로, 전수 검색에서는 무시한다.
+        """
+        with self._lock:
+            matrix, count = self.matrix[:self.count], self.count
+            vector = self._query_vector(query)
+        if not count or not vector.any():
+            return []
+        scores = matrix @ vector
+        return [(i, score) for i, score in top_scores(np.arange(count), scores, top_k) if score > 0]
+
+
+# IVF 기본값 - 학습을 시작하는 벡터 수, 질의 시 살펴보는 리스트 수, k-means 반복 수
+IVF_MIN_VECTORS = 20000
+IVF_NPROBE = 8
+IVF_TRAIN_ITERATIONS = 8
+IVF_ASSIGN_BATCH = 4096
+
+
+class IVFVectorIndex(VectorIndex):
+    """IVF(역파일) 근사 최근접 이웃 인덱스 - VectorIndex와 같은 검색 API
+
+    min_train개까지는 전수 검색을 하고, 그 뒤에는 구형 k-means 중심(거친 양자화기)으로 벡터를
+    리스트에 나누어 질의와 가까운 nprobe개 리스트만 살펴본다. 새 벡터는 가장 가까운 리스트에
+    바로 추가되고, 학습 시점보다 4배 커지면 중심을 다시 학습한다.
+    n_lists가 많을수록, nprobe가 적을수록 빠르지만 재현율이 낮아진다.
+    """
+
+    def __init__(self, nprobe: int = IVF_NPROBE, min_train: int = IVF_MIN_VECTORS, n_lists: int = None):
+        super().__init__()
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.n_lists = n_lists
+        self.centroids = None
+        self.lists = []  # 리스트별 행 번호 array
+        self.trained_count = 0
+
+    @classmethod
+    def from_chunks(cls, chunks, **kwargs):
+        """청크 목록(또는 ChunkView)으로 인덱스 생성"""
+        index = cls(**kwargs)
+        index.add_many(chunks)
+        return index
+
+    def _empty_like(self) -> "IVFVectorIndex":
+        return type(self)(self.nprobe, self.min_train, self.n_lists)
+
+    def export_arrays(self) -> tuple:
+        """VectorIndex 배열에 학습된 중심과 리스트(CSR)를 더함"""
+        arrays, _ = super().export_arrays()
+        with self._lock:
+            values = {"nprobe": self.nprobe, "min_train": self.min_train, "n_lists": self.n_lists}
+            if self.centroids is not None:
+                arrays["centroids"] = self.centroids
+                arrays["list_offsets"] = np.concatenate(
+                    ([0], np.cumsum([len(rows) for rows in self.lists], dtype=np.int64))
+                )
+                arrays["list_rows"] = np.concatenate([np.array(rows, dtype=np.int32) for rows in self.lists])
+                values["trained_count"] = self.trained_count
+        return arrays, values
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, values: dict) -> "IVFVectorIndex":
+        """export_arrays 결과로 인덱스 생성 - 리스트 수만큼만 array를 만듦"""
+        values = dict(values)
+        trained_count = values.pop("trained_count", 0)
+        index = super().from_arrays(arrays, values)
+        if "centroids" in arrays:
+            index.centroids = np.asarray(arrays["centroids"])
+            offsets, rows = arrays["list_offsets"], arrays["list_rows"]
+            index.lists = [
+                array("i", rows[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(offsets) - 1)
+            ]
+            index.trained_count = trained_count
+        return index
+
+    def compacted(self, rows: np.ndarray) -> "IVFVectorIndex":
+        """rows 행만 담은 새 인덱스 - 학습된 중심은 그대로 쓰고 리스트의 행 번호만 바꿈"""
+        index = super().compacted(rows)
+        with self._lock:
+            # 추가/재학습과 겹치지 않도록 중심과 리스트를 한 번에 복사
+            centroids, trained_count, count = self.centroids, self.trained_count, self.count
+            lists = [np.array(row_ids, dtype=np.int64) for row_ids in self.lists]
+        if centroids is not None:
+            remap = np.full(count, -1, dtype=np.int64)
+            remap[rows] = np.arange(len(rows))
+            index.centroids = centroids
+            index.trained_count = min(trained_count, index.count)
+            for row_ids in lists:
+                new_rows = remap[row_ids]
+                index.lists.append(array("i", new_rows[new_rows >= 0].astype(np.int32).tobytes()))
+        return index
+
+    def add_vectors(self, vectors: np.ndarray):
+        """임베딩 행 추가 - 학습 전이면 필요할 때 학습하고, 학습 후면 가까운 리스트에 배정"""
+        with self._lock:
+            start = self._append(vectors)
+            if self.count >= max(self.min_train, 4 * self.trained_count):
+                self._train()
+            elif self.centroids is not None:
+                self._assign(start, self.count)
+
+    def _train(self):
+        """표본으로 구형 k-means 중심을 학습하고 모든 행을 다시 배정"""
+        count = self.count
+        n_lists = self.n_lists or int(min(max(math.sqrt(count), 16), 4096))
+        rng = np.random.default_rng(0)
+        sample = self.matrix[rng.choice(count, min(count, 64 * n_lists), replace=False)]
+        n_lists = min(n_lists, len(sample))
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # 빈 리스트는 이전 중심 유지
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+        self.centroids = centroids
+        self.lists = [array("i") for _ in range(n_lists)]
+        self.trained_count = count
+        self._assign(0, count)
+
+    def _assign(self, start: int, end: int):
+        """행 [start, end)를 가장 가까운 중심의 리스트에 추가"""
+        for batch_start in range(start, end, IVF_ASSIGN_BATCH):
+            batch_end = min(batch_start + IVF_ASSIGN_BATCH, end)
+            labels = np.argmax(self.matrix[batch_start:batch_end] @ self.centroids.T, axis=1)
+            for row, label in enumerate(labels.tolist(), batch_start):
+                self.lists[label].append(row)
+
+    def search(self, query: str, top_k: int = 3, nprobe: int = None) -> list:
+        """근사 코사인 유사도 상위 청크 - 질의와 가까운 nprobe개 리스트만 비교"""
+        with self._lock:
+            if self.centroids is None:
+                candidates = None
+            else:
+                vector = self._query_vector(query)
+                probe = min(nprobe or self.nprobe, len(self.lists))
+                nearest = np.argpartition(-(self.centroids @ vector), probe - 1)[:probe]
+                candidates = np.concatenate([np.array(self.lists[i], dtype=np.int64) for i in nearest])
+                candidate_vectors = self.matrix[candidates]
+        if candidates is None:
+            return super().search(query, top_k)
+        if not len(candidates) or not vector.any():
+            return []
+        scores = candidate_vectors @ vector
+        return [(i, score) for i, score in top_scores(candidates, scores, top_k) if score > 0]
+
+
+# RRF 상수와 소스별로 융합에 넘기는 후보 수 (top_k의 배수)
+RRF_K = 60
+HYBRID_DEPTH = 4
+
+# 어휘/벡터 검색을 동시에 돌리는 공용 스레드 풀 (NumPy 행렬 곱은 GIL을 놓음)
+_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+
+
+def reciprocal_rank_fusion(rankings: dict, k: int = RRF_K) -> list:
+    """소스별 [(번호, 점수)] 순위를 RRF로 합치기 - [{"chunk_id", "score", <소스>: 점수, <소스>_rank: 순위}]"""
+    fused = {}
+    for source, hits in rankings.items():
+        for rank, (chunk_id, score) in enumerate(hits, 1):
+            hit = fused.setdefault(chunk_id, {"chunk_id": chunk_id, "score": 0.0})
+            hit["score"] += 1.0 / (k + rank)
+            hit[source] = score
+            hit[f"{source}_rank"] = rank
+    return sorted(fused.values(), key=lambda hit: hit["score"], reverse=True)
+
+
+class HybridRetriever:
+    """BM25(어휘)와 벡터 검색을 동시에 실행해 RRF로 합치는 검색기
+
+    어휘 검색은 코드/품번/고유명사를, 벡터 검색은 표현이 다른 문장을 잡는다.
+    결과에는 융합 점수와 함께 소스별 점수(bm25, vector)와 순위가 들어 있다.
+    """
+
+    def __init__(self, lexical, vector=None, rrf_k: int = RRF_K):
+        self.lexical = lexical
+        self.vector = vector
+        self.rrf_k = rrf_k
+
+    def search(self, query: str, top_k: int = 3, nprobe: int = None) -> list:
+        """융합 상위 top_k개 - [{"chunk_id", "score", "bm25", "vector", ...}]"""
+        depth = max(top_k * HYBRID_DEPTH, 20)
+        futures = {"bm25": _search_pool.submit(self.lexical.search, query, depth)}
+        if self.vector is not None:
+            futures["vector"] = _search_pool.submit(self.vector.search, query, depth, nprobe)
+        rankings = {source: future.result() for source, future in futures.items()}
+        return reciprocal_rank_fusion(rankings, self.rrf_k)[:top_k]
+
+
+def describe_hit(hit: dict) -> str:
+    """검색 결과 한 줄 요약 (융합 점수와 소스별 점수/순위)"""
+    parts = [f"청크 {hit['chunk_id']}", f"RRF {hit['score']:.4f}"]
+    for source, label in (("bm25", "BM25"), ("vector", "벡터")):
+        if source in hit:
+            parts.append(f"{label} {hit[source]:.3f} ({hit[f'{source}_rank']}위)")
+    return " · ".join(parts)
+
+
+# 검색 결과 캐시에 보관할 최대 질의 수
+RETRIEVAL_CACHE_SIZE = 256
+
+
+def normalize_question(question: str) -> str:
+    """캐시 키용 질문 정규화 (NFKC, 소문자, 공백 하나로, 끝 문장부호 제거)"""
+    return " ".join(unicodedata.normalize("NFKC", question).lower().split()).rstrip("?!.。 ")
+
+
+def _result_bytes(value) -> int:
+    """검색 결과(리스트/튜플/딕셔너리/스칼라) 대략적인 메모리 크기"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_result_bytes(k) + _result_bytes(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_result_bytes(item) for item in value)
+    return size
+
+
+class RetrievalCache:
+    """(정규화한 질문, 인덱스 버전, 검색 설정) 키의 LRU 검색 결과 캐시
+
+    인덱스 버전이 바뀌면(PDF 추가/삭제, 새 청크 색인) 이전 버전 결과는 통째로 비운다.
+    저장한 결과는 읽기 전용으로 다룬다.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # {키: (결과, 크기)}
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, version, question: str, params: tuple, compute):
+        """캐시에 있으면 바로, 없으면 compute()로 구해 저장한 결과"""
+        key = (normalize_question(question), version, params)
+        with self._lock:
+            if version != self.version:
+                self.entries.clear()
+                self.bytes = 0
+                self.version = version
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+        result = compute()
+        size = _result_bytes(result)
+        with self._lock:
+            if version == self.version and key not in self.entries:
+                self.entries[key] = (result, size)
+                self.bytes += size
+                while len(self.entries) > self.max_entries:
+                    _, (_, evicted) = self.entries.popitem(last=False)
+                    self.bytes -= evicted
+        return result
+
+    def clear(self):
+        """저장한 결과와 통계 초기화"""
+        with self._lock:
+            self.entries.clear()
+            self.bytes = self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """{"entries", "bytes", "hits", "misses", "hit_rate"}"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,136 @@
+"""부분 문자열 검색 인덱스 (소문자 텍스트의 3글자 접두 정렬 위치표 - 깊이 3까지 정렬한 접미사 배열)
+
+업로드할 때 한 번 만들어 두면 검색어의 모든 등장 위치를 텍스트 전체를 훑지 않고 찾는다.
+검색어에서 가장 드문 3글자 조각의 위치 범위를 이진 탐색으로 찾고, 그 후보만 나머지 글자로 확인한다.
+on_disk로 만들면 두 배열을 디스크에 두고 mmap으로 읽으므로 세션 메모리에는 남지 않는다.
+"""
+import os
+import weakref
+
+import numpy as np
+
+# 조각 길이와 글자 하나가 차지하는 비트 수 (유니코드 코드 포인트는 21비트)
+GRAM_SIZE = 3
+_CHAR_BITS = 21
+_CHAR_MASK = (1 << _CHAR_BITS) - 1
+
+
+def lower_same_length(text: str) -> str:
+    """소문자 변환 - 글자 수가 바뀌는 문자(예: 'İ')는 그대로 두어 오프셋을 원문과 맞춤"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+def _codes(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _remove_files(paths: tuple):
+    """인덱스 파일 삭제 (이미 없으면 무시)"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class SubstringIndex:
+    """문서 하나의 소문자 텍스트에 대한 부분 문자열 인덱스 (글자당 8바이트: 코드 포인트 + 위치표)"""
+
+    def __init__(self, text: str):
+        # 끝에 0을 덧대 모든 위치가 3글자 조각을 갖게 함
+        self.codes = np.concatenate((_codes(lower_same_length(text)), np.zeros(GRAM_SIZE - 1, dtype=np.uint32)))
+        self.length = len(text)
+        keys = self._keys(np.arange(self.length))
+        self.positions = np.argsort(keys, kind="stable").astype(np.int32)  # 같은 조각 안에서는 위치 오름차순
+        self._finalizer = None
+
+    @classmethod
+    def on_disk(cls, text: str, path: str) -> "SubstringIndex":
+        """인덱스를 path.lower.npy / path.sfx.npy로 저장하고 mmap으로 다시 연 인덱스 (객체가 사라지면 파일 삭제)"""
+        index = cls(text)
+        paths = (f"{path}.lower.npy", f"{path}.sfx.npy")
+        np.save(paths[0], index.codes)
+        np.save(paths[1], index.positions)
+        # np.memmap 하위 클래스는 인덱싱마다 비용이 커서 같은 매핑을 보는 ndarray로 바꿔 씀
+        index.codes = np.asarray(np.load(paths[0], mmap_mode="r"))
+        index.positions = np.asarray(np.load(paths[1], mmap_mode="r"))
+        index._finalizer = weakref.finalize(index, _remove_files, paths)
+        return index
+
+    def delete(self):
+        """디스크에 둔 인덱스 파일 삭제 (메모리 인덱스면 아무것도 하지 않음)"""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _keys(self, positions: np.ndarray) -> np.ndarray:
+        """위치별 3글자 조각 키 (앞 글자가 상위 비트)"""
+        keys = np.zeros(len(positions), dtype=np.uint64)
+        for offset in range(GRAM_SIZE):
+            keys = (keys << np.uint64(_CHAR_BITS)) | self.codes[positions + offset].astype(np.uint64)
+        return keys
+
+    def _key_at(self, position: int) -> int:
+        key = 0
+        for offset in range(GRAM_SIZE):
+            key = (key << _CHAR_BITS) | int(self.codes[position + offset])
+        return key
+
+    def _bound(self, key: int, upper: bool) -> int:
+        """위치표에서 조각 키 key의 하한(upper면 상한) 이진 탐색"""
+        lo, hi = 0, self.length
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = self._key_at(int(self.positions[mid]))
+            if mid_key < key or (upper and mid_key == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _range(self, gram: np.ndarray) -> tuple:
+        """3글자 이하 조각으로 시작하는 위치들의 위치표 구간 [lo, hi)"""
+        key = 0
+        for code in gram.tolist():
+            key = (key << _CHAR_BITS) | code
+        free_bits = _CHAR_BITS * (GRAM_SIZE - len(gram))
+        low = key << free_bits
+        high = low | ((1 << free_bits) - 1)
+        return self._bound(low, False), self._bound(high, True)
+
+    def find_all(self, query: str) -> np.ndarray:
+        """검색어(대소문자 무시)의 모든 시작 위치 - 오름차순 int64 배열"""
+        query_codes = _codes(lower_same_length(query))
+        n = len(query_codes)
+        if not n or n > self.length:
+            return np.zeros(0, dtype=np.int64)
+        # 가장 드문 조각으로 후보를 좁힘
+        best = None
+        for offset in range(max(n - GRAM_SIZE, 0) + 1):
+            lo, hi = self._range(query_codes[offset:offset + GRAM_SIZE])
+            if best is None or hi - lo < best[2] - best[1]:
+                best = (offset, lo, hi)
+            if hi == lo:
+                return np.zeros(0, dtype=np.int64)
+        offset, lo, hi = best
+        starts = self.positions[lo:hi].astype(np.int64) - offset
+        starts = starts[(starts >= 0) & (starts + n <= self.length)]
+        for i in range(n):
+            if offset <= i < offset + GRAM_SIZE:
+                continue
+            starts = starts[self.codes[starts + i] == query_codes[i]]
+        return np.sort(starts)
+
+    def count(self, query: str) -> int:
+        """검색어 등장 횟수"""
+        return len(self.find_all(query))
+
+    def first(self, query: str) -> int:
+        """검색어가 처음 나오는 위치 - 없으면 -1"""
+        starts = self.find_all(query)
+        return int(starts[0]) if len(starts) else -1
@@ -0,0 +1,41 @@
+"""테스트 공용 픽스처 - 수집이 끝난 기억 항목 만들기"""
+import numpy as np
+import pytest
+
+from chunking import chunk_bounds
+from page_store import PageStore
+
+WORDS = ["계약", "예산", "인공지능", "회의", "보고서", "Quality", "일정", "고객", "서버", "보안", "network", "AI"]
+
+
+def random_text(seed: int, n_words: int, extra: str = "") -> str:
+    """공백/줄바꿈이 섞인 한국어·영어 텍스트"""
+    rng = np.random.default_rng(seed)
+    seps = rng.choice([" ", "  ", "\n", "\t ", " \n\n"], n_words)
+    return "".join(f"{w}{s}" for w, s in zip(rng.choice(WORDS, n_words), seps)) + extra
+
+
+@pytest.fixture
+def make_entry(tmp_path):
+    """텍스트로 수집이 끝난 기억 항목을 만드는 함수 (저장소는 tmp_path 아래)"""
+    def make(text: str, chunk_size: int = 20, overlap: int = 5) -> dict:
+        return {
+            "store": PageStore.from_text(text, str(tmp_path / "store")),
+            "chunk_bounds": chunk_bounds(text, chunk_size, overlap).tolist(),
+            "chunk_variants": {},
+            "status": "done",
+            "pages_done": 1,
+            "page_count": 1,
+            "page_offsets": [0, len(text)],
+        }
+    return make
+
+
+@pytest.fixture
+def make_memory(make_entry):
+    """문서마다 고유어{i}가 하나씩 든 기억 목록을 만드는 함수"""
+    def make(count: int = 12, first: int = 0) -> dict:
+        return {
+            f"{i}.pdf": make_entry(random_text(i, 300, f" 고유어{i}")) for i in range(first, first + count)
+        }
+    return make
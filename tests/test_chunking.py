@@ -0,0 +1,91 @@
+"""청킹 테스트"""
+import numpy as np
+import pytest
+
+from chunking import (
+    ChunkView, IncrementalChunker, chunk_bounds, make_chunker, sentence_chunk_bounds, sentence_spans,
+)
+
+WORDS = ["계약", "예산", "인공지능", "회의", "보고서", "Quality", "일정", "고객", "서버", "보안", "network", "AI"]
+
+
+def random_text(seed: int, n_words: int) -> str:
+    """공백/줄바꿈이 섞인 한국어·영어 텍스트"""
+    rng = np.random.default_rng(seed)
+    seps = rng.choice([" ", "  ", "\n", "\t ", " \n\n"], n_words)
+    return "".join(f"{w}{s}" for w, s in zip(rng.choice(WORDS, n_words), seps))
+
+
+def old_chunk_text(text, chunk_size=200, overlap=50):
+    """이전 앱의 chunk_text (비교 기준)"""
+    words = text.split()
+    chunks = []
+    start = 0
+    while start < len(words):
+        chunks.append(" ".join(words[start:start + chunk_size]))
+        start += chunk_size - overlap
+    return chunks
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(200, 50), (20, 5), (7, 0), (5, 10)])
+@pytest.mark.parametrize("text", ["", "   \n ", "하나", random_text(0, 500), random_text(1, 57)])
+def test_chunk_bounds_matches_chunk_text(text, chunk_size, overlap):
+    if overlap >= chunk_size:
+        # 예전 코드는 step이 0 이하면 끝나지 않으므로 step=1로 비교
+        expected = old_chunk_text(text, chunk_size, chunk_size - 1)
+    else:
+        expected = old_chunk_text(text, chunk_size, overlap)
+    assert list(ChunkView(text, chunk_bounds(text, chunk_size, overlap))) == expected
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(200, 50), (20, 5), (7, 0), (5, 10)])
+def test_incremental_chunker_across_pages_matches_chunk_bounds(chunk_size, overlap):
+    # 빈 페이지, 한 단어 페이지, 청크보다 긴 페이지가 섞인 문서를 수집과 같은 방식으로 이어 붙임
+    pages = [random_text(seed, n) for seed, n in enumerate([0, 1, 3, 250, 0, 40, 17, 400])]
+    chunker = IncrementalChunker(chunk_size, overlap)
+    text, bounds = "", []
+    for page in pages:
+        offset = len(text)
+        text += page + "\n"
+        bounds.extend(chunker.feed(page, offset))
+    bounds.extend(chunker.finish())
+    assert np.array_equal(np.array(bounds, dtype=np.int64).reshape(-1, 2), chunk_bounds(text, chunk_size, overlap))
+
+
+KOREAN = "회의는 3시에 시작합니다. 예산을 검토했다.다음 안건은 보안이다! 정말요? 비율 3.5%는 유지 (잠정).\n\n표 제목\n항목 값"
+
+
+def test_sentence_spans_korean():
+    # 띄어쓰기 없는 종결(했다.다음)과 빈 줄은 나누고 소수점은 나누지 않음
+    assert [KOREAN[start:end] for start, end in sentence_spans(KOREAN)] == [
+        "회의는 3시에 시작합니다.", "예산을 검토했다.", "다음 안건은 보안이다!", "정말요?", "비율 3.5%는 유지 (잠정).",
+        "표 제목\n항목 값",
+    ]
+    long_sentence = "가나다 " * 10
+    assert [long_sentence[start:end] for start, end in sentence_spans(long_sentence, max_chars=8)] == ["가나다 가나다"] * 5
+
+
+def test_sentence_chunks_pack_whole_sentences():
+    assert [KOREAN[start:end] for start, end in sentence_chunk_bounds(KOREAN, max_chars=30)] == [
+        "회의는 3시에 시작합니다. 예산을 검토했다.", "다음 안건은 보안이다! 정말요?", "비율 3.5%는 유지 (잠정).\n\n표 제목\n항목 값",
+    ]
+
+
+@pytest.mark.parametrize("max_chars", [1, 15, 80, 1000])
+def test_sentence_chunks_stay_within_pages_and_budget(max_chars):
+    pages = [KOREAN, "", random_text(3, 120).replace("보안", "보안이다."), "한문장짜리페이지" * 20]
+    text, page_offsets = "", [0]
+    for page in pages:
+        text += page + "\n"
+        page_offsets.append(len(text))
+    bounds = sentence_chunk_bounds(text, max_chars, page_offsets)
+    assert all(0 < end - start <= max_chars for start, end in bounds)
+    assert all(np.searchsorted(page_offsets, start, side="right") == np.searchsorted(page_offsets, end - 1, side="right")
+               for start, end in bounds)
+    # 공백을 빼면 청크를 이어 붙인 내용이 원문과 같음 (빠지거나 겹치는 글자 없음)
+    assert "".join("".join(text[start:end].split()) for start, end in bounds) == "".join(text.split())
+
+    chunker = make_chunker("sentence", max_chars=max_chars)
+    fed = [bound for start, end in zip(page_offsets[:-1], page_offsets[1:])
+           for bound in chunker.feed(text[start:end], start)]
+    assert fed + chunker.finish() == bounds.tolist()
@@ -0,0 +1,157 @@
+"""전역 인덱스 증분 갱신(삭제, 다시 색인, 압축)과 검색 캐시 무효화 테스트"""
+import threading
+
+from chunking import chunk_bounds
+from corpus_index import CorpusIndex
+from retrieval import BM25Index
+
+QUERIES = ["예산 보안 고유어7", "고유어9 network", "고유어2", "회의 일정", "고유어13 계약"]
+
+
+def build(memory: dict) -> CorpusIndex:
+    corpus = CorpusIndex()
+    for name, entry in memory.items():
+        corpus.add_document(name, entry)
+    return corpus
+
+
+def fresh_copy(memory: dict, make_entry) -> dict:
+    """같은 텍스트와 청크 경계로 새로 만든 기억 목록"""
+    fresh = {}
+    for name, entry in memory.items():
+        fresh[name] = make_entry(entry["store"].text())
+        fresh[name]["chunk_bounds"] = list(entry["chunk_bounds"])
+    return fresh
+
+
+def hits(corpus: CorpusIndex, query: str, top_k: int = 5) -> list:
+    return [(hit["name"], hit["chunk_id"], round(hit["score"], 6)) for hit in corpus.search(query, top_k)]
+
+
+def lexical_hits(corpus: CorpusIndex, query: str) -> list:
+    """BM25 전체 결과를 (문서 이름, 문서 내 청크 번호, 점수)로 - 전역 행 순서와 동점 순서에 무관하게 정렬"""
+    rows = corpus.lexical.search(query, len(corpus.chunk_doc))
+    return sorted(
+        (corpus.docs[corpus.chunk_doc[row]]["name"], corpus.chunk_local[row], round(score, 9)) for row, score in rows
+    )
+
+
+def best_sentences(corpus: CorpusIndex, query: str) -> list:
+    """문서별 상위 문장을 (문서 이름, [(시작, 끝)])로 - 문서 번호에 무관하게 비교"""
+    return [
+        (corpus.docs[doc_id]["name"], [(start, end) for start, end, _ in sentences])
+        for doc_id, sentences in corpus.best_sentences_per_document(query)
+    ]
+
+
+def assert_matches_fresh(corpus: CorpusIndex, fresh: CorpusIndex):
+    # 행 순서가 달라 동점 순서와 벡터 군집은 다를 수 있으므로 BM25 점수와 1위만 비교
+    for query in QUERIES:
+        lexical = lexical_hits(corpus, query)
+        assert lexical == lexical_hits(fresh, query)
+        scores = sorted((score for *_, score in lexical), reverse=True)
+        if len(scores) > 1 and scores[0] > scores[1]:
+            assert hits(corpus, query, 1)[0][:2] == hits(fresh, query, 1)[0][:2]
+        assert best_sentences(corpus, query) == best_sentences(fresh, query)
+    topics, fresh_topics = corpus.common_topics(), fresh.common_topics()
+    assert [topic[:2] for topic in topics] == [topic[:2] for topic in fresh_topics]
+
+
+def assert_rows_consistent(corpus: CorpusIndex):
+    """문서별 행 목록이 번호 표와 맞는지 (삭제가 그 행만 건드리는 근거)"""
+    for doc_id, doc in corpus.docs.items():
+        assert [corpus.chunk_doc[row] for row in doc["chunk_rows"]] == [doc_id] * len(doc["chunk_rows"])
+        assert sorted(corpus.chunk_local[row] for row in doc["chunk_rows"]) == list(range(doc["indexed"]))
+        assert [corpus.sentence_doc[row] for row in doc["sentence_rows"]] == [doc_id] * len(doc["sentence_rows"])
+    live = sum(len(doc["chunk_rows"]) for doc in corpus.docs.values())
+    assert live == sum(1 for doc_id in corpus.chunk_doc if doc_id >= 0)
+
+
+def test_delete_reindex_compact_matches_fresh_build(make_memory, make_entry):
+    memory = make_memory()
+    corpus = build(memory)
+    removed = list(memory)[:4]
+    for name in removed:
+        corpus.remove_document(memory.pop(name))
+    # 청크 설정 변경 후 같은 문서 번호로 청크만 다시 색인
+    changed = memory["7.pdf"]
+    changed["chunk_bounds"] = chunk_bounds(changed["store"].text(), 30, 10).tolist()
+    corpus.reindex_document(changed)
+    assert_rows_consistent(corpus)
+
+    fresh = build(fresh_copy(memory, make_entry))
+    assert_matches_fresh(corpus, fresh)
+    assert not any(hit["name"] in removed for hit in corpus.search("고유어2 고유어3", 10))
+
+    corpus.compact()
+    assert corpus.stats() == fresh.stats()
+    assert_rows_consistent(corpus)
+    assert_matches_fresh(corpus, fresh)
+
+
+def test_changes_during_compaction_are_kept(make_memory, make_entry, monkeypatch):
+    memory = make_memory()
+    corpus = build(memory)
+    for name in list(memory)[:4]:
+        corpus.remove_document(memory.pop(name))
+    extra = make_memory(2, first=12)
+    original = BM25Index.compacted
+    calls = []
+
+    def change_while_rebuilding(index, rows):
+        if not calls:
+            # 다른 스레드에서 추가/삭제/다시 색인 - 압축이 잠금을 잡고 있으면 끝나지 않음
+            def writer():
+                for name, entry in extra.items():
+                    corpus.add_document(name, entry)
+                    memory[name] = entry
+                corpus.remove_document(memory.pop("5.pdf"))
+                changed = memory["7.pdf"]
+                changed["chunk_bounds"] = chunk_bounds(changed["store"].text(), 30, 10).tolist()
+                corpus.reindex_document(changed)
+
+            thread = threading.Thread(target=writer)
+            thread.start()
+            thread.join(timeout=10)
+            assert not thread.is_alive()
+            assert corpus.stats()["compacting"]
+        calls.append(rows)
+        return original(index, rows)
+
+    monkeypatch.setattr(BM25Index, "compacted", change_while_rebuilding)
+    corpus.compact()
+    assert not corpus.compacting
+    assert_rows_consistent(corpus)
+
+    fresh = build(fresh_copy(memory, make_entry))
+    assert_matches_fresh(corpus, fresh)
+    assert all(hit["name"] != "5.pdf" for hit in corpus.search("고유어5", 10))
+
+    # 압축 중 삭제된 행은 새 인덱스에서 삭제 표시로 남았다가 다음 압축에서 빠짐
+    assert corpus.stats()["tombstones"] > 0
+    corpus.compact()
+    assert corpus.stats() == fresh.stats()
+    assert_matches_fresh(corpus, fresh)
+
+
+def test_cache_hits_and_invalidation_on_add_and_delete(make_memory):
+    memory = make_memory(3)
+    corpus = build(memory)
+    first = corpus.search("고유어1 예산", 3)
+    assert corpus.search("  고유어1   예산? ", 3) is first  # 정규화한 질문이 같으면 캐시 적중
+    assert (corpus.cache.stats()["hits"], corpus.cache.stats()["misses"]) == (1, 1)
+    assert "5.pdf" not in {hit["name"] for hit in corpus.search("고유어5", 3)}
+
+    # 문서를 추가하면 이전 버전 결과를 버리고 새 문서가 바로 검색됨
+    memory.update(make_memory(1, first=5))
+    corpus.add_document("5.pdf", memory["5.pdf"])
+    assert corpus.search("고유어5", 1)[0]["name"] == "5.pdf"
+    assert best_sentences(corpus, "고유어5")[0][0] == "5.pdf"
+    assert (corpus.cache.stats()["entries"], corpus.cache.stats()["hits"]) == (2, 1)
+
+    # 삭제한 문서는 캐시된 결과에도 남지 않음
+    assert "1.pdf" in {hit["name"] for hit in corpus.search("고유어1 예산", 3)}
+    corpus.remove_document(memory.pop("1.pdf"))
+    assert "1.pdf" not in {hit["name"] for hit in corpus.search("고유어1 예산", 3)}
+    assert "1.pdf" not in [name for name, _ in best_sentences(corpus, "고유어1")]
+    assert (corpus.cache.stats()["entries"], corpus.cache.stats()["hits"]) == (2, 1)
@@ -0,0 +1,114 @@
+"""인덱스 스냅샷 저장/불러오기와 세션 간 병합 테스트"""
+import multiprocessing
+
+import numpy as np
+
+from chunking import chunk_bounds
+from corpus_index import CorpusIndex
+from index_snapshot import load_snapshot, merge_snapshot, save_snapshot
+from page_store import PageStore
+
+
+def build(memory: dict) -> CorpusIndex:
+    corpus = CorpusIndex()
+    for name, entry in memory.items():
+        corpus.add_document(name, entry)
+    return corpus
+
+
+def hits(corpus: CorpusIndex, query: str, top_k: int = 5) -> list:
+    return [(hit["name"], hit["chunk_id"], round(hit["score"], 6)) for hit in corpus.search(query, top_k)]
+
+
+def test_snapshot_round_trip(tmp_path, make_memory):
+    memory = make_memory(6)
+    corpus = build(memory)
+    corpus.remove_document(memory.pop("0.pdf"))
+    snapshot_dir = str(tmp_path / "snapshot")
+
+    assert save_snapshot(corpus, memory, snapshot_dir) == "v000001"
+    loaded = load_snapshot(snapshot_dir)
+    assert loaded["version"] == 1
+    assert sorted(loaded["memory"]) == sorted(memory)
+    for name, entry in memory.items():
+        restored = loaded["memory"][name]
+        assert restored["store"].text() == entry["store"].text()
+        assert np.array_equal(restored["chunk_bounds"], entry["chunk_bounds"])
+    restored_corpus = loaded["corpus"]
+    assert restored_corpus.stats() == corpus.stats()
+    for query in ["예산 보안 고유어3", "고유어5", "고유어0", "network AI"]:
+        assert hits(restored_corpus, query) == hits(corpus, query)
+    assert restored_corpus.common_topics() == corpus.common_topics()
+
+
+def test_snapshot_skipped_while_ingesting(tmp_path, make_memory):
+    memory = make_memory(2)
+    corpus = build(memory)
+    memory["1.pdf"]["status"] = "ingesting"
+    assert save_snapshot(corpus, memory, str(tmp_path / "snapshot")) is None
+    assert load_snapshot(str(tmp_path / "snapshot")) is None
+
+
+def test_sessions_merge_uploads_without_losing_each_other(tmp_path, make_memory):
+    snapshot_dir = str(tmp_path / "snapshot")
+    base = make_memory(3)
+    assert merge_snapshot(base, snapshot_dir) == ("v000001", ["0.pdf", "1.pdf", "2.pdf"])
+
+    # 두 세션이 같은 버전을 불러온 뒤 각자 PDF를 하나씩 올림
+    session_a, session_b = load_snapshot(snapshot_dir), load_snapshot(snapshot_dir)
+    for session, name in ((session_a, "3.pdf"), (session_b, "4.pdf")):
+        entry = make_memory(1, first=int(name[0]))[name]
+        session["corpus"].add_document(name, entry)
+        session["memory"][name] = entry
+    assert merge_snapshot(session_a["memory"], snapshot_dir) == ("v000002", ["3.pdf"])
+    assert merge_snapshot(session_b["memory"], snapshot_dir) == ("v000003", ["4.pdf"])
+
+    merged = load_snapshot(snapshot_dir)
+    assert sorted(merged["memory"]) == ["0.pdf", "1.pdf", "2.pdf", "3.pdf", "4.pdf"]
+    assert merged["corpus"].search("고유어3", 1)[0]["name"] == "3.pdf"
+    assert merged["corpus"].search("고유어4", 1)[0]["name"] == "4.pdf"
+    # 병합은 세션 항목을 바꾸지 않음
+    assert session_b["memory"]["4.pdf"]["corpus"] is session_b["corpus"]
+
+
+def test_session_delete_and_reset_are_not_persisted(tmp_path, make_memory):
+    snapshot_dir = str(tmp_path / "snapshot")
+    merge_snapshot(make_memory(3), snapshot_dir)
+    session = load_snapshot(snapshot_dir)
+    session["corpus"].remove_document(session["memory"].pop("1.pdf"))
+    assert merge_snapshot(session["memory"], snapshot_dir) == (None, [])
+    assert merge_snapshot({}, snapshot_dir) == (None, [])
+    assert sorted(load_snapshot(snapshot_dir)["memory"]) == ["0.pdf", "1.pdf", "2.pdf"]
+
+
+def test_merge_skips_known_content_and_unfinished_entries(tmp_path, make_memory):
+    snapshot_dir = str(tmp_path / "snapshot")
+    memory = make_memory(2)
+    memory["0.pdf"]["hash"] = "same-content"
+    merge_snapshot(memory, snapshot_dir)
+    renamed = make_memory(2, first=5)
+    renamed["5.pdf"]["hash"] = "same-content"
+    renamed["6.pdf"]["status"] = "error"
+    assert merge_snapshot(renamed, snapshot_dir) == (None, [])
+
+
+def _merge_in_process(snapshot_dir: str, store_dir: str, i: int):
+    text = f"프로세스{i} 보고서 예산 " * 50
+    entry = {
+        "store": PageStore.from_text(text, store_dir),
+        "chunk_bounds": chunk_bounds(text, 20, 5),
+        "status": "done",
+        "page_count": 1,
+        "pages_done": 1,
+        "page_offsets": [0, len(text)],
+    }
+    return merge_snapshot({f"proc{i}.pdf": entry}, snapshot_dir)[0]
+
+
+def test_concurrent_processes_get_distinct_versions(tmp_path):
+    snapshot_dir, store_dir = str(tmp_path / "snapshot"), str(tmp_path / "store")
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(4) as pool:
+        versions = pool.starmap(_merge_in_process, [(snapshot_dir, store_dir, i) for i in range(4)])
+    assert sorted(versions) == ["v000001", "v000002", "v000003", "v000004"]
+    assert sorted(load_snapshot(snapshot_dir)["memory"]) == [f"proc{i}.pdf" for i in range(4)]
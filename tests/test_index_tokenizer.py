@@ -0,0 +1,21 @@
+"""검색 색인 토크나이저 테스트"""
+from index_tokenizer import index_terms, index_tokens
+
+
+def test_hangul_ngrams_and_lowercase_words():
+    assert index_tokens("계약기간은") == ["계약", "약기", "기간", "간은", "계약기", "약기간", "기간은"]
+    assert index_tokens("AI 서버, Network_2024!") == ["ai", "서버", "network", "2024"]
+    assert index_tokens("가 나다") == ["가", "나다"]
+    assert index_tokens("") == [] and index_tokens(" ,.!\n") == []
+
+
+def test_mixed_runs_split_at_script_boundary():
+    assert index_tokens("GPT4모델로") == ["gpt4", "모델", "델로", "모델로"]
+    assert index_tokens("ÉCOLE café") == ["école", "café"]
+
+
+def test_query_with_particle_shares_terms_with_document():
+    # 조사가 붙어도 어간 2-gram이 겹쳐 검색됨
+    document = index_terms("이번 계약의 기간은 2년입니다")
+    assert {"계약", "기간"} <= document & index_terms("계약기간")
+    assert index_terms("보안 보안 보안") == {"보안"}
@@ -0,0 +1,23 @@
+"""문서 텍스트 저장소 테스트"""
+import os
+
+from page_store import PageStore
+
+
+def test_append_reads_back_text(tmp_path):
+    store = PageStore.create(str(tmp_path))
+    assert store.append("첫 페이지\n") == 0
+    assert store.append("second 페이지\n") == 6
+    assert store.text() == "첫 페이지\nsecond 페이지\n"
+    assert store[6:12] == "second"
+
+
+def test_append_after_delete_does_not_recreate_file(tmp_path):
+    store = PageStore.create(str(tmp_path))
+    store.append("수집 중인 페이지\n")
+    store.delete()
+    assert not os.path.exists(store.path)
+    # 수집 취소와 겹쳐 늦게 도착한 페이지
+    store.append("늦게 도착한 페이지\n")
+    assert not os.path.exists(store.path)
+    assert not list(tmp_path.iterdir())
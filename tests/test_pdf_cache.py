@@ -0,0 +1,51 @@
+"""PDF 추출 캐시 테스트"""
+import os
+
+from pdf_cache import cache_usage, evict_lru, load_cached_pdf, pdf_hash, save_cached_pdf
+
+
+def record(n: int) -> dict:
+    return {"pages": [f"페이지 {n} " * 50], "page_count": 1}
+
+
+def test_hit_miss_and_corrupt_file(tmp_path):
+    cache_dir = str(tmp_path)
+    digest = pdf_hash(b"%PDF-1.4 a")
+    assert digest == pdf_hash(b"%PDF-1.4 a") != pdf_hash(b"%PDF-1.4 b")
+    assert load_cached_pdf(digest, cache_dir) is None
+    assert save_cached_pdf(digest, record(0), cache_dir)
+    assert load_cached_pdf(digest, cache_dir) == record(0)
+    assert [name for name in os.listdir(cache_dir) if name.endswith(".tmp")] == []
+
+    (tmp_path / f"{digest}.json").write_text("{잘린 파일", encoding="utf-8")
+    assert load_cached_pdf(digest, cache_dir) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    digests = [pdf_hash(bytes([n])) for n in range(4)]
+    for n, digest in enumerate(digests):
+        save_cached_pdf(digest, record(n), cache_dir, max_bytes=None)
+        os.utime(tmp_path / f"{digest}.json", (1000 + n, 1000 + n))
+    size = cache_usage(cache_dir)["bytes"] // 4
+
+    # 가장 오래된 0번을 읽으면 최근 사용으로 바뀌어 1번이 먼저 삭제됨
+    assert load_cached_pdf(digests[0], cache_dir) == record(0)
+    assert evict_lru(cache_dir, max_bytes=3 * size) == 1
+    assert load_cached_pdf(digests[1], cache_dir) is None
+    assert cache_usage(cache_dir)["files"] == 3
+
+    # keep에 있는 항목은 오래됐어도 남김
+    assert evict_lru(cache_dir, max_bytes=size, keep=[digests[2]]) == 2
+    assert load_cached_pdf(digests[2], cache_dir) == record(2)
+    assert cache_usage(cache_dir)["files"] == 1
+
+
+def test_save_evicts_over_budget(tmp_path):
+    cache_dir = str(tmp_path)
+    save_cached_pdf("a", record(0), cache_dir)
+    os.utime(tmp_path / "a.json", (1000, 1000))
+    size = cache_usage(cache_dir)["bytes"]
+    save_cached_pdf("b", record(1), cache_dir, max_bytes=size)
+    assert load_cached_pdf("a", cache_dir) is None
+    assert load_cached_pdf("b", cache_dir) == record(1)
@@ -0,0 +1,160 @@
+"""검색 인덱스 테스트 (BM25, IVF 근사 검색, RRF 융합, 검색 결과 캐시)"""
+import math
+
+import numpy as np
+import pytest
+
+from index_tokenizer import index_tokens
+from retrieval import (
+    BM25Index, HybridRetriever, IVFVectorIndex, RetrievalCache, VectorIndex, normalize_question, reciprocal_rank_fusion,
+)
+
+TOPIC_WORDS = [[f"주제{topic}단어{i}" for i in range(40)] for topic in range(20)]
+COMMON_WORDS = [f"common{i}" for i in range(50)]
+
+
+def clustered_texts(seed: int, n_texts: int) -> list:
+    """주제별 어휘 20개 묶음에서 뽑은 청크 (실제 문서처럼 군집이 있는 벡터)"""
+    rng = np.random.default_rng(seed)
+    return [
+        " ".join([*rng.choice(TOPIC_WORDS[topic], 20), *rng.choice(COMMON_WORDS, 5)])
+        for topic in rng.integers(0, len(TOPIC_WORDS), n_texts)
+    ]
+
+
+def topic_queries(seed: int, n_queries: int) -> list:
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(TOPIC_WORDS[topic], 4)) for topic in rng.integers(0, len(TOPIC_WORDS), n_queries)]
+
+
+@pytest.fixture(scope="module")
+def vector_indexes():
+    texts = clustered_texts(0, 2500)
+    exact = VectorIndex.from_chunks(texts)
+    # 학습 뒤에 들어온 행은 가장 가까운 리스트에 바로 배정됨
+    ivf = IVFVectorIndex.from_chunks(texts[:1500], min_train=1000, n_lists=32)
+    ivf.add_many(texts[1500:])
+    return exact, ivf
+
+
+def test_ivf_recall_against_exact_search(vector_indexes):
+    exact, ivf = vector_indexes
+    assert ivf.centroids is not None and sum(len(rows) for rows in ivf.lists) == len(ivf)
+    recalls = []
+    for query in topic_queries(1, 40):
+        expected = {i for i, _ in exact.search(query, 10)}
+        recalls.append(len(expected & {i for i, _ in ivf.search(query, 10)}) / len(expected))
+    assert np.mean(recalls) >= 0.95
+
+
+def test_ivf_probing_every_list_matches_exact_scores(vector_indexes):
+    exact, ivf = vector_indexes
+    for query in topic_queries(2, 20):
+        expected = [score for _, score in exact.search(query, 10)]
+        assert [score for _, score in ivf.search(query, 10, nprobe=len(ivf.lists))] == pytest.approx(expected)
+
+
+def test_ivf_below_min_train_is_exact():
+    texts = clustered_texts(3, 300)
+    exact, ivf = VectorIndex.from_chunks(texts), IVFVectorIndex.from_chunks(texts, min_train=1000)
+    assert ivf.centroids is None
+    for query in topic_queries(4, 10):
+        assert ivf.search(query, 5) == exact.search(query, 5)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion({"bm25": [(1, 5.0), (2, 3.0)], "vector": [(2, 0.9), (3, 0.5)]}, k=60)
+    assert [hit["chunk_id"] for hit in fused] == [2, 1, 3]
+    assert fused[0] == {
+        "chunk_id": 2, "score": pytest.approx(1 / 62 + 1 / 61),
+        "bm25": 3.0, "bm25_rank": 2, "vector": 0.9, "vector_rank": 1,
+    }
+    assert fused[1] == {"chunk_id": 1, "score": pytest.approx(1 / 61), "bm25": 5.0, "bm25_rank": 1}
+    assert fused[2] == {"chunk_id": 3, "score": pytest.approx(1 / 62), "vector": 0.5, "vector_rank": 2}
+    assert reciprocal_rank_fusion({"bm25": [], "vector": []}) == []
+
+
+def test_hybrid_retriever_fuses_both_sources():
+    chunks = [
+        "부품 ZX-9000 교체 절차",
+        "서버 점검 일정은 매주 월요일",
+        "서버 점검 일정 ZX-9000 포함",
+        "예산 회의 결과 보고",
+    ]
+    lexical, vector = BM25Index.from_chunks(chunks), VectorIndex.from_chunks(chunks)
+    hits = HybridRetriever(lexical, vector).search("ZX-9000 서버 점검", top_k=3)
+    assert hits[0]["chunk_id"] == 2 and {"bm25", "vector"} <= set(hits[0])
+    fused = reciprocal_rank_fusion({"bm25": lexical.search("ZX-9000 서버 점검", 20),
+                                    "vector": vector.search("ZX-9000 서버 점검", 20)})
+    assert hits == fused[:3]
+
+    # 벡터 인덱스가 없으면 BM25 순위 그대로
+    lexical_only = HybridRetriever(lexical).search("ZX-9000", top_k=3)
+    assert [hit["chunk_id"] for hit in lexical_only] == [chunk_id for chunk_id, _ in lexical.search("ZX-9000", 3)]
+    assert all("vector" not in hit for hit in lexical_only)
+
+
+def test_retrieval_cache_lru_and_version():
+    cache = RetrievalCache(max_entries=2)
+    calls = []
+
+    def compute(value):
+        return lambda: calls.append(value) or [value]
+
+    assert normalize_question("  예산은   얼마?! ") == normalize_question("예산은 얼마") == "예산은 얼마"
+    cache.get_or_compute(1, "a", (), compute("a"))
+    cache.get_or_compute(1, "b", (), compute("b"))
+    assert cache.get_or_compute(1, "A?", (), compute("a2")) == ["a"]  # a가 최근 사용으로
+    cache.get_or_compute(1, "c", (), compute("c"))  # 가장 오래된 b 삭제
+    assert cache.get_or_compute(1, "a", (), compute("a3")) == ["a"]
+    assert cache.get_or_compute(1, "b", (), compute("b2")) == ["b2"]
+    assert cache.get_or_compute(1, "b", ("other",), compute("b3")) == ["b3"]  # 설정이 다르면 다른 키
+    assert cache.get_or_compute(2, "b", ("other",), compute("b4")) == ["b4"]  # 버전이 바뀌면 모두 비움
+    assert calls == ["a", "b", "c", "b2", "b3", "b4"]
+    assert cache.stats()["entries"] == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 6)
+
+
+def brute_force_bm25(chunks: list, query: str, deleted=(), k1: float = 1.5, b: float = 0.75) -> dict:
+    """모든 청크를 훑어 계산한 BM25 점수 (비교 기준) - {청크 번호: 점수}"""
+    live = {i: index_tokens(chunk) for i, chunk in enumerate(chunks) if i not in deleted}
+    avg_length = sum(map(len, live.values())) / len(live)
+    scores = {}
+    for term in set(index_tokens(query)):
+        containing = [i for i, tokens in live.items() if term in tokens]
+        idf = math.log(1 + (len(live) - len(containing) + 0.5) / (len(containing) + 0.5))
+        for i in containing:
+            tf, length = live[i].count(term), len(live[i])
+            scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+    return scores
+
+
+BM25_QUERIES = ["주제3단어1 common7", "주제3단어1 주제3단어1 common7", "주제12단어5 주제0단어0 common49", "없는단어", "common1"]
+
+
+def assert_bm25_matches(index: BM25Index, chunks: list, deleted=()):
+    for query in BM25_QUERIES:
+        expected = brute_force_bm25(chunks, query, deleted)
+        results = index.search(query, len(chunks))
+        assert dict(results) == pytest.approx(expected), query
+        assert [score for _, score in results] == pytest.approx(sorted(expected.values(), reverse=True))
+        assert index.search(query, 3) == results[:3]
+
+
+def test_bm25_matches_brute_force():
+    chunks = clustered_texts(5, 400) + ["", "계약기간은 2년", "common1 " * 30]
+    index = BM25Index.from_chunks(chunks)
+    assert_bm25_matches(index, chunks)
+
+    deleted = set(range(0, len(chunks), 3))
+    index.delete(sorted(deleted))
+    assert_bm25_matches(index, chunks, deleted)
+
+    # 압축한 인덱스는 남은 청크만으로 새로 만든 인덱스와 같은 점수
+    rows = np.array([i for i in range(len(chunks)) if i not in deleted], dtype=np.int64)
+    live_chunks = [chunks[i] for i in rows]
+    assert_bm25_matches(index.compacted(rows), live_chunks)
+
+    arrays, values = BM25Index.from_chunks(live_chunks).export_arrays()
+    assert_bm25_matches(BM25Index.from_arrays(arrays, values), live_chunks)
+    assert BM25Index().search("common1") == [] and index.search("", 3) == []
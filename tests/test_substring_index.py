@@ -0,0 +1,30 @@
+"""부분 문자열 인덱스 테스트"""
+import re
+
+import numpy as np
+import pytest
+
+from substring_index import SubstringIndex
+
+WORDS = ["계약", "예산", "인공지능", "회의", "보고서", "Quality", "일정", "고객", "서버", "보안", "network", "AI"]
+
+
+def random_text(seed: int, n_words: int, extra: str = "") -> str:
+    """공백/줄바꿈이 섞인 한국어·영어 텍스트"""
+    rng = np.random.default_rng(seed)
+    seps = rng.choice([" ", "  ", "\n", "\t ", " \n\n"], n_words)
+    return "".join(f"{w}{s}" for w, s in zip(rng.choice(WORDS, n_words), seps)) + extra
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_substring_index_matches_regex_scan(tmp_path, on_disk):
+    text = random_text(2, 3000, " 끝")
+    index = SubstringIndex.on_disk(text, str(tmp_path / "doc")) if on_disk else SubstringIndex(text)
+    for query in ["AI", "a", "예산 회의", "QUALITY\n일정", "끝", "없는말", "ㅁ", "k 보", "보안\t network", text[:40]]:
+        expected = [m.start() for m in re.finditer(f"(?={re.escape(query)})", text, re.IGNORECASE)]
+        assert index.find_all(query).tolist() == expected, query
+        assert index.count(query) == len(expected)
+        assert index.first(query) == (expected[0] if expected else -1)
+    if on_disk:
+        index.delete()
+        assert not list(tmp_path.iterdir())
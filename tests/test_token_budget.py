@@ -0,0 +1,56 @@
+"""토큰 예산 테스트 (tiktoken 유무와 관계없이 성립하는 성질만 확인)"""
+import pytest
+
+from token_budget import (
+    CACHE_MAX_CHARS, MAX_CHUNK_TOKENS, MAX_CONTEXT_TOKENS, MIN_CHUNK_TOKENS, PROMPT_RESERVE_TOKENS,
+    chunk_token_budget, context_token_budget, count_tokens, pack_context, truncate_to_tokens,
+)
+
+TEXT = "예산 검토 회의는 다음 주 월요일입니다. The quarterly network audit starts on Monday. " * 20
+
+
+def test_count_tokens_same_for_cached_and_long_strings():
+    short = TEXT[:CACHE_MAX_CHARS - 1]
+    assert count_tokens(short) == count_tokens(short) > 0
+    assert count_tokens(TEXT) >= count_tokens(short)
+    assert count_tokens("") == 0
+
+
+@pytest.mark.parametrize("max_tokens", [0, 1, 7, 50, 300])
+def test_truncate_to_tokens_keeps_prefix_within_budget(max_tokens):
+    truncated = truncate_to_tokens(TEXT, max_tokens)
+    assert TEXT.startswith(truncated)
+    assert count_tokens(truncated) <= max_tokens
+    if max_tokens:
+        # 너무 많이 잘라내지 않음 (몇 글자만 더 붙이면 예산에 닿음)
+        assert count_tokens(TEXT[:len(truncated) + 8]) > max_tokens - 4
+
+
+def test_truncate_to_tokens_leaves_short_text():
+    assert truncate_to_tokens(TEXT, count_tokens(TEXT)) == TEXT
+    assert truncate_to_tokens("짧은 글", 100) == "짧은 글"
+
+
+def test_pack_context_skips_oversized_pieces_in_order():
+    pieces = [("a", 40), ("b", 70), ("c", 30), ("d", 31), ("e", 30)]
+    assert pack_context(pieces, 100) == (["a", "c", "e"], 100)
+    assert pack_context(pieces, 0) == ([], 0)
+    assert pack_context([("a", 5), ("b", 5)], 10) == (["a", "b"], 10)
+
+
+def test_pack_context_stops_after_max_skips():
+    pieces = [("a", 10)] + [("big", 1000)] * 3 + [("b", 10)]
+    assert pack_context(pieces, 50, max_skips=3) == (["a"], 10)
+    assert pack_context(pieces, 50, max_skips=4) == (["a", "b"], 20)
+
+
+def test_context_and_chunk_budgets():
+    model = {"context_window": 8192, "max_output_tokens": 1000}
+    assert context_token_budget(model) == 8192 - 1000 - PROMPT_RESERVE_TOKENS
+    assert context_token_budget(model, 500) == 8192 - 1000 - PROMPT_RESERVE_TOKENS - 500
+    assert context_token_budget(model, 10 ** 6) == 0
+    assert context_token_budget({"context_window": 128000, "max_output_tokens": 4096}) == MAX_CONTEXT_TOKENS
+
+    assert chunk_token_budget(model, 10) == (8192 - 1000 - PROMPT_RESERVE_TOKENS) // 10
+    assert chunk_token_budget(model, 1000) == MIN_CHUNK_TOKENS
+    assert chunk_token_budget(model, 0) == MAX_CHUNK_TOKENS
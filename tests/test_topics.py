@@ -0,0 +1,54 @@
+"""NMF 토픽 모델 테스트"""
+import numpy as np
+import pytest
+
+from topics import build_topic_model, build_topic_model_async
+
+FINANCE = ["예산", "회계", "결산", "세금", "감사", "지출"]
+NETWORK = ["서버", "라우터", "방화벽", "network", "패킷", "스위치"]
+
+
+def themed_text(seed: int, words: list, n_words: int = 400) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(words, n_words))
+
+
+def test_topics_separate_themes(make_entry):
+    memory = {
+        **{f"finance{i}.pdf": make_entry(themed_text(i, FINANCE)) for i in range(3)},
+        **{f"network{i}.pdf": make_entry(themed_text(10 + i, NETWORK)) for i in range(3)},
+    }
+    model = build_topic_model(memory, n_topics=2)
+    assert model["distinctive"]
+    assert sorted(sorted(set(topic) <= set(FINANCE) for topic in model["topics"])) == [False, True]
+    assert all(set(topic) <= set(FINANCE) or set(topic) <= set(NETWORK) for topic in model["topics"])
+    for name, mixture in model["documents"].items():
+        assert sum(mixture) == pytest.approx(1.0)
+        finance_topic = next(i for i, topic in enumerate(model["topics"]) if set(topic) <= set(FINANCE))
+        assert (mixture[finance_topic] > 0.5) == name.startswith("finance")
+    assert [doc_count for _, doc_count, _ in model["shared"]] == [3, 3]
+
+
+def test_homogeneous_corpus_falls_back_to_common_terms(make_entry):
+    # 모든 청크에 같은 단어들만 나오면 빈도 제한이 어휘를 전부 지우므로 흔한 단어로 다시 고름
+    memory = {f"{i}.pdf": make_entry(" ".join(FINANCE * 40)) for i in range(3)}
+    model = build_topic_model(memory)
+    assert not model["distinctive"]
+    assert model["topics"] and all(set(topic) <= set(FINANCE) for topic in model["topics"])
+    assert model["shared"]
+
+
+def test_too_few_chunks_returns_no_topics(make_entry):
+    model = build_topic_model({"0.pdf": make_entry("예산 회계")})
+    assert model["topics"] == [] and model["shared"] == [] and not model["distinctive"]
+
+
+def test_async_matches_sync_and_skips_unfinished(make_memory):
+    memory = make_memory(4)
+    memory["3.pdf"]["status"] = "ingesting"
+    expected = build_topic_model(memory)
+    future = build_topic_model_async(memory)
+    memory.clear()  # 요청 뒤의 변경은 학습에 영향을 주지 않음
+    result = future.result(timeout=60)
+    assert set(result["documents"]) == {"0.pdf", "1.pdf", "2.pdf"}
+    assert result["topics"] == expected["topics"]
@@ -0,0 +1,134 @@
+"""모델별 토큰 예산 계산 (청크 크기, 컨텍스트 채우기)
+
+tiktoken이 있으면 cl100k_base로 세고, 없으면 한글 음절 1토큰 + 나머지 4문자당 1토큰으로 추정한다.
+인코딩 파일은 처음 셀 때 불러오며 (처음이면 내려받음), 오프라인 등으로 제때 받지 못하면 추정으로 고정한다.
+"""
+import functools
+import re
+import threading
+
+# 토큰 수 정확도 향상 (선택)
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 인코딩 파일을 기다리는 최대 시간 (초)
+ENCODING_LOAD_TIMEOUT = 10
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+# 프롬프트 틀(지시문, 질문 머리말 등)에 남겨 두는 토큰
+PROMPT_RESERVE_TOKENS = 256
+
+# 창이 커도 이 이상은 컨텍스트로 보내지 않음 (비용 대비 효과가 낮음)
+MAX_CONTEXT_TOKENS = 16000
+
+# 토큰 예산 청크의 크기 범위
+MIN_CHUNK_TOKENS = 128
+MAX_CHUNK_TOKENS = 1024
+
+# 이보다 짧은 문자열(단어, 짧은 구절)만 캐시 - 청크/문장 전체를 키로 붙잡아 두지 않음 (청크별 수는 항목에 저장됨)
+CACHE_MAX_CHARS = 64
+
+_HANGUL_RE = re.compile(r"[가-힣]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _load_encoding(result: list):
+    try:
+        result.append(tiktoken.get_encoding("cl100k_base"))
+    except Exception:  # 인코딩 파일을 받을 수 없는 환경
+        pass
+
+
+def _get_encoding():
+    """cl100k_base 인코딩 - 없거나 제한 시간 안에 불러오지 못하면 None (한 번 정해지면 바꾸지 않음)"""
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_loaded:
+            if tiktoken is not None:
+                result = []
+                loader = threading.Thread(target=_load_encoding, args=(result,), daemon=True)
+                loader.start()
+                loader.join(ENCODING_LOAD_TIMEOUT)
+                _encoding = result[0] if result else None
+            _encoding_loaded = True
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    """토큰 수를 세는 방식 이름"""
+    return "cl100k_base" if _get_encoding() is not None else "추정 (한글 1자=1토큰, 기타 4자=1토큰)"
+
+
+def count_tokens(text: str) -> int:
+    """텍스트 토큰 수"""
+    if len(text) < CACHE_MAX_CHARS:
+        return _count_short(text)
+    return _count(text)
+
+
+@functools.lru_cache(maxsize=65536)
+def _count_short(text: str) -> int:
+    return _count(text)
+
+
+def _count(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    hangul = len(_HANGUL_RE.findall(text))
+    other = len(_SPACE_RE.sub("", text)) - hangul
+    return hangul + -(-other // 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """최대 max_tokens 토큰이 되도록 뒤를 잘라냄"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    tokens = count_tokens(text)
+    while tokens > max_tokens:
+        text = text[:max(0, int(len(text) * max_tokens / tokens) - 1)]
+        tokens = count_tokens(text)
+    return text
+
+
+def context_token_budget(model_info: dict, prompt_tokens: int = 0) -> int:
+    """모델 창에서 답변 토큰과 프롬프트를 빼고 컨텍스트에 쓸 수 있는 토큰"""
+    available = (
+        model_info["context_window"] - model_info["max_output_tokens"] - PROMPT_RESERVE_TOKENS - prompt_tokens
+    )
+    return max(0, min(available, MAX_CONTEXT_TOKENS))
+
+
+def chunk_token_budget(model_info: dict, top_docs: int) -> int:
+    """상위 top_docs개 청크가 컨텍스트 예산에 들어가는 청크 크기 (토큰)"""
+    budget = context_token_budget(model_info) // max(1, top_docs)
+    return max(MIN_CHUNK_TOKENS, min(budget, MAX_CHUNK_TOKENS))
+
+
+def pack_context(pieces, budget: int, max_skips: int = 8) -> tuple:
+    """(텍스트, 토큰 수)를 순서대로 예산 안에서 담기 - (담은 텍스트 목록, 사용 토큰)
+
+    예산을 넘는 조각은 건너뛰고 다음 조각을 시도하되, 연속 max_skips개가 넘치면 멈춘다.
+    """
+    packed, used, skips = [], 0, 0
+    for text, tokens in pieces:
+        if used + tokens > budget:
+            skips += 1
+            if skips >= max_skips:
+                break
+            continue
+        packed.append(text)
+        used += tokens
+        skips = 0
+    return packed, used
@@ -0,0 +1,319 @@
+"""기억된 PDF 전체의 주제어 통계 (문서 빈도표 - 문서가 추가/삭제될 때마다 점진적으로 갱신)
+
+"공통 주제" 질문은 텍스트를 다시 훑지 않고 이 표에서 여러 문서에 걸쳐 나오는 단어를 TF-IDF로 골라 답한다.
+업로드가 끝나면 청크 TF-IDF 희소 행렬에 NMF 토픽 모델을 백그라운드로 학습해 문서별 토픽 비중도 구한다.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+from chunking import ChunkView
+
+# 주제어 후보: 한글 단어, 영문/숫자 단어 (한 글자는 제외)
+_WORD_RE = re.compile(r"[가-힣]{2,}|[A-Za-z][A-Za-z0-9]+")
+
+# 한글 단어 끝에서 떼어 내는 조사/어미 (긴 것부터 확인, 떼고 남은 부분이 두 글자 이상일 때만)
+_SUFFIXES = tuple(sorted((
+    "으로부터", "에서는", "으로는", "에게서", "이라는", "입니다", "합니다", "했습니다", "하였다", "됩니다",
+    "에서", "으로", "에게", "까지", "부터", "보다", "처럼", "이며", "이다", "하는", "하고", "했다", "한다",
+    "된다", "되는", "이나", "라는", "에는", "과의", "와의", "들의", "들은", "들이", "들을",
+    "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "도", "로", "만", "들",
+), key=len, reverse=True))
+
+# 어느 문서에나 흔히 나와 주제가 되지 않는 단어
+STOPWORDS = frozenset((
+    "그리고", "하지만", "그러나", "또한", "또는", "있다", "없다", "있는", "없는", "있습니다", "없습니다",
+    "이러한", "그러한", "이런", "그런", "대한", "대해", "위해", "위한", "통해", "통한", "경우", "때문",
+    "따라", "관련", "이번", "다음", "모든", "각각", "우리", "여러", "가장", "정도", "이상", "이하",
+    "the", "and", "for", "with", "that", "this", "are", "from", "was", "were", "have", "has", "not",
+    "but", "you", "our", "your", "its", "into", "also", "can", "will", "which", "their", "they",
+    "page", "of", "to", "in", "on", "is", "it", "as", "by", "be", "or", "an", "at",
+))
+
+# 공통 주제로 보려면 전체 문서 중 이 비율 이상에 나와야 함
+COMMON_TOPIC_MIN_COVERAGE = 0.5
+
+
+def topic_words(text: str) -> list:
+    """주제어 후보 목록 (영문은 소문자, 한글은 조사/어미를 뗀 형태, 불용어 제외)"""
+    words = []
+    for word in _WORD_RE.findall(text):
+        if word[0] >= "가":
+            for suffix in _SUFFIXES:
+                if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+                    word = word[:-len(suffix)]
+                    break
+        else:
+            word = word.lower()
+        if word not in STOPWORDS:
+            words.append(word)
+    return words
+
+
+def topic_counts(text: str) -> Counter:
+    """텍스트의 주제어별 등장 횟수"""
+    return Counter(topic_words(text))
+
+
+def _tf_weight(count: int) -> float:
+    """문서 안 등장 횟수의 로그 가중치 (0이면 0)"""
+    return 1.0 + math.log(count) if count else 0.0
+
+
+class DocumentFrequencyTable:
+    """주제어별 문서 빈도와 문서별 로그 TF 합 - 갱신은 바뀐 문서의 주제어 수에만 비례
+
+    스냅샷에서 불러온 표는 배열로 들고 있다가 처음 조회하거나 고칠 때 사전으로 펼친다.
+    자체 잠금을 쓰므로 전역 인덱스가 압축 중이어도 조회할 수 있다.
+    """
+
+    def __init__(self):
+        self.doc_freq = {}  # 주제어 -> 나오는 문서 수
+        self.tf_weight = {}  # 주제어 -> 문서별 1 + log(tf)의 합
+        self._frozen = None
+        self._lock = threading.Lock()
+
+    def _thaw(self):
+        if self._frozen is None:
+            return
+        blob, ends, doc_freq, tf_weight = self._frozen
+        self._frozen = None
+        ends = ends.tolist()
+        blob = blob.tobytes()
+        terms = [blob[start:end].decode("utf-8") for start, end in zip([0] + ends[:-1], ends)]
+        self.doc_freq = dict(zip(terms, doc_freq.tolist()))
+        self.tf_weight = dict(zip(terms, tf_weight.tolist()))
+
+    def __len__(self) -> int:
+        if self._frozen is not None:
+            return len(self._frozen[1])
+        return len(self.doc_freq)
+
+    def update(self, old_counts: dict, new_counts: dict):
+        """한 문서의 주제어 횟수가 old_counts에서 new_counts로 바뀐 만큼 반영 (new_counts에 없는 주제어는 그대로)"""
+        with self._lock:
+            self._update(old_counts, new_counts)
+
+    def _update(self, old_counts: dict, new_counts: dict):
+        self._thaw()
+        for term, count in new_counts.items():
+            old = old_counts.get(term, 0)
+            if old == count:
+                continue
+            if not old:
+                self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            self.tf_weight[term] = self.tf_weight.get(term, 0.0) + _tf_weight(count) - _tf_weight(old)
+
+    def remove(self, counts: dict):
+        """문서 하나의 주제어 횟수를 표에서 뺌"""
+        with self._lock:
+            self._remove(counts)
+
+    def _remove(self, counts: dict):
+        self._thaw()
+        for term, count in counts.items():
+            if not count or term not in self.doc_freq:
+                continue
+            remaining = self.doc_freq[term] - 1
+            if remaining <= 0:
+                del self.doc_freq[term]
+                del self.tf_weight[term]
+            else:
+                self.doc_freq[term] = remaining
+                self.tf_weight[term] -= _tf_weight(count)
+
+    def common_terms(self, n_docs: int, top_n: int = 10, min_coverage: float = COMMON_TOPIC_MIN_COVERAGE) -> list:
+        """여러 문서에 걸쳐 나오는 주제어 - [(주제어, 문서 수, 점수)], 점수 높은 순
+
+        전체의 min_coverage 이상 문서에 나오는 주제어만 보고, 문서별 로그 TF 합에
+        평활 IDF(log((1 + N) / (1 + df)) + 1)를 곱해 흔하기만 한 단어보다 많이 다룬 단어를 앞에 둔다.
+        """
+        with self._lock:
+            self._thaw()
+            if not n_docs or not self.doc_freq:
+                return []
+            terms = list(self.doc_freq)
+            doc_freq = np.fromiter(self.doc_freq.values(), dtype=np.float64, count=len(terms))
+            tf_weight = np.fromiter(self.tf_weight.values(), dtype=np.float64, count=len(terms))
+        min_docs = max(min(2, n_docs), math.ceil(min_coverage * n_docs))  # 문서가 둘 이상이면 두 문서 이상
+        idf = np.log((1.0 + n_docs) / (1.0 + doc_freq)) + 1.0
+        scores = np.where(doc_freq >= min_docs, tf_weight * idf, 0.0)
+        top = np.argsort(-scores, kind="stable")[:top_n]
+        return [(terms[i], int(doc_freq[i]), float(scores[i])) for i in top.tolist() if scores[i] > 0]
+
+    def export_arrays(self) -> dict:
+        """스냅샷용 평면 배열 (주제어는 UTF-8을 이어 붙인 바이트와 끝 오프셋)"""
+        with self._lock:
+            self._thaw()
+            encoded = [term.encode("utf-8") for term in self.doc_freq]
+            return {
+                "terms": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                "term_ends": np.cumsum([len(term) for term in encoded], dtype=np.int64),
+                "doc_freq": np.fromiter(self.doc_freq.values(), dtype=np.int32, count=len(encoded)),
+                "tf_weight": np.fromiter(self.tf_weight.values(), dtype=np.float64, count=len(encoded)),
+            }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "DocumentFrequencyTable":
+        """export_arrays 결과로 복원 (주제어 해독은 처음 쓸 때까지 미룸)"""
+        table = cls()
+        table._frozen = tuple(np.asarray(arrays[name]) for name in ("terms", "term_ends", "doc_freq", "tf_weight"))
+        return table
+
+
+# 토픽 모델 (청크 TF-IDF 희소 행렬의 NMF): 토픽 수, 어휘 수, 학습에 쓰는 최대 청크 수, 반복 횟수, 토픽마다 보여 줄 단어 수
+TOPIC_COUNT = 8
+TOPIC_VOCAB_SIZE = 2000
+TOPIC_MAX_CHUNKS = 4000
+TOPIC_ITERATIONS = 150
+TOPIC_TOP_TERMS = 6
+# 문서 토픽 비중이 이 값 이상이면 그 문서가 토픽을 다룬다고 봄, 청크의 이 비율보다 많이 나오는 단어는 어휘에서 뺌
+# (모든 단어가 그보다 흔한 비슷한 문서들뿐이면 이 제한 없이 다시 골라 "distinctive"를 False로 표시)
+TOPIC_MIN_SHARE = 0.15
+TOPIC_MAX_CHUNK_FREQ = 0.8
+
+
+class SparseRows:
+    """CSR 희소 행렬 (행 번호 배열을 같이 들고 곱셈을 np.bincount로 처리)"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_cols: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = (len(indptr) - 1, n_cols)
+        self.rows = np.repeat(np.arange(self.shape[0]), np.diff(indptr))
+
+    def dot(self, dense: np.ndarray) -> np.ndarray:
+        """X @ dense.T  (dense: k x 열 수) -> 행 수 x k"""
+        return np.stack([
+            np.bincount(self.rows, weights=self.data * column[self.indices], minlength=self.shape[0])
+            for column in dense
+        ], axis=1)
+
+    def t_dot(self, dense: np.ndarray) -> np.ndarray:
+        """(X.T @ dense).T  (dense: 행 수 x k) -> k x 열 수"""
+        return np.stack([
+            np.bincount(self.indices, weights=self.data * column[self.rows], minlength=self.shape[1])
+            for column in dense.T
+        ])
+
+
+def fit_nmf(matrix: SparseRows, n_topics: int = TOPIC_COUNT, iterations: int = TOPIC_ITERATIONS, seed: int = 0) -> tuple:
+    """곱셈 갱신 NMF (프로베니우스 노름) - (W: 행 x 토픽, H: 토픽 x 열)"""
+    rng = np.random.default_rng(seed)
+    n_rows, n_cols = matrix.shape
+    scale = np.sqrt(matrix.data.mean() / n_topics) if len(matrix.data) else 1.0
+    w = rng.random((n_rows, n_topics)) * scale + 1e-3
+    h = rng.random((n_topics, n_cols)) * scale + 1e-3
+    eps = 1e-9
+    for _ in range(iterations):
+        h *= matrix.t_dot(w) / ((w.T @ w) @ h + eps)
+        w *= matrix.dot(h) / (w @ (h @ h.T) + eps)
+    return w, h
+
+
+def _sample_chunks(entry: dict, limit: int) -> list:
+    """항목에서 고르게 뽑은 청크 텍스트 최대 limit개"""
+    bounds = np.asarray(entry["chunk_bounds"], dtype=np.int64).reshape(-1, 2)
+    if len(bounds) > limit:
+        bounds = bounds[np.linspace(0, len(bounds) - 1, limit).astype(np.int64)]
+    return list(ChunkView(entry["store"], bounds))
+
+
+def build_topic_model(memory: dict, n_topics: int = TOPIC_COUNT) -> dict:
+    """기억된 PDF 청크로 토픽 모델 학습 - {"topics", "documents", "shared", "distinctive", "chunks", "elapsed"}
+
+    topics: 토픽별 대표 단어 목록, documents: {PDF 이름: 토픽 비중 리스트 (합 1)},
+    shared: [(토픽 번호, 다루는 PDF 수, 전체 비중)] 여러 PDF가 다루는 순,
+    distinctive: 흔한 단어를 뺀 어휘로 학습했는지 (False면 어디에나 나오는 단어로 만든 토픽).
+    """
+    start = time.perf_counter()
+    names = [name for name, entry in memory.items() if entry.get("status") == "done"]
+    per_document = max(1, TOPIC_MAX_CHUNKS // max(len(names), 1))
+    chunk_words, chunk_doc = [], []
+    for doc_no, name in enumerate(names):
+        for text in _sample_chunks(memory[name], per_document):
+            words = topic_words(text)
+            if words:
+                chunk_words.append(Counter(words))
+                chunk_doc.append(doc_no)
+    empty = {"topics": [], "documents": {}, "shared": [], "distinctive": False, "chunks": len(chunk_words),
+             "elapsed": 0.0}
+    if len(chunk_words) < 2:
+        return {**empty, "elapsed": time.perf_counter() - start}
+
+    # 어휘: 두 청크 이상에 나오되 너무 흔하지 않은 단어 중 청크 빈도 상위 (그런 단어가 없으면 흔한 단어도 포함)
+    chunk_freq = Counter(term for counts in chunk_words for term in counts)
+    max_freq = max(2, TOPIC_MAX_CHUNK_FREQ * len(chunk_words))
+    vocab = [term for term, freq in chunk_freq.most_common() if 2 <= freq <= max_freq][:TOPIC_VOCAB_SIZE]
+    distinctive = bool(vocab)
+    if not vocab:
+        vocab = [term for term, freq in chunk_freq.most_common() if freq >= 2][:TOPIC_VOCAB_SIZE]
+    if not vocab:
+        return {**empty, "elapsed": time.perf_counter() - start}
+    term_ids = {term: i for i, term in enumerate(vocab)}
+    idf = np.log((1.0 + len(chunk_words)) / (1.0 + np.array([chunk_freq[term] for term in vocab]))) + 1.0
+
+    # 청크 x 어휘 TF-IDF (행마다 L2 정규화)
+    indptr, indices, data = [0], [], []
+    for counts in chunk_words:
+        row = [(term_ids[term], count) for term, count in counts.items() if term in term_ids]
+        indices.extend(term_id for term_id, _ in row)
+        data.extend(count for _, count in row)
+        indptr.append(len(indices))
+    indptr = np.array(indptr, dtype=np.int64)
+    indices = np.array(indices, dtype=np.int64)
+    data = (1.0 + np.log(np.array(data, dtype=np.float64))) * idf[indices]
+    norms = np.sqrt(np.bincount(np.repeat(np.arange(len(chunk_words)), np.diff(indptr)), weights=data ** 2,
+                                minlength=len(chunk_words)))
+    data /= np.repeat(np.maximum(norms, 1e-12), np.diff(indptr))
+    matrix = SparseRows(indptr, indices, data, len(vocab))
+
+    n_topics = max(1, min(n_topics, len(vocab), len(chunk_words)))
+    w, h = fit_nmf(matrix, n_topics)
+    topics = [[vocab[i] for i in np.argsort(-row)[:TOPIC_TOP_TERMS].tolist() if row[i] > 0] for row in h]
+
+    # 문서 토픽 비중: 문서 청크들의 토픽 가중치 합을 정규화
+    doc_weights = np.zeros((len(names), n_topics))
+    np.add.at(doc_weights, np.array(chunk_doc), w)
+    totals = doc_weights.sum(axis=1, keepdims=True)
+    mixtures = np.divide(doc_weights, totals, out=np.zeros_like(doc_weights), where=totals > 0)
+    documents = {name: mixtures[doc_no].tolist() for doc_no, name in enumerate(names) if totals[doc_no, 0] > 0}
+
+    covered = (mixtures >= TOPIC_MIN_SHARE).sum(axis=0)
+    overall = mixtures.sum(axis=0)
+    order = sorted(range(n_topics), key=lambda topic: (-covered[topic], -overall[topic]))
+    shared = [(topic, int(covered[topic]), float(overall[topic])) for topic in order if topics[topic]]
+    return {
+        "topics": topics,
+        "documents": documents,
+        "shared": shared,
+        "distinctive": distinctive,
+        "chunks": len(chunk_words),
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def build_topic_model_async(memory: dict, n_topics: int = TOPIC_COUNT) -> Future:
+    """새 스레드에서 토픽 모델 학습 (기억 목록은 지금 상태로 복사해 넘김) - Future 반환
+
+    세션마다 한 번에 하나씩만 요청하고 자기 스레드를 쓰므로 세션 사이에 대기열이 쌓이지 않는다.
+    """
+    future = Future()
+    memory = dict(memory)
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(build_topic_model(memory, n_topics))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="topic-model", daemon=True).start()
+    return future